@@ -0,0 +1,32 @@
+"""add trading result unit
+
+Revision ID: 3f1c9a7d2b64
+Revises: aecf5ce66032
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, None] = 'aecf5ce66032'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'spimex_trading_results',
+        sa.Column('unit', sa.String(), nullable=True),
+    )
+    op.execute(
+        "UPDATE spimex_trading_results SET unit = 'Метрическая тонна'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('spimex_trading_results', 'unit')
@@ -0,0 +1,47 @@
+"""add ingestion jobs
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'spimex_ingestion_jobs',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('file_hash', sa.String(length=64), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('date'),
+    )
+    op.create_index(
+        op.f('ix_spimex_ingestion_jobs_status'),
+        'spimex_ingestion_jobs',
+        ['status'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f('ix_spimex_ingestion_jobs_status'),
+        table_name='spimex_ingestion_jobs',
+    )
+    op.drop_table('spimex_ingestion_jobs')
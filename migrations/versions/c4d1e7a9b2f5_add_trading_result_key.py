@@ -0,0 +1,71 @@
+"""add trading result key
+
+Revision ID: c4d1e7a9b2f5
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d1e7a9b2f5'
+down_revision: Union[str, None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Единица измерения входит в ключ, а значения NULL в уникальном
+    # ограничении считаются различными, поэтому она становится обязательной
+    op.execute(
+        "UPDATE spimex_trading_results SET unit = 'Метрическая тонна' "
+        "WHERE unit IS NULL"
+    )
+    op.alter_column(
+        'spimex_trading_results',
+        'unit',
+        existing_type=sa.String(),
+        nullable=False,
+    )
+    # Дубликаты, добавленные повторными загрузками, удаляются,
+    # остается последняя измененная запись
+    op.execute(
+        """
+        DELETE FROM spimex_trading_results
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT
+                    id,
+                    row_number() OVER (
+                        PARTITION BY date, exchange_product_id, unit
+                        ORDER BY updated_on DESC NULLS LAST, id
+                    ) AS row_number
+                FROM spimex_trading_results
+            ) AS numbered_results
+            WHERE row_number > 1
+        )
+        """
+    )
+    op.create_unique_constraint(
+        'uq_spimex_trading_results_date_product_unit',
+        'spimex_trading_results',
+        ['date', 'exchange_product_id', 'unit'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'uq_spimex_trading_results_date_product_unit',
+        'spimex_trading_results',
+        type_='unique',
+    )
+    op.alter_column(
+        'spimex_trading_results',
+        'unit',
+        existing_type=sa.String(),
+        nullable=True,
+    )
@@ -0,0 +1,34 @@
+"""add ingestion job leases
+
+Revision ID: e7f2a4c8d1b6
+Revises: c4d1e7a9b2f5
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f2a4c8d1b6'
+down_revision: Union[str, None] = 'c4d1e7a9b2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'spimex_ingestion_jobs',
+        sa.Column('lease_owner', sa.String(length=128), nullable=True),
+    )
+    op.add_column(
+        'spimex_ingestion_jobs',
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('spimex_ingestion_jobs', 'lease_expires_at')
+    op.drop_column('spimex_ingestion_jobs', 'lease_owner')
@@ -0,0 +1,207 @@
+import argparse
+import dataclasses
+import datetime
+import pathlib
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+import pandas as pd
+
+from spimex_parser.apps.benchmark import workbooks
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import layouts
+from spimex_parser.modules.parser import readers
+from spimex_parser.modules.parser import unit_of_work
+
+
+STAGES = ['read', 'extract', 'convert', 'uow']
+
+
+@dataclasses.dataclass
+class EngineBenchmark:
+    """Этапы чтения отчета одним способом
+
+    Каждый этап принимает результат предыдущего: read - путь к файлу,
+    extract - прочитанные данные, convert - таблицу данных
+    """
+    read: Callable[[str], Any]
+    extract: Callable[[Any, datetime.date], data_table.TradingResultsDataTable]
+    uow_class: type
+
+
+    def convert(self, table: data_table.TradingResultsDataTable) -> int:
+        """Преобразует строки таблиц всех единиц измерения в результаты торгов"""
+        return sum(len(batch.list_results()) for batch in table.list_batches())
+
+
+def create_windowed_pandas_table(
+    frame: pd.DataFrame,
+    sections: List[data_table.TableSection],
+    date: datetime.date,
+) -> data_table.TradingResultsDataTable:
+    """Создает таблицу результатов торгов по таблицам, прочитанным pandas"""
+    return data_table.WindowedPandasTradingResultsDataTable(frame, date, sections)
+
+
+class FullSheetPandasSpimexTradingResultsUnitOfWork(
+    unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+):
+    """Единица работы парсера, читающая через pandas весь лист отчета"""
+    def _read_table(
+        self,
+        path: str,
+        date: datetime.date,
+    ) -> data_table.TradingResultsDataTable:
+        """Читает таблицу данных о результатах торгов из локального файла"""
+        frame = pd.read_excel(path, na_values=['-'])
+        return data_table.PandasTradingResultsDataTable(frame, date)
+
+
+ENGINES = {
+    'pandas': EngineBenchmark(
+        read=readers.read_pandas_frame,
+        extract=lambda source, date: create_windowed_pandas_table(*source, date),
+        uow_class=unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    ),
+    'pandas-full': EngineBenchmark(
+        read=lambda path: pd.read_excel(path, na_values=['-']),
+        extract=data_table.PandasTradingResultsDataTable,
+        uow_class=FullSheetPandasSpimexTradingResultsUnitOfWork,
+    ),
+    'xlrd': EngineBenchmark(
+        read=lambda path: readers.open_xlrd_sheet(path=path),
+        extract=readers.create_xlrd_table,
+        uow_class=unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+    ),
+}
+
+
+def main() -> None:
+    args = parse_args()
+    parameters = workbooks.WorkbookParameters(
+        rows_count=args.rows,
+        other_tables_rows_count=args.other_rows,
+        missing_ratio=args.missing_ratio,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = workbooks.write_report(pathlib.Path(directory), parameters)
+        print(
+            f'Report: {path.name}, {path.stat().st_size} bytes, '
+            f'{args.rows} rows in the metric-ton table, '
+            f'best of {args.repeat} runs'
+        )
+        print_header()
+
+        for engine_name in args.engines:
+            engine = ENGINES[engine_name]
+            timings = measure_timings(engine, str(path), parameters.date, args.repeat)
+            peak_memory = measure_peak_memory(engine, str(path), parameters.date)
+            print_row(engine_name, timings, peak_memory)
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+    parser = argparse.ArgumentParser(
+        description='Сравнение способов чтения отчетов Spimex',
+    )
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--other-rows', type=int, default=50)
+    parser.add_argument('--missing-ratio', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--engines',
+        nargs='+',
+        choices=list(ENGINES),
+        default=list(ENGINES),
+    )
+    return parser.parse_args()
+
+
+def measure_timings(
+    engine: EngineBenchmark,
+    path: str,
+    date: datetime.date,
+    repeat: int,
+) -> Dict[str, float]:
+    """Измеряет лучшее время выполнения каждого этапа в секундах
+
+    Перед каждым измерением кэш расположения таблиц очищается, чтобы
+    способы чтения и повторы не пользовались расположением, найденным
+    предыдущими измерениями
+    """
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    for _ in range(repeat):
+        layouts.layout_cache.clear()
+        started_at = time.perf_counter()
+        source = engine.read(path)
+        read_at = time.perf_counter()
+        table = engine.extract(source, date)
+        extracted_at = time.perf_counter()
+        engine.convert(table)
+        converted_at = time.perf_counter()
+
+        layouts.layout_cache.clear()
+        uow_started_at = time.perf_counter()
+
+        with engine.uow_class(path) as uow:
+            uow.data.list_batches()
+
+        finished_at = time.perf_counter()
+
+        timings['read'].append(read_at - started_at)
+        timings['extract'].append(extracted_at - read_at)
+        timings['convert'].append(converted_at - extracted_at)
+        timings['uow'].append(finished_at - uow_started_at)
+
+    return {stage: min(values) for stage, values in timings.items()}
+
+
+def measure_peak_memory(
+    engine: EngineBenchmark,
+    path: str,
+    date: datetime.date,
+) -> int:
+    """Измеряет пиковый объем памяти, выделенной при чтении отчета, в байтах"""
+    layouts.layout_cache.clear()
+    tracemalloc.start()
+
+    try:
+        table = engine.extract(engine.read(path), date)
+        engine.convert(table)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak_memory
+
+
+def print_header() -> None:
+    """Выводит заголовок таблицы результатов"""
+    stage_columns = ''.join(f'{stage + ", ms":>14}' for stage in STAGES)
+    print(f'{"engine":<12}{stage_columns}{"peak, MiB":>14}')
+
+
+def print_row(
+    engine_name: str,
+    timings: Dict[str, float],
+    peak_memory: int,
+) -> None:
+    """Выводит строку таблицы результатов"""
+    stage_columns = ''.join(
+        f'{timings[stage] * 1000:>14.2f}'
+        for stage in STAGES
+    )
+    print(f'{engine_name:<12}{stage_columns}{peak_memory / 1024 ** 2:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
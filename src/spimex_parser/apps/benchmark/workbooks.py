@@ -0,0 +1,202 @@
+import dataclasses
+import datetime
+import io
+import pathlib
+import random
+from typing import Any
+from typing import List
+
+import xlwt
+
+from spimex_parser.modules.parser import data_table
+
+
+COLUMNS_COUNT = 15
+MISSING_VALUE = '-'
+OTHER_TABLE_NAMES = [
+    'Единица измерения: Килограмм',
+    'Единица измерения: Кубический метр',
+]
+HEADERS = [
+    'Код\nИнструмента',
+    'Наименование\nИнструмента',
+    'Базис\nпоставки',
+    'Объем\nДоговоров\nв единицах\nизмерения',
+    'Обьем\nДоговоров,\nруб.',
+    'Изменение рыночной\nцены к цене\nпредыдуего\nторгового дня',
+    'Изменение рыночной\nцены к цене\nпредыдуего\nторгового дня, %',
+    'Цена (за единицу\nизмерения), руб.\nМинимальная',
+    'Цена (за единицу\nизмерения), руб.\nСредне-\nвзвешенная',
+    'Цена (за единицу\nизмерения), руб.\nМаксимальная',
+    'Цена (за единицу\nизмерения), руб.\nРыночная',
+    'Цена в Заявках\n(за единицу\nизмерения)\nЛучшее\nпредложение',
+    'Цена в Заявках\n(за единицу\nизмерения)\nЛучший\nспрос',
+    'Количество\nДоговоров,\nшт.',
+]
+OIL_IDS = ['A100', 'A092', 'A095', 'A592', 'DSC5', 'DSE5', 'TS1A', 'M100']
+OIL_NAMES = {
+    'A100': 'Бензин (АИ-100-К5)',
+    'A092': 'Бензин (АИ-92-К5)',
+    'A095': 'Бензин (АИ-95-К5)',
+    'A592': 'Бензин (АИ-92-К5) по ГОСТ',
+    'DSC5': 'ДТ межсезонное, класс 5',
+    'DSE5': 'ДТ летнее, класс 5',
+    'TS1A': 'Топливо для реактивных двигателей ТС-1',
+    'M100': 'Мазут топочный М-100',
+}
+DELIVERY_BASES = {
+    'NVY': 'ст. Новая Еловка',
+    'ACH': 'ст. Новоярославская',
+    'ANK': 'Ангарск-группа станций',
+    'KRS': 'ст. Кириши',
+    'UFM': 'ст. Уфа',
+    'OMS': 'ст. Омск',
+}
+DELIVERY_TYPE_IDS = ['A', 'F', 'J']
+
+
+@dataclasses.dataclass
+class WorkbookParameters:
+    """Параметры создаваемого файла отчета"""
+    rows_count: int = 500
+    other_tables_rows_count: int = 50
+    missing_ratio: float = 0.3
+    date: datetime.date = datetime.date(year=2023, month=9, day=21)
+    seed: int = 0
+
+
+def create_report_file_name(date: datetime.date) -> str:
+    """Возвращает название файла отчета за указанную дату"""
+    return f'oil_xls_{date.strftime("%Y%m%d")}162000.xls'
+
+
+def create_report_rows(parameters: WorkbookParameters) -> List[List[Any]]:
+    """Создает строки отчета Spimex со случайными данными о торгах
+
+    Отчет содержит заголовок бюллетеня, таблицу в метрических тоннах
+    и таблицы в других единицах измерения. Часть строк таблиц не содержит
+    сделок и заполнена заглушками, как в настоящих отчетах
+    """
+    generator = random.Random(parameters.seed)
+    formatted_date = parameters.date.strftime('%d.%m.%Y')
+    rows = [
+        create_row('Бюллетень по итогам торгов в Секции «Нефтепродукты»'),
+        create_row(f'Дата торгов: {formatted_date}'),
+    ]
+    rows.extend(create_table_rows(
+        data_table.TABLE_NAME,
+        parameters.rows_count,
+        parameters.missing_ratio,
+        generator,
+    ))
+
+    for table_name in OTHER_TABLE_NAMES:
+        rows.extend(create_table_rows(
+            table_name,
+            parameters.other_tables_rows_count,
+            parameters.missing_ratio,
+            generator,
+        ))
+
+    rows.append(create_row('Итого по секции:'))
+    return rows
+
+
+def create_table_rows(
+    table_name: str,
+    rows_count: int,
+    missing_ratio: float,
+    generator: random.Random,
+) -> List[List[Any]]:
+    """Создает строки одной таблицы отчета вместе с заголовками и итогами"""
+    rows = [
+        create_row(table_name),
+        create_row(*HEADERS),
+        create_row(),
+    ]
+    total_volume = 0
+    total_sum = 0
+    total_count = 0
+
+    for _ in range(rows_count):
+        if generator.random() < missing_ratio:
+            rows.append(create_missing_data_row(generator))
+            continue
+
+        row = create_data_row(generator)
+        total_volume += row[data_table.VOLUME_COL_INDEX]
+        total_sum += row[data_table.TOTAL_COL_INDEX]
+        total_count += row[-1]
+        rows.append(row)
+
+    summary_row = create_row(data_table.SUMMARY_CELL_NAME)
+    summary_row[data_table.VOLUME_COL_INDEX] = total_volume
+    summary_row[data_table.TOTAL_COL_INDEX] = total_sum
+    summary_row[-1] = total_count
+    rows.append(summary_row)
+    return rows
+
+
+def create_data_row(generator: random.Random) -> List[Any]:
+    """Создает строку таблицы с данными о сделках"""
+    row = create_missing_data_row(generator)
+    volume = generator.randint(1, 50) * 60
+    price = generator.randint(40_000, 90_000)
+
+    row[data_table.VOLUME_COL_INDEX] = volume
+    row[data_table.TOTAL_COL_INDEX] = volume * price
+    row[6] = generator.randint(-2_000, 2_000)
+    row[7] = round(generator.uniform(-3, 3), 2)
+
+    for col_index in range(8, 12):
+        row[col_index] = price
+
+    row[-1] = generator.randint(1, 20)
+    return row
+
+
+def create_missing_data_row(generator: random.Random) -> List[Any]:
+    """Создает строку таблицы без сделок, заполненную заглушками"""
+    oil_id = generator.choice(OIL_IDS)
+    delivery_basis_id = generator.choice(list(DELIVERY_BASES))
+    lot_size = generator.choice(['005', '060', '065'])
+    delivery_type_id = generator.choice(DELIVERY_TYPE_IDS)
+
+    return create_row(
+        f'{oil_id}{delivery_basis_id}{lot_size}{delivery_type_id}',
+        f'{OIL_NAMES[oil_id]}, {DELIVERY_BASES[delivery_basis_id]}',
+        DELIVERY_BASES[delivery_basis_id],
+        *[MISSING_VALUE] * (COLUMNS_COUNT - 4),
+    )
+
+
+def create_row(*values: Any) -> List[Any]:
+    """Создает строку отчета, начинающуюся со второго столбца"""
+    row: List[Any] = [''] * COLUMNS_COUNT
+    row[1:len(values) + 1] = values
+    return row
+
+
+def create_report_bytes(parameters: WorkbookParameters) -> bytes:
+    """Создает содержимое xls-файла отчета"""
+    workbook = xlwt.Workbook(encoding='utf-8')
+    sheet = workbook.add_sheet('TRADE_SUMMARY')
+
+    for row_index, row in enumerate(create_report_rows(parameters)):
+        for col_index, value in enumerate(row):
+            if value != '':
+                sheet.write(row_index, col_index, value)
+
+    stream = io.BytesIO()
+    workbook.save(stream)
+    return stream.getvalue()
+
+
+def write_report(
+    directory: pathlib.Path,
+    parameters: WorkbookParameters,
+) -> pathlib.Path:
+    """Записывает файл отчета в указанный каталог и возвращает путь к нему"""
+    path = directory / create_report_file_name(parameters.date)
+    path.write_bytes(create_report_bytes(parameters))
+    return path
@@ -1,21 +1,129 @@
+import concurrent.futures
 import contextlib
+import datetime
+import functools
+from collections.abc import Iterable
 from collections.abc import Iterator
+from typing import Optional
 
+from spimex_parser import config
 from spimex_parser.apps.console import database
+from spimex_parser.modules import job_ledger
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage import batching
 from spimex_parser.modules.data_storage import unit_of_work as data_unit_of_work
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import metadata
 from spimex_parser.modules.parser import unit_of_work as parser_unit_of_work
 
 
+PARSER_UOW_CLASSES = {
+    'pandas': parser_unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    'xlrd': parser_unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+}
+
+
 @contextlib.contextmanager
 def get_data_uow() -> Iterator[data_unit_of_work.TradingResultsUnitOfWork]:
-    engine = database.engine
-    with data_unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+    uow = data_unit_of_work.SqlAlchemyTradingResultsUnitOfWork(
+        database.engine,
+        config.DB_LOAD_METHOD,
+    )
+    with uow:
         yield uow
 
 
+def get_batch_writer() -> batching.TradingResultsBatchWriter:
+    return batching.TradingResultsBatchWriter(
+        get_data_uow,
+        max_rows=config.WRITE_BATCH_ROWS,
+        max_delay=config.WRITE_BATCH_DELAY,
+    )
+
+
 @contextlib.contextmanager
 def get_parser_uow(
     url: str,
+    executor: Optional[concurrent.futures.Executor] = None,
+    stored_file_hash: Optional[str] = None,
 ) -> Iterator[parser_unit_of_work.SpimexTradingResultsUnitOfWork]:
-    with parser_unit_of_work.PandasSpimexTradingResultsUnitOfWork(url) as uow:
+    parser_uow_class = PARSER_UOW_CLASSES[config.PARSER_ENGINE]
+    uow = parser_uow_class(
+        url,
+        executor=executor,
+        report_cache=get_report_cache(),
+        parsed_results_cache=get_parsed_results_cache(),
+        max_memory_size=config.DOWNLOAD_MAX_MEMORY_SIZE,
+        metadata_store=get_report_metadata_store(),
+        stored_file_hash=stored_file_hash,
+    )
+    with uow:
         yield uow
+
+
+def get_report_cache() -> Optional[caches.ReportCache]:
+    if config.REPORT_CACHE_DIR is None:
+        return None
+    
+    return create_report_cache(config.REPORT_CACHE_DIR, config.REPORT_CACHE_MAX_SIZE)
+
+
+@functools.lru_cache
+def create_report_cache(directory: str, max_size: int) -> caches.ReportCache:
+    return caches.FileSystemReportCache(directory=directory, max_size=max_size)
+
+
+def get_parsed_results_cache() -> Optional[caches.ParsedResultsCache]:
+    if config.PARSED_RESULTS_CACHE_DIR is None:
+        return None
+    
+    return caches.ArrowParsedResultsCache(config.PARSED_RESULTS_CACHE_DIR)
+
+
+def get_report_metadata_store() -> Optional[metadata.ReportMetadataStore]:
+    if config.REPORT_METADATA_DIR is None:
+        return None
+    
+    return metadata.FileSystemReportMetadataStore(config.REPORT_METADATA_DIR)
+
+
+def get_trading_calendar(
+    trading_dates: Iterable[datetime.date],
+) -> trading_calendar.TradingCalendar:
+    return trading_calendar.TradingCalendar(
+        holidays=trading_calendar.parse_dates(config.TRADING_HOLIDAYS),
+        trading_dates=trading_dates,
+        missing_dates_store=get_missing_dates_store(),
+        workdays=trading_calendar.parse_dates(config.TRADING_WORKDAYS),
+    )
+
+
+def get_missing_dates_store() -> Optional[trading_calendar.MissingDatesStore]:
+    if config.MISSING_DATES_FILE is None:
+        return None
+    
+    return trading_calendar.FileSystemMissingDatesStore(config.MISSING_DATES_FILE)
+
+
+def get_job_retry_policy() -> job_ledger.JobRetryPolicy:
+    return job_ledger.JobRetryPolicy(
+        max_attempts=config.JOB_MAX_ATTEMPTS,
+        base_delay=datetime.timedelta(seconds=config.JOB_RETRY_BASE_DELAY),
+        max_delay=datetime.timedelta(seconds=config.JOB_RETRY_MAX_DELAY),
+    )
+
+
+@contextlib.contextmanager
+def get_download_executor(
+    max_workers: int,
+) -> Iterator[concurrent.futures.ThreadPoolExecutor]:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield executor
+
+
+@contextlib.contextmanager
+def get_parser_executor(max_workers: int) -> Iterator[concurrent.futures.Executor]:
+    max_workers = min(max_workers, config.PARSER_WORKERS)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield executor
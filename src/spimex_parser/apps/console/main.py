@@ -1,33 +1,371 @@
+import argparse
+import collections
+import concurrent.futures
+import dataclasses
 import datetime
+import functools
+import http
 import urllib.error
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Callable
+from typing import Deque
 from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
 
+from spimex_parser import config
 from spimex_parser.apps.console import database
 from spimex_parser.apps.console import deps
 from spimex_parser.domain import models
-from spimex_parser.modules import datetime_util
+from spimex_parser.modules import job_ledger
+from spimex_parser.modules import report_dates
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage import batching
+from spimex_parser.modules.data_storage import filters
+
+
+ItemT = TypeVar('ItemT')
+ResultT = TypeVar('ResultT')
+
+
+@dataclasses.dataclass
+class LoadedReport:
+    """Итог загрузки файла данных одной даты
+
+    Если файл не изменился с прошлой обработки, pending_report равен None.
+    Ошибка загрузки не выбрасывается, а сохраняется в error
+    """
+    date: datetime.datetime
+    ingestion_job: models.IngestionJob
+    pending_report: Optional[batching.PendingReport] = None
+    error: Optional[Exception] = None
 
 
 def main() -> None:
+    args = parse_args()
     database.create_tables()
 
-    start_date = datetime.datetime(year=2023, month=1, day=1, hour=16, minute=20)
-    end_date = datetime.datetime(year=2024, month=1, day=1, hour=16, minute=20)
-    datetime_iterable = datetime_util.datetime_range(start_date, end_date)
+    start_date, end_date = get_date_range(args.start, args.end)
+    calendar = load_trading_calendar(start_date, end_date)
+    retry_policy = deps.get_job_retry_policy()
+    datetime_iterable = report_dates.select_report_dates(
+        calendar,
+        retry_policy,
+        load_ingestion_jobs(),
+        start_date,
+        end_date,
+        args.force,
+    )
+
+    load_results(datetime_iterable, calendar, retry_policy, args.workers)
+    
+    for ingestion_job in retry_policy.list_exhausted(load_ingestion_jobs()):
+        print(
+            f'Retries exhausted after {ingestion_job.attempts} attempts: '
+            f'"{ingestion_job.last_error}" (requested date: {ingestion_job.date})'
+        )
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+    parser = report_dates.create_arg_parser()
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help=(
+            'число потоков загрузки файлов (по умолчанию 1 - файлы '
+            'загружаются и разбираются по очереди)'
+        ),
+    )
+    return parser.parse_args(args)
+
+
+def get_date_range(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Возвращает границы диапазона дат загружаемых файлов данных
+
+    Без первой даты загружаются файлы дат, следующих за последней
+    сохраненной в базе данных датой
+    """
+    last_date = None
+
+    if start is None:
+        with deps.get_data_uow() as uow:
+            last_date = uow.data.get_last_date()
+
+    return report_dates.get_date_range(
+        start,
+        end,
+        last_date,
+        datetime.date.fromisoformat(config.DEFAULT_START_DATE),
+    )
+
+
+def load_ingestion_jobs() -> List[models.IngestionJob]:
+    """Возвращает записи журнала загрузки файлов данных"""
+    with deps.get_data_uow() as uow:
+        return uow.jobs.list()
+
+
+def load_trading_calendar(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+) -> trading_calendar.TradingCalendar:
+    """Создает календарь торговых дней с датами указанного диапазона,
+    результаты торгов которых уже есть в базе данных
+    """
+    result_filter = filters.TradingResultFilter(
+        start_date=start_date.date(),
+        end_date=end_date.date(),
+    )
+
+    with deps.get_data_uow() as uow:
+        trading_dates = uow.data.list_dates(result_filter)
+
+    return deps.get_trading_calendar(trading_dates)
+
+
+def load_results(
+    dates: Iterable[datetime.datetime],
+    calendar: trading_calendar.TradingCalendar,
+    retry_policy: job_ledger.JobRetryPolicy,
+    workers: int = 1,
+) -> None:
+    """Загружает файлы данных указанных дат и записывает их в базу данных
+
+    Файлы обрабатываются и записываются в порядке дат, а сообщения
+    об ошибках выводятся для каждой даты отдельно
+    """
+    writer = deps.get_batch_writer()
+
+    for loaded_report in load_reports(dates, workers):
+        if loaded_report.error is not None:
+            error = get_final_error(loaded_report.date, loaded_report.error, calendar)
+            print_error(loaded_report.date, error)
+
+            try:
+                fail_job(loaded_report.ingestion_job, error, retry_policy)
+            except Exception as e:
+                print_error(loaded_report.date, e)
+            
+            continue
+        
+        pending_report = loaded_report.pending_report
+
+        if pending_report is None:
+            print(f'Skipped not modified "{get_data_file_url(loaded_report.date)}"')
+            continue
+        
+        write_reports(lambda: writer.add(pending_report), retry_policy)
+    
+    write_reports(writer.flush, retry_policy)
+
+
+def load_reports(
+    dates: Iterable[datetime.datetime],
+    workers: int = 1,
+) -> Iterator[LoadedReport]:
+    """Последовательно загружает файлы данных указанных дат
+
+    Если workers больше 1, файлы загружаются в пуле из workers потоков
+    и разбираются в пуле процессов, а результаты возвращаются в порядке
+    дат. Загруженными заранее могут быть не больше 2 * workers файлов.
+    Записи журнала сохраняются из потоков через общий пул соединений
+    с базой данных
+    """
+    if workers <= 1:
+        for date in dates:
+            yield load_date_report(date)
+        
+        return
+    
+    with deps.get_parser_executor(workers) as parser_executor:
+        with deps.get_download_executor(workers) as download_executor:
+            yield from map_in_order(
+                download_executor,
+                functools.partial(load_date_report, parser_executor=parser_executor),
+                dates,
+                max_pending=2 * workers,
+            )
+
+
+def map_in_order(
+    executor: concurrent.futures.Executor,
+    function: Callable[[ItemT], ResultT],
+    items: Iterable[ItemT],
+    max_pending: int,
+) -> Iterator[ResultT]:
+    """Выполняет функцию для элементов в пуле исполнителей и возвращает
+    результаты в порядке элементов
+
+    В пул передается не больше max_pending задач, результаты которых еще
+    не возвращены, поэтому необработанные результаты не накапливаются
+    в памяти
+    """
+    pending_futures: Deque[concurrent.futures.Future] = collections.deque()
+
+    for item in items:
+        pending_futures.append(executor.submit(function, item))
 
-    for current_date in datetime_iterable:
-        try:
-            add_results_from_specified_date_to_database(current_date)
-        except urllib.error.HTTPError as e:
-            print(f'Parsing error: "{str(e)}" (requested date: {current_date})')
+        if len(pending_futures) >= max_pending:
+            yield pending_futures.popleft().result()
+    
+    while pending_futures:
+        yield pending_futures.popleft().result()
 
 
-def add_results_from_specified_date_to_database(date: datetime.datetime) -> None:
-    """Получает данные о торгах указанной даты и добавляет в базу данных"""
+def load_date_report(
+    date: datetime.datetime,
+    parser_executor: Optional[concurrent.futures.Executor] = None,
+) -> LoadedReport:
+    """Отмечает в журнале начало загрузки и загружает файл данных
+    указанной даты
+
+    Если не удалось отметить начало загрузки в журнале, возвращается
+    новая запись журнала с ошибкой
+    """
+    ingestion_job = models.IngestionJob(date.date())
+
+    try:
+        ingestion_job = start_job(date)
+        pending_report = load_report(date, ingestion_job, parser_executor)
+    except Exception as e:
+        return LoadedReport(date, ingestion_job, error=e)
+    
+    return LoadedReport(date, ingestion_job, pending_report)
+
+
+def load_report(
+    date: datetime.datetime,
+    ingestion_job: models.IngestionJob,
+    parser_executor: Optional[concurrent.futures.Executor] = None,
+) -> Optional[batching.PendingReport]:
+    """Получает данные о торгах указанной даты для записи в базу данных
+
+    Возвращает None в случае, если файл не изменился с прошлой обработки.
+    Такой файл сразу отмечается в журнале как загруженный
+    """
     data_file_url = get_data_file_url(date)
-    trading_results = load_results_from_file(data_file_url)
-    add_results_to_repo(trading_results)
-    print(f'Added to database contents of "{data_file_url}"')
+
+    stored_file_hash = ingestion_job.get_stored_file_hash()
+
+    with deps.get_parser_uow(data_file_url, parser_executor, stored_file_hash) as parser_uow:
+        if parser_uow.not_modified:
+            ingestion_job.complete(
+                datetime.datetime.now(),
+                ingestion_job.file_hash,
+                ingestion_job.row_count,
+            )
+            save_job(ingestion_job)
+            return None
+        
+        return batching.PendingReport(
+            ingestion_job,
+            parser_uow.data.list_batches(),
+            parser_uow.file_hash,
+            context=parser_uow,
+        )
+
+
+def write_reports(
+    write: Callable[[], Optional[batching.WriteBatchResult]],
+    retry_policy: job_ledger.JobRetryPolicy,
+) -> None:
+    """Записывает пакет файлов данных в базу данных
+
+    Файлы записанного пакета отмечаются как обработанные, а файлы пакета,
+    который не удалось записать, - как неудачно загруженные
+    """
+    try:
+        write_result = write()
+    except batching.BatchWriteError as e:
+        for pending_report in e.reports:
+            fail_job(pending_report.ingestion_job, e, retry_policy)
+            print_error(pending_report.ingestion_job.date, e)
+        
+        return
+    
+    if write_result is None:
+        return
+    
+    for pending_report in write_result.reports:
+        parser_uow = pending_report.context
+        parser_uow.commit()
+        print(f'Added to database contents of "{parser_uow.oil_data_path}"')
+    
+    print(write_result.format())
+
+
+def print_error(date: datetime.date, error: Exception) -> None:
+    """Выводит сообщение об ошибке обработки файла данных"""
+    if isinstance(error, job_ledger.MissingReportError):
+        print(f'Missing report: "{str(error)}" (requested date: {date})')
+    elif isinstance(error, urllib.error.HTTPError):
+        print(f'Parsing error: "{str(error)}" (requested date: {date})')
+    else:
+        print(f'Error: "{error!r}" (requested date: {date})')
+
+
+def get_final_error(
+    date: datetime.datetime,
+    error: Exception,
+    calendar: trading_calendar.TradingCalendar,
+) -> Exception:
+    """Возвращает ошибку загрузки файла для журнала
+
+    Если сервер не нашел файл прошедшего дня, дата отмечается
+    в календаре, а ошибка заменяется окончательной ошибкой отсутствия
+    отчета
+    """
+    if is_not_found_error(error) and calendar.confirm_missing_date(date.date()):
+        return job_ledger.MissingReportError(f'No report on the server: {error}')
+    
+    return error
+
+
+def is_not_found_error(error: Exception) -> bool:
+    """Проверяет, что сервер ответил на запрос файла кодом 404"""
+    return (
+        isinstance(error, urllib.error.HTTPError)
+        and error.code == http.HTTPStatus.NOT_FOUND
+    )
+
+
+def start_job(date: datetime.datetime) -> models.IngestionJob:
+    """Отмечает в журнале начало загрузки файла данных указанной даты"""
+    with deps.get_data_uow() as uow:
+        ingestion_job = uow.jobs.get(date.date())
+
+        if ingestion_job is None:
+            ingestion_job = models.IngestionJob(date.date())
+        
+        ingestion_job.start(datetime.datetime.now())
+        uow.jobs.save(ingestion_job)
+        uow.commit()
+    
+    return ingestion_job
+
+
+def fail_job(
+    ingestion_job: models.IngestionJob,
+    error: Exception,
+    retry_policy: job_ledger.JobRetryPolicy,
+) -> None:
+    """Отмечает в журнале неудачную загрузку файла данных"""
+    retry_policy.record_failure(ingestion_job, datetime.datetime.now(), error)
+    save_job(ingestion_job)
+
+
+def save_job(ingestion_job: models.IngestionJob) -> None:
+    """Сохраняет запись журнала загрузки файлов данных"""
+    with deps.get_data_uow() as uow:
+        uow.jobs.save(ingestion_job)
+        uow.commit()
 
 
 def get_data_file_url(date: datetime.datetime) -> str:
@@ -41,18 +379,5 @@ def format_date(date: datetime.datetime) -> str:
     return date.strftime('%Y%m%d%H%M%S')
 
 
-def load_results_from_file(data_file_path: str) -> List[models.TradingResult]:
-    """Загружает данные результатов торгов из указанного файла"""
-    with deps.get_parser_uow(data_file_path) as uow:
-        return uow.data.list()
-
-
-def add_results_to_repo(trading_results: List[models.TradingResult]) -> None:
-    """Добавляет указанные данные о результатах торгов в базу данных"""
-    with deps.get_data_uow() as uow:
-        uow.data.add_bulk(trading_results)
-        uow.commit()
-
-
 if __name__ == '__main__':
     main()
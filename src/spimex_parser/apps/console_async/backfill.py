@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import math
+from collections.abc import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import database
+from spimex_parser.apps.console_async import deps
+from spimex_parser.apps.console_async import main as console_main
+from spimex_parser.apps.console_async import pipeline
+from spimex_parser.domain import models
+from spimex_parser.modules import report_dates
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.parser.asyncio import throttling
+
+
+@dataclasses.dataclass
+class ShardResult:
+    """Итоги загрузки части диапазона дат в отдельном процессе"""
+    statistics: List[pipeline.StageStatistics]
+    missing_dates: Set[datetime.date]
+    download_limit: int = 0
+
+
+@dataclasses.dataclass
+class ShardError:
+    """Ошибка процесса, загружавшего часть диапазона дат"""
+    dates: List[datetime.datetime]
+    error: BaseException
+
+
+    def format(self) -> str:
+        """Возвращает описание ошибки в виде строки"""
+        return (
+            f'Shard error: "{self.error!r}" '
+            f'(requested dates: {self.dates[0]} - {self.dates[-1]})'
+        )
+
+
+@dataclasses.dataclass
+class BackfillResult:
+    """Итоги загрузки диапазона дат несколькими процессами"""
+    statistics: List[pipeline.StageStatistics]
+    missing_dates: Set[datetime.date]
+    errors: List[ShardError]
+    download_limit: int = 0
+
+
+    def format_download_limit(self) -> str:
+        """Возвращает общий лимит одновременных запросов процессов в виде
+        строки
+        """
+        return (
+            f'Download concurrency limit: {self.download_limit} in all processes '
+            f'(max {config.DOWNLOAD_MAX_CONCURRENCY})'
+        )
+
+
+@dataclasses.dataclass
+class BackfillProgress:
+    """Ход загрузки диапазона дат по журналу загрузки файлов данных"""
+    total: int
+    completed: int = 0
+    failed: int = 0
+    missing: int = 0
+
+
+    def format(self) -> str:
+        """Возвращает ход загрузки в виде строки"""
+        return (
+            f'Backfill progress: {self.completed + self.failed + self.missing}/{self.total} '
+            f'dates processed, {self.failed} failed, {self.missing} missing'
+        )
+
+
+class ShardRunner:
+    """Загрузка части диапазона дат в отдельном процессе
+
+    Вызывается в процессе-исполнителе и создает в нем собственный цикл
+    событий, сессию aiohttp и пул подключений к базе данных. Лимит
+    одновременных запросов отчетов делится между shard_count процессами.
+    Файлы разбираются в пуле потоков цикла событий процесса. Даты
+    без отчетов не сохраняются в хранилище, а возвращаются родительскому
+    процессу, чтобы процессы не перезаписывали файл хранилища одновременно
+    """
+    def __call__(self, dates: List[datetime.datetime], shard_count: int = 1) -> ShardResult:
+        return asyncio.run(self.load(dates, shard_count))
+
+
+    async def load(
+        self,
+        dates: List[datetime.datetime],
+        shard_count: int = 1,
+    ) -> ShardResult:
+        """Загружает результаты торгов указанных дат в базу данных"""
+        calendar = trading_calendar.TradingCalendar()
+        download_limiter = deps.get_download_limiter(shard_count)
+
+        try:
+            async with deps.get_async_client(download_limiter) as client:
+                results_manager = self.create_manager(client, calendar)
+                statistics = await results_manager.load_results_from_dates_to_repo(
+                    dates,
+                )
+        finally:
+            await database.engine.dispose()
+
+        return ShardResult(statistics, calendar.missing_dates, download_limiter.limit)
+
+
+    def create_manager(
+        self,
+        client: throttling.HttpClient,
+        calendar: trading_calendar.TradingCalendar,
+    ) -> console_main.AsyncTradingResultsManager:
+        """Создает загрузчик результатов торгов процесса"""
+        return console_main.AsyncTradingResultsManager(
+            client,
+            calendar=calendar,
+            download_workers=config.PIPELINE_DOWNLOAD_WORKERS,
+            parse_workers=config.PIPELINE_PARSE_WORKERS,
+            store_workers=config.PIPELINE_STORE_WORKERS,
+            queue_size=config.PIPELINE_QUEUE_SIZE,
+            write_batch_rows=config.WRITE_BATCH_ROWS,
+            write_batch_delay=config.WRITE_BATCH_DELAY,
+        )
+
+
+async def main() -> None:
+    args = parse_args()
+    await database.create_tables()
+
+    start_date, end_date = await console_main.get_date_range(args.start, args.end)
+    calendar = await console_main.load_trading_calendar(start_date, end_date)
+    retry_policy = deps.get_job_retry_policy()
+    dates = report_dates.select_report_dates(
+        calendar,
+        retry_policy,
+        await console_main.load_ingestion_jobs(),
+        start_date,
+        end_date,
+        args.force,
+    )
+
+    backfill_result = await run_backfill(
+        dates,
+        args.processes,
+        progress_interval=config.BACKFILL_PROGRESS_INTERVAL,
+    )
+
+    for missing_date in sorted(backfill_result.missing_dates):
+        calendar.confirm_missing_date(missing_date)
+
+    for shard_error in backfill_result.errors:
+        print(shard_error.format())
+
+    for stage_statistics in backfill_result.statistics:
+        print(stage_statistics.format())
+
+    print(backfill_result.format_download_limit())
+    await console_main.print_exhausted_jobs(retry_policy)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+    parser = report_dates.create_arg_parser()
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=config.BACKFILL_PROCESSES,
+        help='число процессов загрузки (по умолчанию число ядер процессора)',
+    )
+    return parser.parse_args(args)
+
+
+async def run_backfill(
+    dates: List[datetime.datetime],
+    processes: int,
+    shard_runner: Optional[ShardRunner] = None,
+    progress_interval: float = 10.0,
+) -> BackfillResult:
+    """Загружает результаты торгов указанных дат несколькими процессами
+
+    Даты делятся на части по числу процессов, и каждая часть загружается
+    в отдельном процессе. Пока процессы работают, каждые progress_interval
+    секунд выводится ход загрузки по журналу загрузки файлов данных.
+    Ошибка одного процесса не прерывает работу остальных
+    """
+    if shard_runner is None:
+        shard_runner = ShardRunner()
+
+    shards = split_into_shards(dates, processes)
+
+    if not shards:
+        return BackfillResult([], set(), [])
+
+    started_at = datetime.datetime.now()
+    loop = asyncio.get_running_loop()
+
+    with deps.get_backfill_executor(len(shards)) as executor:
+        shard_futures = [
+            loop.run_in_executor(executor, shard_runner, shard, len(shards))
+            for shard in shards
+        ]
+        pending_futures = set(shard_futures)
+
+        while pending_futures:
+            _, pending_futures = await asyncio.wait(
+                pending_futures,
+                timeout=progress_interval,
+            )
+            await print_progress(dates, started_at)
+
+        shard_results = await asyncio.gather(*shard_futures, return_exceptions=True)
+
+    return merge_shard_results(zip(shards, shard_results))
+
+
+def split_into_shards(
+    dates: List[datetime.datetime],
+    shard_count: int,
+) -> List[List[datetime.datetime]]:
+    """Делит даты на не больше shard_count последовательных частей
+    почти равного размера
+    """
+    if not dates:
+        return []
+
+    shard_size = math.ceil(len(dates) / max(shard_count, 1))
+    return [
+        dates[shard_start:shard_start + shard_size]
+        for shard_start in range(0, len(dates), shard_size)
+    ]
+
+
+def merge_shard_results(
+    shard_results: Iterable[
+        Tuple[List[datetime.datetime], Union[ShardResult, BaseException]]
+    ],
+) -> BackfillResult:
+    """Объединяет итоги загрузки частей диапазона дат"""
+    statistics: List[List[pipeline.StageStatistics]] = []
+    missing_dates: Set[datetime.date] = set()
+    errors: List[ShardError] = []
+    download_limit = 0
+
+    for shard, shard_result in shard_results:
+        if isinstance(shard_result, BaseException):
+            errors.append(ShardError(shard, shard_result))
+            continue
+
+        statistics.append(shard_result.statistics)
+        missing_dates.update(shard_result.missing_dates)
+        download_limit += shard_result.download_limit
+
+    return BackfillResult(
+        pipeline.merge_statistics(statistics),
+        missing_dates,
+        errors,
+        download_limit,
+    )
+
+
+async def print_progress(
+    dates: List[datetime.datetime],
+    started_at: datetime.datetime,
+) -> None:
+    """Выводит ход загрузки указанных дат"""
+    try:
+        ingestion_jobs = await console_main.load_ingestion_jobs()
+    except Exception as e:
+        print(f'Job ledger error: "{e!r}"')
+        return
+
+    print(count_progress(dates, ingestion_jobs, started_at).format())
+
+
+def count_progress(
+    dates: List[datetime.datetime],
+    ingestion_jobs: Iterable[models.IngestionJob],
+    started_at: datetime.datetime,
+) -> BackfillProgress:
+    """Подсчитывает загруженные и неудачно загруженные с начала загрузки
+    даты из указанных
+    """
+    requested_dates = {date.date() for date in dates}
+    progress = BackfillProgress(len(requested_dates))
+
+    for ingestion_job in ingestion_jobs:
+        if ingestion_job.date not in requested_dates:
+            continue
+
+        if ingestion_job.finished_at is None or ingestion_job.finished_at < started_at:
+            continue
+
+        if ingestion_job.status == models.JOB_STATUS_COMPLETED:
+            progress.completed += 1
+        elif ingestion_job.status == models.JOB_STATUS_FAILED:
+            progress.failed += 1
+        elif ingestion_job.status == models.JOB_STATUS_MISSING:
+            progress.missing += 1
+
+    return progress
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -4,7 +4,10 @@ from spimex_parser import config
 from spimex_parser.database import models as db_models
 
 
-engine = sqlalchemy.ext.asyncio.create_async_engine(config.ASYNC_DB_CONNECTION_URL)
+engine = sqlalchemy.ext.asyncio.create_async_engine(
+    config.ASYNC_DB_CONNECTION_URL,
+    pool_size=config.ASYNC_DB_POOL_SIZE,
+)
 
 
 async def create_tables() -> None:
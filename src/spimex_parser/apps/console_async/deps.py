@@ -1,17 +1,41 @@
 import aiohttp
-import aiohttp_retry
+import concurrent.futures
 import contextlib
+import datetime
+import functools
+import multiprocessing
 from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Optional
 
+from spimex_parser import config
 from spimex_parser.apps.console_async import database
+from spimex_parser.modules import job_ledger
+from spimex_parser.modules import trading_calendar
 from spimex_parser.modules.data_storage.asyncio import unit_of_work as data_unit_of_work
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import metadata
+from spimex_parser.modules.parser.asyncio import throttling
 from spimex_parser.modules.parser.asyncio import unit_of_work as parser_unit_of_work
 
 
+PARSER_UOW_CLASSES = {
+    'pandas': parser_unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork,
+    'xlrd': parser_unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork,
+}
+PARSER_EXECUTOR_CLASSES = {
+    'thread': concurrent.futures.ThreadPoolExecutor,
+    'process': concurrent.futures.ProcessPoolExecutor,
+}
+
+
 @contextlib.asynccontextmanager
 async def get_data_uow() -> AsyncIterator[data_unit_of_work.AsyncTradingResultsUnitOfWork]:
-    engine = database.engine
-    uow = data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(engine)
+    uow = data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(
+        database.engine,
+        config.DB_LOAD_METHOD,
+    )
     async with uow:
         yield uow
 
@@ -19,27 +43,140 @@ async def get_data_uow() -> AsyncIterator[data_unit_of_work.AsyncTradingResultsU
 @contextlib.asynccontextmanager
 async def get_parser_uow(
     url: str,
-    client: aiohttp.ClientSession,
+    client: throttling.HttpClient,
+    executor: Optional[concurrent.futures.Executor] = None,
+    stored_file_hash: Optional[str] = None,
 ) -> AsyncIterator[parser_unit_of_work.AsyncSpimexTradingResultsUnitOfWork]:
-    uow = parser_unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork(
+    uow = create_parser_uow(url, client, executor, stored_file_hash)
+    async with uow:
+        yield uow
+
+
+def create_parser_uow(
+    url: str,
+    client: throttling.HttpClient,
+    executor: Optional[concurrent.futures.Executor] = None,
+    stored_file_hash: Optional[str] = None,
+) -> parser_unit_of_work.AsyncSpimexTradingResultsUnitOfWork:
+    parser_uow_class = PARSER_UOW_CLASSES[config.PARSER_ENGINE]
+    return parser_uow_class(
         oil_data_path=url,
         client=client,
+        executor=executor,
+        report_cache=get_report_cache(),
+        parsed_results_cache=get_parsed_results_cache(),
+        max_memory_size=config.DOWNLOAD_MAX_MEMORY_SIZE,
+        metadata_store=get_report_metadata_store(),
+        stored_file_hash=stored_file_hash,
     )
-    async with uow:
-        yield uow
+
+
+def get_report_cache() -> Optional[caches.ReportCache]:
+    if config.REPORT_CACHE_DIR is None:
+        return None
+    
+    return create_report_cache(config.REPORT_CACHE_DIR, config.REPORT_CACHE_MAX_SIZE)
+
+
+@functools.lru_cache
+def create_report_cache(directory: str, max_size: int) -> caches.ReportCache:
+    return caches.FileSystemReportCache(directory=directory, max_size=max_size)
+
+
+def get_parsed_results_cache() -> Optional[caches.ParsedResultsCache]:
+    if config.PARSED_RESULTS_CACHE_DIR is None:
+        return None
+    
+    return caches.ArrowParsedResultsCache(config.PARSED_RESULTS_CACHE_DIR)
+
+
+def get_report_metadata_store() -> Optional[metadata.ReportMetadataStore]:
+    if config.REPORT_METADATA_DIR is None:
+        return None
+    
+    return metadata.FileSystemReportMetadataStore(config.REPORT_METADATA_DIR)
+
+
+def get_trading_calendar(
+    trading_dates: Iterable[datetime.date],
+) -> trading_calendar.TradingCalendar:
+    return trading_calendar.TradingCalendar(
+        holidays=trading_calendar.parse_dates(config.TRADING_HOLIDAYS),
+        trading_dates=trading_dates,
+        missing_dates_store=get_missing_dates_store(),
+        workdays=trading_calendar.parse_dates(config.TRADING_WORKDAYS),
+    )
+
+
+def get_missing_dates_store() -> Optional[trading_calendar.MissingDatesStore]:
+    if config.MISSING_DATES_FILE is None:
+        return None
+    
+    return trading_calendar.FileSystemMissingDatesStore(config.MISSING_DATES_FILE)
+
+
+def get_job_retry_policy() -> job_ledger.JobRetryPolicy:
+    return job_ledger.JobRetryPolicy(
+        max_attempts=config.JOB_MAX_ATTEMPTS,
+        base_delay=datetime.timedelta(seconds=config.JOB_RETRY_BASE_DELAY),
+        max_delay=datetime.timedelta(seconds=config.JOB_RETRY_MAX_DELAY),
+    )
+
+
+@contextlib.contextmanager
+def get_parser_executor() -> Iterator[concurrent.futures.Executor]:
+    executor_class = PARSER_EXECUTOR_CLASSES[config.PARSER_EXECUTOR]
+    with executor_class(max_workers=config.PARSER_WORKERS) as executor:
+        yield executor
+
+
+@contextlib.contextmanager
+def get_backfill_executor(max_workers: int) -> Iterator[concurrent.futures.Executor]:
+    mp_context = multiprocessing.get_context('spawn')
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context,
+    )
+    with executor:
+        yield executor
 
 
 @contextlib.asynccontextmanager
-async def get_async_client() -> AsyncIterator[aiohttp.ClientSession]:
+async def get_async_client(
+    limiter: Optional[throttling.AdaptiveConcurrencyLimiter] = None,
+) -> AsyncIterator[throttling.AdaptiveClient]:
     timeout = aiohttp.ClientTimeout(connect=15, total=30)
-    connector = aiohttp.TCPConnector(limit=100)
+    connector = aiohttp.TCPConnector(limit=config.DOWNLOAD_MAX_CONCURRENCY)
     client = aiohttp.ClientSession(timeout=timeout, connector=connector)
 
     async with client:
-        retry = aiohttp_retry.JitterRetry(attempts=10)
-        retry_client = aiohttp_retry.RetryClient(
-            client_session=client,
-            retry_options=retry,
-            raise_for_status=True,
+        adaptive_client = throttling.AdaptiveClient(
+            client,
+            limiter or get_download_limiter(),
+            get_download_retry_policy(),
         )
-        yield retry_client # type: ignore
+        yield adaptive_client
+
+
+def get_download_limiter(consumers: int = 1) -> throttling.AdaptiveConcurrencyLimiter:
+    """Создает лимит одновременных запросов отчетов
+
+    Лимиты из настроек делятся поровну между consumers процессами
+    или исполнителями, загружающими отчеты одновременно, чтобы вместе
+    они не превышали DOWNLOAD_MAX_CONCURRENCY
+    """
+    consumers = max(consumers, 1)
+    return throttling.AdaptiveConcurrencyLimiter(
+        initial_limit=max(config.DOWNLOAD_INITIAL_CONCURRENCY // consumers, 1),
+        min_limit=max(config.DOWNLOAD_MIN_CONCURRENCY // consumers, 1),
+        max_limit=max(config.DOWNLOAD_MAX_CONCURRENCY // consumers, 1),
+        latency_threshold=config.DOWNLOAD_LATENCY_THRESHOLD,
+    )
+
+
+def get_download_retry_policy() -> throttling.DownloadRetryPolicy:
+    return throttling.DownloadRetryPolicy(
+        attempts=config.DOWNLOAD_RETRY_ATTEMPTS,
+        base_delay=config.DOWNLOAD_RETRY_BASE_DELAY,
+        max_delay=config.DOWNLOAD_RETRY_MAX_DELAY,
+    )
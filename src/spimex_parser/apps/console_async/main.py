@@ -1,31 +1,402 @@
+import argparse
 import asyncio
+import concurrent.futures
+import dataclasses
 import datetime
 from collections.abc import Iterable
+from typing import Any
+from typing import Awaitable
+from typing import Callable
 from typing import List
+from typing import Optional
+from typing import Tuple
 
 import aiohttp
 
+from spimex_parser import config
 from spimex_parser.apps.console_async import database
 from spimex_parser.apps.console_async import deps
+from spimex_parser.apps.console_async import pipeline
 from spimex_parser.domain import models
-from spimex_parser.modules import datetime_util
+from spimex_parser.modules import job_ledger
+from spimex_parser.modules import report_dates
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage import batching
+from spimex_parser.modules.data_storage import filters
+from spimex_parser.modules.data_storage.asyncio import batching as async_batching
+from spimex_parser.modules.parser.asyncio import throttling
+from spimex_parser.modules.parser.asyncio import unit_of_work as parser_unit_of_work
+
+
+@dataclasses.dataclass
+class ReportJob:
+    """Файл данных за одну дату, передаваемый между этапами конвейера"""
+    date: datetime.datetime
+    ingestion_job: models.IngestionJob
+    parser_uow: parser_unit_of_work.AsyncSpimexTradingResultsUnitOfWork
+    batches: List[models.TradingResultBatch] = dataclasses.field(default_factory=list)
 
 
 class AsyncTradingResultsManager:
-    client: aiohttp.ClientSession
+    """Загрузчик результатов торгов с сайта Spimex в базу данных
+
+    Файлы данных обрабатываются конвейером из этапов загрузки, разбора
+    и сохранения в базу данных. Число исполнителей каждого этапа задается
+    отдельно, а этапы связаны очередями размера queue_size, поэтому
+    одновременно в памяти находится ограниченное число файлов, а транзакции
+    записи результатов торгов ведут не больше store_workers сессий. Записи
+    журнала загрузки сохраняются короткими транзакциями исполнителями любого
+    этапа: начало загрузки - исполнителями загрузки, а неудачная загрузка -
+    обработчиком ошибок этапа, поэтому одновременно открыто не больше
+    download_workers + parse_workers + store_workers сессий.
+
+    Если указан календарь торговых дней, в нем отмечаются даты,
+    за которые нет отчетов.
+
+    Каждая попытка загрузки отмечается в журнале загрузки файлов данных.
+    Успешная загрузка отмечается в той же транзакции, в которой сохраняются
+    результаты торгов, а время повтора неудачной загрузки определяется
+    правилами retry_policy.
 
+    Разобранные файлы записываются в базу данных пакетами одной транзакцией
+    на пакет. Пакет записывается, когда в нем набирается write_batch_rows
+    результатов торгов или с добавления первого файла проходит
+    write_batch_delay секунд (в том числе, если новые файлы не поступают),
+    а также по окончании загрузки
+    """
+    client: throttling.HttpClient
+    executor: Optional[concurrent.futures.Executor]
+    calendar: Optional[trading_calendar.TradingCalendar]
+    retry_policy: job_ledger.JobRetryPolicy
+    writer: async_batching.AsyncTradingResultsBatchWriter
+    download_workers: int
+    parse_workers: int
+    store_workers: int
+    queue_size: int
 
-    def __init__(self, client: aiohttp.ClientSession) -> None:
+
+    def __init__(
+        self,
+        client: throttling.HttpClient,
+        executor: Optional[concurrent.futures.Executor] = None,
+        calendar: Optional[trading_calendar.TradingCalendar] = None,
+        download_workers: int = 1,
+        parse_workers: int = 1,
+        store_workers: int = 1,
+        queue_size: int = 1,
+        retry_policy: Optional[job_ledger.JobRetryPolicy] = None,
+        write_batch_rows: int = 0,
+        write_batch_delay: float = 0.0,
+    ) -> None:
         self.client = client
+        self.executor = executor
+        self.calendar = calendar
+        self.retry_policy = retry_policy or deps.get_job_retry_policy()
+        self.writer = async_batching.AsyncTradingResultsBatchWriter(
+            deps.get_data_uow,
+            write_batch_rows,
+            write_batch_delay,
+        )
+        self.download_workers = download_workers
+        self.parse_workers = parse_workers
+        self.store_workers = store_workers
+        self.queue_size = queue_size
+
+
+    async def load_results_from_dates_to_repo(
+        self,
+        dates: Iterable[datetime.datetime],
+    ) -> List[pipeline.StageStatistics]:
+        """Добавляет результаты торгов указанных дат в базу данных
+
+        Возвращает статистику работы каждого этапа конвейера
+        """
+        stages = [
+            pipeline.Stage(
+                'download',
+                self._download_report,
+                self.download_workers,
+                self._handle_error,
+            ),
+            pipeline.Stage(
+                'parse',
+                self._parse_report,
+                self.parse_workers,
+                self._handle_error,
+                self._discard_report,
+            ),
+            pipeline.Stage(
+                'store',
+                self._store_report,
+                self.store_workers,
+                self._handle_error,
+                self._discard_report,
+            ),
+        ]
+        stopped = asyncio.Event()
+        flush_task = asyncio.create_task(self._flush_expired_writes(stopped))
+
+        try:
+            statistics = await pipeline.run_pipeline(dates, stages, self.queue_size)
+        finally:
+            stopped.set()
+            await flush_task
+        
+        await self._flush_writes()
+        return statistics
 
 
     async def load_results_from_date_to_repo(self, date: datetime.datetime) -> None:
-        """Добавляет указанные данные о результатах торгов в базу данных"""
+        """Добавляет результаты торгов указанной даты в базу данных
+        
+        Файл отмечается как обработанный только после сохранения результатов,
+        а неизмененные с прошлой обработки файлы пропускаются. Ошибка
+        загрузки, как и при загрузке конвейером, отмечается в журнале
+        и выводится, но не выбрасывается
+        """
+        try:
+            report_job = await self._download_report(date)
+
+            if report_job is not None:
+                await self._store_report(await self._parse_report(report_job))
+        except Exception as e:
+            await self._handle_error(date, e)
+        
+        await self._flush_writes()
+    
+
+    async def _download_report(
+        self,
+        date: datetime.datetime,
+    ) -> Optional[ReportJob]:
+        """Загружает файл данных указанной даты
+
+        Возвращает None в случае, если файл не изменился с прошлой обработки
+        """
+        ingestion_job = await self._start_job(date)
         file_url = self._get_data_file_url(date)
-        trading_results = await self._load_results_from_file(file_url)
+        parser_uow = deps.create_parser_uow(
+            file_url,
+            self.client,
+            self.executor,
+            ingestion_job.get_stored_file_hash(),
+        )
+
+        try:
+            await parser_uow.download()
+        except aiohttp.ClientResponseError as e:
+            if throttling.is_permanent_miss(e) and self._confirm_missing_date(date):
+                raise job_ledger.MissingReportError(f'No report on the server: {e}') from e
+            
+            raise
+
+        if parser_uow.not_modified:
+            await self._complete_not_modified_job(ingestion_job)
+            print(f'Skipped not modified trading results (requested date: {date})')
+            return None
+        
+        return ReportJob(date, ingestion_job, parser_uow)
+    
+
+    def _confirm_missing_date(self, date: datetime.datetime) -> bool:
+        """Отмечает в календаре дату, за которую сервер не нашел отчета
+
+        Возвращает True, если отсутствие отчета окончательно: текущий день
+        и дни с известными результатами торгов не отмечаются
+        """
+        if self.calendar is None:
+            return date.date() < datetime.date.today()
+        
+        return self.calendar.confirm_missing_date(date.date())
+    
+
+    async def _parse_report(self, report_job: ReportJob) -> ReportJob:
+        """Разбирает загруженный файл данных"""
+        await report_job.parser_uow.parse()
+        report_job.batches = await report_job.parser_uow.data.list_batches()
+        return report_job
+    
+
+    async def _store_report(self, report_job: ReportJob) -> None:
+        """Добавляет результаты торгов в пакет записи в базу данных
+
+        Файлы записанного пакета отмечаются как обработанные
+        """
+        pending_report = batching.PendingReport(
+            report_job.ingestion_job,
+            report_job.batches,
+            report_job.parser_uow.file_hash,
+            context=report_job,
+        )
+
+        try:
+            write_result = await self.writer.add(pending_report)
+        except batching.BatchWriteError as e:
+            await self._fail_written_reports(e, skip=report_job)
+            raise
+        
+        if write_result is not None:
+            await self._commit_written_reports(write_result)
+    
+
+    async def _flush_writes(self) -> None:
+        """Записывает в базу данных оставшиеся в пакете файлы"""
+        await self._write_batch(self.writer.flush)
+    
+
+    async def _flush_expired_writes(self, stopped: asyncio.Event) -> None:
+        """Записывает пакет по истечении write_batch_delay, даже если новые
+        файлы не поступают, пока не установлено событие stopped
+
+        Ожидание прерывается только между записями пакетов, поэтому
+        начатая запись не теряется
+        """
+        stop_task = asyncio.create_task(stopped.wait())
+
+        try:
+            while True:
+                expired_task = asyncio.create_task(self.writer.wait_expired())
+                await asyncio.wait(
+                    (stop_task, expired_task),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if stop_task.done():
+                    expired_task.cancel()
+                    return
+                
+                await self._write_batch(self.writer.flush_expired)
+        finally:
+            stop_task.cancel()
+    
+
+    async def _write_batch(
+        self,
+        flush: Callable[[], Awaitable[Optional[batching.WriteBatchResult]]],
+    ) -> None:
+        """Записывает пакет указанным методом записи и отмечает результат
+        в журнале загрузки
+        """
+        try:
+            write_result = await flush()
+        except batching.BatchWriteError as e:
+            await self._fail_written_reports(e)
+            return
+        
+        if write_result is not None:
+            await self._commit_written_reports(write_result)
+    
+
+    async def _commit_written_reports(
+        self,
+        write_result: batching.WriteBatchResult,
+    ) -> None:
+        """Отмечает файлы записанного пакета как обработанные"""
+        for pending_report in write_result.reports:
+            report_job: ReportJob = pending_report.context
+            await report_job.parser_uow.commit()
+            print(f'Added trading results to database (requested date: {report_job.date})')
+        
+        print(write_result.format())
+    
+
+    async def _fail_written_reports(
+        self,
+        error: batching.BatchWriteError,
+        skip: Optional[ReportJob] = None,
+    ) -> None:
+        """Отмечает неудачную загрузку файлов пакета, который не удалось
+        записать
+        """
+        for pending_report in error.reports:
+            if pending_report.context is not skip:
+                await self._handle_error(pending_report.context, error)
+    
+
+    async def _start_job(self, date: datetime.datetime) -> models.IngestionJob:
+        """Отмечает в журнале начало загрузки файла данных указанной даты"""
+        async with deps.get_data_uow() as data_uow:
+            ingestion_job = await data_uow.jobs.get(date.date())
+
+            if ingestion_job is None:
+                ingestion_job = models.IngestionJob(date.date())
+            
+            ingestion_job.start(datetime.datetime.now())
+            await data_uow.jobs.save(ingestion_job)
+            await data_uow.commit()
+        
+        return ingestion_job
+    
+
+    async def _complete_not_modified_job(
+        self,
+        ingestion_job: models.IngestionJob,
+    ) -> None:
+        """Отмечает в журнале загрузку файла, не изменившегося с прошлой
+        обработки
+        """
+        ingestion_job.complete(
+            datetime.datetime.now(),
+            ingestion_job.file_hash,
+            ingestion_job.row_count,
+        )
 
         async with deps.get_data_uow() as data_uow:
-            data_uow.data.add_bulk(trading_results)
+            await data_uow.jobs.save(ingestion_job)
+            await data_uow.commit()
+    
+
+    async def _fail_job(self, date: datetime.datetime, error: Exception) -> None:
+        """Отмечает в журнале неудачную загрузку файла данных указанной даты"""
+        async with deps.get_data_uow() as data_uow:
+            ingestion_job = await data_uow.jobs.get(date.date())
+
+            if ingestion_job is None:
+                ingestion_job = models.IngestionJob(date.date())
+                ingestion_job.start(datetime.datetime.now())
+            
+            self.retry_policy.record_failure(
+                ingestion_job,
+                datetime.datetime.now(),
+                error,
+            )
+            await data_uow.jobs.save(ingestion_job)
+            await data_uow.commit()
+    
+
+    async def _handle_error(self, item: Any, error: Exception) -> None:
+        """Отмечает неудачную загрузку в журнале и выводит сообщение
+        об ошибке обработки файла данных
+        """
+        if isinstance(item, ReportJob):
+            date = item.date
+            await item.parser_uow.close()
+        else:
+            date = item
+        
+        self._print_error(date, error)
+
+        try:
+            await self._fail_job(date, error)
+        except Exception as e:
+            print(f'Job ledger error: "{e!r}" (requested date: {date})')
+    
+
+    async def _discard_report(self, report_job: ReportJob) -> None:
+        """Освобождает загруженный файл данных, который не будет обработан"""
+        await report_job.parser_uow.close()
+    
+
+    def _print_error(self, date: datetime.datetime, error: Exception) -> None:
+        """Выводит сообщение об ошибке обработки файла данных"""
+        if isinstance(error, job_ledger.MissingReportError):
+            print(f'Missing report: "{str(error)}" (requested date: {date})')
+        elif isinstance(error, aiohttp.ClientError):
+            print(f'Parsing error: "{str(error)}" (requested date: {date})')
+        elif isinstance(error, asyncio.TimeoutError):
+            print(f'Timeout error (requested date: {date})')
+        else:
+            print(f'Error: "{error!r}" (requested date: {date})')
     
 
     def _get_data_file_url(self, date: datetime.datetime) -> str:
@@ -37,54 +408,111 @@ class AsyncTradingResultsManager:
     def _format_date(self, date:datetime.datetime) -> str:
         """Форматирует дату в строковое представление необходимого вида"""
         return date.strftime('%Y%m%d%H%M%S')
-    
-
-    async def _load_results_from_file(self, url: str) -> List[models.TradingResult]:
-        """Загружает данные результатов торгов из указанного файла"""
-        async with deps.get_parser_uow(url, self.client) as parser_uow:
-            return await parser_uow.data.list()
 
 
 async def main() -> None:
+    args = parse_args()
     await database.create_tables()
 
-    start_date = datetime.datetime(year=2023, month=1, day=1, hour=16, minute=20)
-    end_date = datetime.datetime(year=2024, month=1, day=1, hour=16, minute=20)
-    datetime_iterable = datetime_util.datetime_range(start_date, end_date)
+    start_date, end_date = await get_date_range(args.start, args.end)
+    calendar = await load_trading_calendar(start_date, end_date)
+    retry_policy = deps.get_job_retry_policy()
+    ingestion_jobs = await load_ingestion_jobs()
+    datetime_iterable = report_dates.select_report_dates(
+        calendar,
+        retry_policy,
+        ingestion_jobs,
+        start_date,
+        end_date,
+        args.force,
+    )
 
-    async with deps.get_async_client() as client:
-        results_manager = AsyncTradingResultsManager(client)
-        await run_loading_results(results_manager, datetime_iterable)
+    download_limiter = deps.get_download_limiter()
 
+    with deps.get_parser_executor() as executor:
+        async with deps.get_async_client(download_limiter) as client:
+            results_manager = AsyncTradingResultsManager(
+                client,
+                executor,
+                calendar=calendar,
+                download_workers=config.PIPELINE_DOWNLOAD_WORKERS,
+                parse_workers=config.PIPELINE_PARSE_WORKERS,
+                store_workers=config.PIPELINE_STORE_WORKERS,
+                queue_size=config.PIPELINE_QUEUE_SIZE,
+                retry_policy=retry_policy,
+                write_batch_rows=config.WRITE_BATCH_ROWS,
+                write_batch_delay=config.WRITE_BATCH_DELAY,
+            )
+            statistics = await results_manager.load_results_from_dates_to_repo(
+                datetime_iterable,
+            )
+    
+    for stage_statistics in statistics:
+        print(stage_statistics.format())
+    
+    print(download_limiter.format())
+    await print_exhausted_jobs(retry_policy)
 
 
-async def run_loading_results(
-    results_manager: AsyncTradingResultsManager,
-    datetime_iterable: Iterable[datetime.datetime],
-) -> None:
-    """Запускает задачи загрузки результатов с сайта в базу данных"""
-    loading_results_tasks = []
+async def print_exhausted_jobs(retry_policy: job_ledger.JobRetryPolicy) -> None:
+    """Выводит неудачные загрузки, которые больше не повторяются"""
+    for ingestion_job in retry_policy.list_exhausted(await load_ingestion_jobs()):
+        print(
+            f'Retries exhausted after {ingestion_job.attempts} attempts: '
+            f'"{ingestion_job.last_error}" (requested date: {ingestion_job.date})'
+        )
 
-    for date in datetime_iterable:
-        task = loading_results_task(results_manager, date)
-        loading_results_tasks.append(task)
-    
-    await asyncio.gather(*loading_results_tasks)
 
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+    return report_dates.create_arg_parser().parse_args(args)
+
+
+async def get_date_range(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Возвращает границы диапазона дат загружаемых файлов данных
+
+    Без первой даты загружаются файлы дат, следующих за последней
+    сохраненной в базе данных датой
+    """
+    last_date = None
+
+    if start is None:
+        async with deps.get_data_uow() as uow:
+            last_date = await uow.data.get_last_date()
+
+    return report_dates.get_date_range(
+        start,
+        end,
+        last_date,
+        datetime.date.fromisoformat(config.DEFAULT_START_DATE),
+    )
+
+
+async def load_ingestion_jobs() -> List[models.IngestionJob]:
+    """Возвращает записи журнала загрузки файлов данных"""
+    async with deps.get_data_uow() as uow:
+        return await uow.jobs.list()
+
+
+async def load_trading_calendar(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+) -> trading_calendar.TradingCalendar:
+    """Создает календарь торговых дней с датами указанного диапазона,
+    результаты торгов которых уже есть в базе данных
+    """
+    result_filter = filters.TradingResultFilter(
+        start_date=start_date.date(),
+        end_date=end_date.date(),
+    )
+
+    async with deps.get_data_uow() as uow:
+        trading_dates = await uow.data.list_dates(result_filter)
 
-async def loading_results_task(
-    results_manager: AsyncTradingResultsManager,
-    date: datetime.datetime,
-) -> None:
-    """Задача загрузки результатов торгов с сайта Spimex в базу данных"""
-    try:
-        await results_manager.load_results_from_date_to_repo(date)
-    except aiohttp.ClientError as e:
-        print(f'Parsing error: "{str(e)}" (requested date: {date})')
-    except asyncio.TimeoutError as e:
-        print(f'Timeout error (requested date: {date})')
-    else:
-        print(f'Added trading results to database (requested date: {date})')
+    return deps.get_trading_calendar(trading_dates)
 
 
 if __name__ == '__main__':
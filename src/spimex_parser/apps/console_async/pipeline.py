@@ -0,0 +1,274 @@
+import asyncio
+import dataclasses
+import time
+from collections.abc import Iterable
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+ErrorHandler = Callable[[Any, Exception], Awaitable[None]]
+DiscardHandler = Callable[[Any], Awaitable[None]]
+
+
+@dataclasses.dataclass
+class StageStatistics:
+    """Статистика работы этапа конвейера
+
+    Пропускная способность считается по времени от начала обработки первого
+    элемента до окончания обработки последнего, а загрузка - как доля этого
+    времени, в течение которой были заняты исполнители этапа
+    """
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy_time: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+    @property
+    def elapsed_time(self) -> float:
+        """Время работы этапа в секундах"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+
+        return self.finished_at - self.started_at
+
+
+    @property
+    def throughput(self) -> float:
+        """Число обработанных элементов в секунду"""
+        if self.elapsed_time == 0:
+            return 0.0
+
+        return self.processed / self.elapsed_time
+
+
+    @property
+    def utilization(self) -> float:
+        """Доля времени работы этапа, в течение которой были заняты исполнители"""
+        if self.elapsed_time == 0:
+            return 0.0
+
+        return self.busy_time / (self.elapsed_time * self.workers)
+
+
+    def format(self) -> str:
+        """Возвращает статистику этапа в виде строки"""
+        return (
+            f'{self.name}: workers={self.workers}, processed={self.processed}, '
+            f'failed={self.failed}, throughput={self.throughput:.2f}/s, '
+            f'utilization={self.utilization:.0%}'
+        )
+
+
+def merge_statistics(
+    pipelines_statistics: Iterable[List[StageStatistics]],
+) -> List[StageStatistics]:
+    """Объединяет статистику одноименных этапов нескольких конвейеров
+
+    Число исполнителей, обработанных элементов, ошибок и время занятости
+    складываются, а время работы этапа считается от самого раннего начала
+    до самого позднего окончания. Конвейеры могут работать в разных
+    процессах одной машины, поскольку time.perf_counter использует
+    монотонные часы, общие для всех процессов
+    """
+    merged_statistics: Dict[str, StageStatistics] = {}
+
+    for statistics in pipelines_statistics:
+        for stage_statistics in statistics:
+            merged = merged_statistics.setdefault(
+                stage_statistics.name,
+                StageStatistics(stage_statistics.name, 0),
+            )
+            merged.workers += stage_statistics.workers
+            merged.processed += stage_statistics.processed
+            merged.failed += stage_statistics.failed
+            merged.busy_time += stage_statistics.busy_time
+
+            merged.started_at = min(
+                (
+                    value for value in (merged.started_at, stage_statistics.started_at)
+                    if value is not None
+                ),
+                default=None,
+            )
+            merged.finished_at = max(
+                (
+                    value for value in (merged.finished_at, stage_statistics.finished_at)
+                    if value is not None
+                ),
+                default=None,
+            )
+    
+    return list(merged_statistics.values())
+
+
+@dataclasses.dataclass
+class Stage:
+    """Этап конвейера
+
+    Обработчик этапа получает элемент из очереди этапа и возвращает элемент
+    для следующего этапа или None, если элемент дальше не передается.
+    Исключения обработчика передаются обработчику ошибок, а элемент
+    отбрасывается. Элементы этапа, которые не будут обработаны из-за
+    отмены или ошибки конвейера (оставшиеся в очереди этапа или прерванные
+    во время обработки), передаются обработчику on_discard, чтобы
+    освободить их ресурсы
+    """
+    name: str
+    handler: StageHandler
+    workers: int = 1
+    on_error: Optional[ErrorHandler] = None
+    on_discard: Optional[DiscardHandler] = None
+
+
+async def run_pipeline(
+    items: Iterable[Any],
+    stages: List[Stage],
+    queue_size: int,
+) -> List[StageStatistics]:
+    """Пропускает элементы через этапы конвейера и возвращает их статистику
+
+    Этапы связаны очередями ограниченного размера, поэтому при заполнении
+    очереди медленного этапа предыдущие этапы приостанавливаются. Каждый
+    этап завершается после того, как обработаны все элементы его очереди
+    и завершен предыдущий этап. Если конвейер отменен или прерван ошибкой,
+    необработанные элементы передаются обработчикам on_discard этапов
+    """
+    queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    statistics = [StageStatistics(stage.name, stage.workers) for stage in stages]
+    workers: List[List[asyncio.Task]] = []
+
+    for stage_index, stage in enumerate(stages):
+        output_queue = None
+        next_stage = None
+
+        if stage_index + 1 < len(queues):
+            output_queue = queues[stage_index + 1]
+            next_stage = stages[stage_index + 1]
+
+        workers.append([
+            asyncio.create_task(run_worker(
+                stage,
+                queues[stage_index],
+                output_queue,
+                statistics[stage_index],
+                next_stage,
+            ))
+            for _ in range(stage.workers)
+        ])
+
+    try:
+        for item in items:
+            await queues[0].put(item)
+
+        for stage_queue, stage_workers in zip(queues, workers):
+            await stage_queue.join()
+
+            for worker in stage_workers:
+                worker.cancel()
+
+            await asyncio.gather(*stage_workers, return_exceptions=True)
+    finally:
+        all_workers = [worker for stage_workers in workers for worker in stage_workers]
+
+        for worker in all_workers:
+            worker.cancel()
+
+        await asyncio.gather(*all_workers, return_exceptions=True)
+
+        for stage, stage_queue in zip(stages, queues):
+            while not stage_queue.empty():
+                await discard_item(stage, stage_queue.get_nowait())
+                stage_queue.task_done()
+
+    return statistics
+
+
+async def run_worker(
+    stage: Stage,
+    input_queue: asyncio.Queue,
+    output_queue: Optional[asyncio.Queue],
+    statistics: StageStatistics,
+    next_stage: Optional[Stage] = None,
+) -> None:
+    """Исполнитель этапа конвейера, обрабатывающий элементы из очереди
+
+    Если исполнитель отменен во время обработки элемента или передачи
+    результата следующему этапу, элемент или результат отбрасывается
+    """
+    while True:
+        item = await input_queue.get()
+
+        try:
+            try:
+                result = await process_item(stage, item, statistics)
+            except asyncio.CancelledError:
+                await discard_item(stage, item)
+                raise
+
+            if result is None or output_queue is None:
+                continue
+
+            try:
+                await output_queue.put(result)
+            except asyncio.CancelledError:
+                await discard_item(next_stage, result)
+                raise
+        finally:
+            input_queue.task_done()
+
+
+async def process_item(
+    stage: Stage,
+    item: Any,
+    statistics: StageStatistics,
+) -> Optional[Any]:
+    """Обрабатывает элемент обработчиком этапа и учитывает его в статистике
+
+    Возвращает None в случае, если обработчик завершился с ошибкой.
+    Ошибки обработчика ошибок выводятся, чтобы исполнитель продолжал
+    обрабатывать очередь
+    """
+    started_at = time.perf_counter()
+
+    if statistics.started_at is None:
+        statistics.started_at = started_at
+
+    try:
+        result = await stage.handler(item)
+    except Exception as e:
+        statistics.failed += 1
+
+        if stage.on_error is not None:
+            try:
+                await stage.on_error(item, e)
+            except Exception as handler_error:
+                print(f'Error handler error: "{handler_error!r}" (stage: {stage.name})')
+
+        return None
+    else:
+        statistics.processed += 1
+        return result
+    finally:
+        finished_at = time.perf_counter()
+        statistics.busy_time += finished_at - started_at
+        statistics.finished_at = finished_at
+
+
+async def discard_item(stage: Optional[Stage], item: Any) -> None:
+    """Передает необработанный элемент обработчику on_discard этапа"""
+    if stage is None or stage.on_discard is None:
+        return
+
+    try:
+        await stage.on_discard(item)
+    except Exception as e:
+        print(f'Discard handler error: "{e!r}" (stage: {stage.name})')
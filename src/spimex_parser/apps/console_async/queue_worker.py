@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import datetime
+import os
+import socket
+import uuid
+from typing import List
+from typing import Optional
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import database
+from spimex_parser.apps.console_async import deps
+from spimex_parser.apps.console_async import main as console_main
+from spimex_parser.domain import models
+from spimex_parser.modules import datetime_util
+from spimex_parser.modules import report_dates
+
+
+class IngestionQueueWorker:
+    """Исполнитель очереди загрузки файлов данных в базе данных
+
+    Очередью служит журнал загрузки файлов данных. Исполнитель берет
+    в аренду запись журнала с самой ранней датой, которую пора загрузить,
+    загружает файл данных этой даты загрузчиком results_manager и, пока
+    загрузка идет, каждые heartbeat_interval продлевает аренду
+    на lease_duration. Записи берутся с блокировкой SKIP LOCKED, поэтому
+    исполнители на разных машинах не загружают одну дату одновременно,
+    а запись исполнителя, переставшего продлевать аренду, после ее
+    истечения берет другой исполнитель. Время аренды задается часами
+    исполнителей, поэтому часы машин должны быть синхронизированы
+    """
+    results_manager: console_main.AsyncTradingResultsManager
+    owner: str
+    lease_duration: datetime.timedelta
+    heartbeat_interval: float
+    poll_interval: float
+    max_attempts: int
+
+
+    def __init__(
+        self,
+        results_manager: console_main.AsyncTradingResultsManager,
+        owner: Optional[str] = None,
+        lease_duration: datetime.timedelta = datetime.timedelta(minutes=5),
+        heartbeat_interval: float = 60.0,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.results_manager = results_manager
+        self.owner = owner or create_worker_id()
+        self.lease_duration = lease_duration
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.max_attempts = results_manager.retry_policy.max_attempts
+
+
+    async def run(self, exit_when_empty: bool = False) -> int:
+        """Загружает файлы данных из очереди
+
+        Если очередь пуста, исполнитель ждет poll_interval секунд или,
+        если exit_when_empty равен True, завершает работу. Возвращает
+        число загруженных дат
+        """
+        processed_count = 0
+
+        while True:
+            ingestion_job = await self.claim()
+
+            if ingestion_job is None:
+                if exit_when_empty:
+                    return processed_count
+
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            await self.process(ingestion_job)
+            processed_count += 1
+
+
+    async def claim(self) -> Optional[models.IngestionJob]:
+        """Берет в аренду запись журнала, которую пора загрузить"""
+        async with deps.get_data_uow() as uow:
+            ingestion_job = await uow.jobs.claim(
+                self.owner,
+                datetime.datetime.now(),
+                self.lease_duration,
+                self.max_attempts,
+            )
+            await uow.commit()
+
+        return ingestion_job
+
+
+    async def process(self, ingestion_job: models.IngestionJob) -> None:
+        """Загружает файл данных даты арендованной записи журнала,
+        продлевая аренду, пока идет загрузка
+        """
+        heartbeat = asyncio.create_task(self._send_heartbeats(ingestion_job.date))
+
+        try:
+            await self.results_manager.load_results_from_date_to_repo(
+                datetime.datetime.combine(ingestion_job.date, report_dates.REPORT_TIME),
+            )
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+
+    async def renew_lease(self, date: datetime.date) -> bool:
+        """Продлевает аренду записи журнала указанной даты
+
+        Возвращает False в случае, если аренда потеряна
+        """
+        async with deps.get_data_uow() as uow:
+            renewed = await uow.jobs.renew_lease(
+                date,
+                self.owner,
+                datetime.datetime.now() + self.lease_duration,
+            )
+            await uow.commit()
+
+        return renewed
+
+
+    async def _send_heartbeats(self, date: datetime.date) -> None:
+        """Продлевает аренду записи журнала каждые heartbeat_interval секунд
+
+        Если аренда потеряна, загрузка продолжается: повторная запись
+        результатов торгов той же даты не создает дубликатов
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+
+            try:
+                renewed = await self.renew_lease(date)
+            except Exception as e:
+                print(f'Job ledger error: "{e!r}" (requested date: {date})')
+                continue
+
+            if not renewed:
+                print(f'Lease lost by {self.owner} (requested date: {date})')
+                return
+
+
+def create_worker_id() -> str:
+    """Возвращает идентификатор исполнителя, уникальный среди машин
+    и процессов
+    """
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+async def main() -> None:
+    args = parse_args()
+    await database.create_tables()
+
+    if args.enqueue:
+        enqueued_count = await enqueue_dates(args.start, args.end, args.force)
+        print(f'Enqueued {enqueued_count} dates')
+        return
+
+    retry_policy = deps.get_job_retry_policy()
+    download_limiter = deps.get_download_limiter(config.QUEUE_WORKERS)
+
+    async with deps.get_async_client(download_limiter) as client:
+        results_manager = console_main.AsyncTradingResultsManager(
+            client,
+            calendar=deps.get_trading_calendar([]),
+            retry_policy=retry_policy,
+        )
+        worker = IngestionQueueWorker(
+            results_manager,
+            lease_duration=datetime.timedelta(seconds=config.QUEUE_LEASE_DURATION),
+            heartbeat_interval=config.QUEUE_HEARTBEAT_INTERVAL,
+            poll_interval=config.QUEUE_POLL_INTERVAL,
+        )
+        print(f'Worker {worker.owner} started')
+        processed_count = await worker.run(args.exit_when_empty)
+
+    print(f'Worker {worker.owner} processed {processed_count} dates')
+    print(download_limiter.format())
+    await console_main.print_exhausted_jobs(retry_policy)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+    parser = report_dates.create_arg_parser()
+    parser.add_argument(
+        '--enqueue',
+        action='store_true',
+        help='добавить торговые дни диапазона в очередь загрузки и завершить работу',
+    )
+    parser.add_argument(
+        '--exit-when-empty',
+        action='store_true',
+        help='завершить работу, когда очередь опустеет',
+    )
+    return parser.parse_args(args)
+
+
+async def enqueue_dates(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    requeue: bool = False,
+) -> int:
+    """Добавляет в очередь загрузки торговые дни указанного диапазона,
+    которых еще нет в журнале загрузки, и возвращает их количество
+
+    Если requeue равен True, в очередь возвращаются и уже загруженные
+    или неудачно загруженные даты
+    """
+    start_date, end_date = await console_main.get_date_range(start, end)
+    calendar = await console_main.load_trading_calendar(start_date, end_date)
+    trading_datetimes = calendar.filter_trading_days(
+        datetime_util.datetime_range(start_date, end_date),
+    )
+
+    async with deps.get_data_uow() as uow:
+        enqueued_count = await uow.jobs.enqueue(
+            (current_date.date() for current_date in trading_datetimes),
+            requeue,
+        )
+        await uow.commit()
+
+    return enqueued_count
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -30,6 +30,7 @@ async def list_dynamics(
         delivery_basis_id=dynamics_filter.delivery_basis_id,
         start_date=dynamics_filter.start_date,
         end_date=dynamics_filter.end_date,
+        unit=dynamics_filter.unit,
     )
     filtered_trading_results = await uow.data.list(result_filter)
     
@@ -18,6 +18,7 @@ class DynamicsBase(pydantic.BaseModel):
     date: datetime.date
     created_on: datetime.datetime
     updated_on: datetime.datetime
+    unit: Optional[str] = None
 
 
 class DynamicsRead(DynamicsBase):
@@ -32,3 +33,4 @@ class DynamicsFilter(pydantic.BaseModel):
     delivery_basis_id: Optional[str] = None
     start_date: Optional[datetime.date] = None
     end_date: Optional[datetime.date] = None
+    unit: Optional[str] = None
@@ -26,6 +26,7 @@ async def list_trading_results(
         oil_id=query_result_filter.oil_id,
         delivery_type_id=query_result_filter.delivery_type_id,
         delivery_basis_id=query_result_filter.delivery_basis_id,
+        unit=query_result_filter.unit,
     )
     filtered_trading_results = await uow.data.list(
         result_filter,
@@ -18,6 +18,7 @@ class TradingResultBase(pydantic.BaseModel):
     date: datetime.date
     created_on: datetime.datetime
     updated_on: datetime.datetime
+    unit: Optional[str] = None
 
 
 class TradingResultRead(TradingResultBase):
@@ -30,3 +31,4 @@ class TradingResultFilter(pydantic.BaseModel):
     oil_id: Optional[str] = None
     delivery_type_id: Optional[str] = None
     delivery_basis_id: Optional[str] = None
+    unit: Optional[str] = None
@@ -17,3 +17,51 @@ ASYNC_DB_CONNECTION_URL = f'postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{
 REDIS_HOST = os.environ['REDIS_HOST']
 REDIS_URL = f'redis://{REDIS_HOST}'
 CACHE_INVALIDATE_TIME = os.environ['CACHE_INVALIDATE_TIME']
+
+DB_LOAD_METHOD = os.environ.get('DB_LOAD_METHOD', 'upsert')
+WRITE_BATCH_ROWS = int(os.environ.get('WRITE_BATCH_ROWS', 50_000))
+WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY', 30))
+
+PARSER_ENGINE = os.environ.get('PARSER_ENGINE', 'pandas')
+PARSER_EXECUTOR = os.environ.get('PARSER_EXECUTOR', 'thread')
+PARSER_WORKERS = int(os.environ.get('PARSER_WORKERS', os.cpu_count() or 1))
+
+PIPELINE_DOWNLOAD_WORKERS = int(os.environ.get('PIPELINE_DOWNLOAD_WORKERS', 8))
+PIPELINE_PARSE_WORKERS = int(os.environ.get('PIPELINE_PARSE_WORKERS', PARSER_WORKERS))
+PIPELINE_STORE_WORKERS = int(os.environ.get('PIPELINE_STORE_WORKERS', 2))
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 16))
+ASYNC_DB_POOL_SIZE = int(os.environ.get(
+    'ASYNC_DB_POOL_SIZE',
+    PIPELINE_DOWNLOAD_WORKERS + PIPELINE_PARSE_WORKERS + PIPELINE_STORE_WORKERS,
+))
+
+BACKFILL_PROCESSES = int(os.environ.get('BACKFILL_PROCESSES', os.cpu_count() or 1))
+BACKFILL_PROGRESS_INTERVAL = float(os.environ.get('BACKFILL_PROGRESS_INTERVAL', 10))
+
+QUEUE_LEASE_DURATION = int(os.environ.get('QUEUE_LEASE_DURATION', 300))
+QUEUE_HEARTBEAT_INTERVAL = float(os.environ.get('QUEUE_HEARTBEAT_INTERVAL', 60))
+QUEUE_POLL_INTERVAL = float(os.environ.get('QUEUE_POLL_INTERVAL', 30))
+QUEUE_WORKERS = int(os.environ.get('QUEUE_WORKERS', 1))
+
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+REPORT_CACHE_MAX_SIZE = int(os.environ.get('REPORT_CACHE_MAX_SIZE', 1024 ** 3))
+PARSED_RESULTS_CACHE_DIR = os.environ.get('PARSED_RESULTS_CACHE_DIR')
+REPORT_METADATA_DIR = os.environ.get('REPORT_METADATA_DIR')
+
+TRADING_HOLIDAYS = os.environ.get('TRADING_HOLIDAYS', '')
+TRADING_WORKDAYS = os.environ.get('TRADING_WORKDAYS', '')
+MISSING_DATES_FILE = os.environ.get('MISSING_DATES_FILE')
+DEFAULT_START_DATE = os.environ.get('DEFAULT_START_DATE', '2023-01-01')
+
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE_DELAY = int(os.environ.get('JOB_RETRY_BASE_DELAY', 600))
+JOB_RETRY_MAX_DELAY = int(os.environ.get('JOB_RETRY_MAX_DELAY', 24 * 60 * 60))
+
+DOWNLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DOWNLOAD_MAX_MEMORY_SIZE', 64 * 1024 ** 2))
+DOWNLOAD_INITIAL_CONCURRENCY = int(os.environ.get('DOWNLOAD_INITIAL_CONCURRENCY', 4))
+DOWNLOAD_MIN_CONCURRENCY = int(os.environ.get('DOWNLOAD_MIN_CONCURRENCY', 1))
+DOWNLOAD_MAX_CONCURRENCY = int(os.environ.get('DOWNLOAD_MAX_CONCURRENCY', PIPELINE_DOWNLOAD_WORKERS))
+DOWNLOAD_LATENCY_THRESHOLD = float(os.environ.get('DOWNLOAD_LATENCY_THRESHOLD', 5))
+DOWNLOAD_RETRY_ATTEMPTS = int(os.environ.get('DOWNLOAD_RETRY_ATTEMPTS', 5))
+DOWNLOAD_RETRY_BASE_DELAY = float(os.environ.get('DOWNLOAD_RETRY_BASE_DELAY', 0.5))
+DOWNLOAD_RETRY_MAX_DELAY = float(os.environ.get('DOWNLOAD_RETRY_MAX_DELAY', 30))
@@ -3,6 +3,8 @@ from sqlalchemy import Date
 from sqlalchemy import DateTime
 from sqlalchemy import Integer
 from sqlalchemy import String
+from sqlalchemy import Text
+from sqlalchemy import UniqueConstraint
 from sqlalchemy import UUID
 from sqlalchemy.orm import mapped_column
 
@@ -10,8 +12,19 @@ from sqlalchemy.orm import mapped_column
 Base = sqlalchemy.orm.declarative_base()
 
 
+TRADING_RESULT_KEY_CONSTRAINT = 'uq_spimex_trading_results_date_product_unit'
+
+
 class TradingResult(Base):
     __tablename__ = 'spimex_trading_results'
+    __table_args__ = (
+        UniqueConstraint(
+            'date',
+            'exchange_product_id',
+            'unit',
+            name=TRADING_RESULT_KEY_CONSTRAINT,
+        ),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True)
     exchange_product_id = mapped_column(String(11))
@@ -26,3 +39,20 @@ class TradingResult(Base):
     date = mapped_column(Date)
     created_on = mapped_column(DateTime)
     updated_on = mapped_column(DateTime)
+    unit = mapped_column(String, nullable=False)
+
+
+class IngestionJob(Base):
+    __tablename__ = 'spimex_ingestion_jobs'
+
+    date = mapped_column(Date, primary_key=True)
+    status = mapped_column(String(16), nullable=False, index=True)
+    attempts = mapped_column(Integer, nullable=False, default=0)
+    last_error = mapped_column(Text)
+    file_hash = mapped_column(String(64))
+    row_count = mapped_column(Integer)
+    started_at = mapped_column(DateTime)
+    finished_at = mapped_column(DateTime)
+    next_attempt_at = mapped_column(DateTime)
+    lease_owner = mapped_column(String(128))
+    lease_expires_at = mapped_column(DateTime)
@@ -1,10 +1,21 @@
 import dataclasses
 import datetime
 import uuid
+from collections.abc import Iterator
+from typing import List
 from typing import Optional
 
 
-@dataclasses.dataclass
+METRIC_TON_UNIT = 'Метрическая тонна'
+
+JOB_STATUS_PENDING = 'pending'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_COMPLETED = 'completed'
+JOB_STATUS_FAILED = 'failed'
+JOB_STATUS_MISSING = 'missing'
+
+
+@dataclasses.dataclass(slots=True)
 class TradingResult:
     exchange_product_id: str
     exchange_product_name: str
@@ -18,4 +29,203 @@ class TradingResult:
     date: datetime.date
     created_on: datetime.datetime
     updated_on: datetime.datetime
+    unit: str = METRIC_TON_UNIT
     id: Optional[uuid.UUID] = None
+
+
+@dataclasses.dataclass
+class TradingResultBatch:
+    """Пакет данных о результатах торгов в столбцовом представлении
+
+    Хранит по одному списку значений на каждое поле результата торгов,
+    а дату торгов, единицу измерения и время создания - единожды на весь
+    пакет. Результаты торгов в виде TradingResult создаются только при
+    обращении к ним
+    """
+    exchange_product_id: List[str]
+    exchange_product_name: List[str]
+    oil_id: List[str]
+    delivery_basis_id: List[str]
+    delivery_basis_name: List[str]
+    delivery_type_id: List[str]
+    volume: List[int]
+    total: List[int]
+    count: List[int]
+    date: datetime.date
+    created_on: datetime.datetime
+    updated_on: datetime.datetime
+    unit: str = METRIC_TON_UNIT
+
+
+    @classmethod
+    def create_empty(
+        cls,
+        date: datetime.date,
+        unit: str = METRIC_TON_UNIT,
+    ) -> 'TradingResultBatch':
+        """Создает пустой пакет результатов торгов"""
+        current_datetime = datetime.datetime.now()
+        return cls(
+            exchange_product_id=[],
+            exchange_product_name=[],
+            oil_id=[],
+            delivery_basis_id=[],
+            delivery_basis_name=[],
+            delivery_type_id=[],
+            volume=[],
+            total=[],
+            count=[],
+            date=date,
+            created_on=current_datetime,
+            updated_on=current_datetime,
+            unit=unit,
+        )
+
+
+    def __len__(self) -> int:
+        return len(self.exchange_product_id)
+    
+
+    def __getitem__(self, index: int) -> TradingResult:
+        """Возвращает результат торгов, находящийся в указанной строке пакета"""
+        return TradingResult(
+            exchange_product_id=self.exchange_product_id[index],
+            exchange_product_name=self.exchange_product_name[index],
+            oil_id=self.oil_id[index],
+            delivery_basis_id=self.delivery_basis_id[index],
+            delivery_basis_name=self.delivery_basis_name[index],
+            delivery_type_id=self.delivery_type_id[index],
+            volume=self.volume[index],
+            total=self.total[index],
+            count=self.count[index],
+            date=self.date,
+            created_on=self.created_on,
+            updated_on=self.updated_on,
+            unit=self.unit,
+        )
+    
+
+    def __iter__(self) -> Iterator[TradingResult]:
+        """Последовательно создает результаты торгов из строк пакета"""
+        for index in range(len(self)):
+            yield self[index]
+    
+
+    def list_results(self) -> List[TradingResult]:
+        """Возвращает список результатов торгов, содержащихся в пакете"""
+        return list(self)
+    
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[List[TradingResult]]:
+        """Последовательно создает результаты торгов частями заданного размера
+        
+        Одновременно в памяти находятся только результаты торгов текущей части
+        """
+        for chunk_start in range(0, len(self), chunk_size):
+            chunk_end = min(chunk_start + chunk_size, len(self))
+            yield [self[index] for index in range(chunk_start, chunk_end)]
+
+
+@dataclasses.dataclass
+class IngestionJob:
+    """Запись журнала загрузки файла данных за одну дату торгов
+
+    Хранит состояние последней попытки загрузки, число попыток, ошибку
+    последней неудачной попытки, хэш и число строк сохраненного файла,
+    а также время начала и окончания последней попытки и время, после
+    которого неудачную загрузку можно повторить.
+
+    Запись, взятая в работу исполнителем очереди загрузки, хранит его
+    идентификатор и время окончания аренды. Пока аренда не истекла, другие
+    исполнители и запуски консольных приложений дату не загружают.
+
+    Дата, за которую сервер подтвердил отсутствие отчета, отмечается
+    отдельным окончательным состоянием и, в отличие от неудачных загрузок,
+    не повторяется
+    """
+    date: datetime.date
+    status: str = JOB_STATUS_RUNNING
+    attempts: int = 0
+    last_error: Optional[str] = None
+    file_hash: Optional[str] = None
+    row_count: Optional[int] = None
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    next_attempt_at: Optional[datetime.datetime] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime.datetime] = None
+
+
+    def is_leased(self, current_datetime: datetime.datetime) -> bool:
+        """Проверяет, что запись взята в работу исполнителем очереди
+        и аренда еще не истекла
+        """
+        return self.lease_expires_at is not None and self.lease_expires_at > current_datetime
+    
+
+    def release(self) -> None:
+        """Освобождает аренду записи"""
+        self.lease_owner = None
+        self.lease_expires_at = None
+    
+
+    def get_stored_file_hash(self) -> Optional[str]:
+        """Возвращает хэш файла, результаты торгов которого сохранены
+        в базе данных
+
+        Хэш и число строк записываются только при успешной загрузке
+        и сохраняются при следующих попытках. Возвращает None в случае,
+        если дата еще не загружалась или сохраненный файл не содержал строк
+        """
+        if self.file_hash is None or not self.row_count:
+            return None
+        
+        return self.file_hash
+    
+
+    def start(self, current_datetime: datetime.datetime) -> None:
+        """Отмечает начало очередной попытки загрузки"""
+        self.status = JOB_STATUS_RUNNING
+        self.attempts += 1
+        self.started_at = current_datetime
+        self.finished_at = None
+        self.next_attempt_at = None
+    
+
+    def complete(
+        self,
+        current_datetime: datetime.datetime,
+        file_hash: Optional[str],
+        row_count: Optional[int],
+    ) -> None:
+        """Отмечает успешное сохранение результатов торгов"""
+        self.status = JOB_STATUS_COMPLETED
+        self.last_error = None
+        self.file_hash = file_hash
+        self.row_count = row_count
+        self.finished_at = current_datetime
+        self.next_attempt_at = None
+        self.release()
+    
+
+    def fail(
+        self,
+        current_datetime: datetime.datetime,
+        error: str,
+        retry_delay: datetime.timedelta,
+    ) -> None:
+        """Отмечает неудачную попытку загрузки и время следующей попытки"""
+        self.status = JOB_STATUS_FAILED
+        self.last_error = error
+        self.finished_at = current_datetime
+        self.next_attempt_at = current_datetime + retry_delay
+        self.release()
+    
+
+    def mark_missing(self, current_datetime: datetime.datetime, error: str) -> None:
+        """Отмечает, что отчета за дату нет на сервере"""
+        self.status = JOB_STATUS_MISSING
+        self.last_error = error
+        self.finished_at = current_datetime
+        self.next_attempt_at = None
+        self.release()
@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+import time
+from typing import AsyncContextManager
+from typing import Callable
+from typing import List
+from typing import Optional
+
+from spimex_parser.modules.data_storage import batching
+from spimex_parser.modules.data_storage.asyncio import unit_of_work
+
+
+AsyncUnitOfWorkFactory = Callable[
+    [],
+    AsyncContextManager[unit_of_work.AsyncTradingResultsUnitOfWork],
+]
+
+
+class AsyncTradingResultsBatchWriter:
+    """Асинхронная запись результатов торгов из нескольких файлов данных
+    пакетами
+
+    Результаты торгов файлов накапливаются в пакете и записываются одной
+    транзакцией вместе с отметками об успешной загрузке в журнале.
+    Записи даты, которых нет в файле, удаляются, а перед фиксацией
+    транзакции число записей каждой даты в базе данных сверяется с числом
+    результатов торгов в файле этой даты. Файлы можно добавлять
+    из нескольких задач одновременно.
+
+    Заполненный пакет записывается при добавлении очередного файла, а чтобы
+    пакет записывался по истечении max_delay, даже если новые файлы
+    не поступают, отдельная задача должна ожидать wait_expired и вызывать
+    flush_expired
+    """
+    uow_factory: AsyncUnitOfWorkFactory
+    batch: batching.WriteBatch
+    _lock: asyncio.Lock
+    _not_empty: asyncio.Event
+
+
+    def __init__(
+        self,
+        uow_factory: AsyncUnitOfWorkFactory,
+        max_rows: int,
+        max_delay: float,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.batch = batching.WriteBatch(max_rows, max_delay)
+        self._lock = asyncio.Lock()
+        self._not_empty = asyncio.Event()
+
+
+    async def add(
+        self,
+        report: batching.PendingReport,
+    ) -> Optional[batching.WriteBatchResult]:
+        """Добавляет файл данных в пакет и записывает заполненный пакет
+
+        Возвращает итоги записи или None, если пакет еще не записан
+        """
+        async with self._lock:
+            self.batch.add(report)
+            self._not_empty.set()
+
+            if not self.batch.is_full():
+                return None
+
+            return await self._flush()
+
+
+    async def flush(self) -> Optional[batching.WriteBatchResult]:
+        """Записывает накопленные файлы данных
+
+        Возвращает итоги записи или None, если пакет пуст
+        """
+        async with self._lock:
+            return await self._flush()
+
+
+    async def wait_expired(self) -> None:
+        """Ждет, пока истечет время ожидания непустого пакета"""
+        while True:
+            await self._not_empty.wait()
+            time_left = self.batch.get_time_left()
+
+            if time_left <= 0:
+                return
+
+            await asyncio.sleep(time_left)
+
+
+    async def flush_expired(self) -> Optional[batching.WriteBatchResult]:
+        """Записывает пакет, если истекло время его ожидания
+
+        Возвращает итоги записи или None, если пакет не записан
+        """
+        async with self._lock:
+            if not self.batch.is_full():
+                return None
+
+            return await self._flush()
+
+
+    async def _flush(self) -> Optional[batching.WriteBatchResult]:
+        """Записывает накопленные файлы данных под блокировкой"""
+        reports = self.batch.take()
+        self._not_empty.clear()
+
+        if not reports:
+            return None
+
+        started_at = time.perf_counter()
+
+        try:
+            row_count = await self._write(reports)
+        except Exception as e:
+            raise batching.BatchWriteError(reports, e) from e
+
+        return batching.WriteBatchResult(
+            reports,
+            row_count,
+            time.perf_counter() - started_at,
+        )
+
+
+    async def _write(self, reports: List[batching.PendingReport]) -> int:
+        """Записывает файлы данных одной транзакцией и возвращает число
+        добавленных, измененных и удаленных записей
+        """
+        async with self.uow_factory() as uow:
+            row_count = 0
+
+            for report in reports:
+                for batch in report.batches:
+                    row_count += await uow.data.add_batch(batch)
+
+                row_count += await uow.data.delete_stale(
+                    report.ingestion_job.date,
+                    report.get_keys(),
+                )
+                stored_count = await uow.data.count(batching.get_report_filter(report))
+                batching.check_row_count(report, stored_count)
+                report.ingestion_job.complete(
+                    datetime.datetime.now(),
+                    report.file_hash,
+                    stored_count,
+                )
+                await uow.jobs.save(report.ingestion_job)
+
+            await uow.commit()
+
+        return row_count
@@ -1,16 +1,29 @@
+import dataclasses
+import datetime
 import uuid
+from collections.abc import AsyncIterable
+from collections.abc import Iterable
+from typing import Any
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 
 import sqlalchemy
 import sqlalchemy.ext.asyncio
+from sqlalchemy import and_
+from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy import asc
 from sqlalchemy import desc
+from sqlalchemy.dialects import postgresql
 
 from spimex_parser.database import models as db_models
 from spimex_parser.domain import models
+from spimex_parser.modules import string_util
+from spimex_parser.modules.data_storage import bulk_load
 from spimex_parser.modules.data_storage import filters
 
 
@@ -40,6 +53,48 @@ class AsyncTradingResultsRepository:
         raise NotImplementedError()
     
 
+    async def flush(self) -> None:
+        """Записывает в хранилище данные, добавленные методами add и add_bulk"""
+        raise NotImplementedError()
+    
+
+    def discard(self) -> None:
+        """Отменяет добавление данных, еще не записанных в хранилище"""
+        raise NotImplementedError()
+    
+
+    async def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных записей
+        """
+        raise NotImplementedError()
+    
+
+    async def add_chunks(
+        self,
+        chunks: AsyncIterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Возвращает количество добавленных записей
+        """
+        raise NotImplementedError()
+    
+
+    async def delete_stale(
+        self,
+        date: datetime.date,
+        keys: Set[Tuple[str, str]],
+    ) -> int:
+        """Удаляет результаты торгов указанной даты, кодов инструментов
+        и единиц измерения которых нет среди указанных ключей
+
+        Возвращает количество удаленных записей
+        """
+        raise NotImplementedError()
+    
+
     async def list(
         self,
         result_filter: Optional[filters.TradingResultFilter] = None,
@@ -49,6 +104,31 @@ class AsyncTradingResultsRepository:
         limit: Optional[int] = None,
     ) -> List[models.TradingResult]:
         raise NotImplementedError()
+    
+
+    async def list_dates(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> List[datetime.date]:
+        """Возвращает даты торгов, результаты которых есть в репозитории,
+        в порядке возрастания
+        """
+        raise NotImplementedError()
+    
+
+    async def get_last_date(self) -> Optional[datetime.date]:
+        """Возвращает последнюю дату торгов, результаты которой есть
+        в репозитории, или None, если репозиторий пуст
+        """
+        raise NotImplementedError()
+    
+
+    async def count(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> int:
+        """Возвращает количество результатов торгов в репозитории"""
+        raise NotImplementedError()
 
 
 class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
@@ -110,6 +190,81 @@ class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
         return added_results
     
 
+    async def flush(self) -> None:
+        """Записывает в хранилище данные, добавленные методами add и add_bulk"""
+        await self.session.flush()
+    
+
+    def discard(self) -> None:
+        """Отменяет добавление данных, еще не записанных в хранилище
+
+        Добавленные объекты модели базы данных отменяются откатом сессии
+        """
+        return
+    
+
+    async def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Записи добавляются одним запросом массовой вставки, минуя создание
+        объектов модели базы данных. Возвращает количество добавленных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        records = bulk_load.batch_to_records(trading_results)
+        await self.session.execute(sqlalchemy.insert(db_models.TradingResult), records)
+
+        return len(records)
+    
+
+    async def add_chunks(
+        self,
+        chunks: AsyncIterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Каждая часть добавляется отдельным запросом массовой вставки сразу
+        по получении, поэтому в памяти одновременно находится только одна
+        часть. Возвращает количество добавленных записей
+        """
+        added_count = 0
+
+        async for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            records = [bulk_load.result_to_record(res) for res in chunk]
+            await self.session.execute(
+                sqlalchemy.insert(db_models.TradingResult),
+                records,
+            )
+            added_count += len(records)
+        
+        return added_count
+    
+
+    async def delete_stale(
+        self,
+        date: datetime.date,
+        keys: Set[Tuple[str, str]],
+    ) -> int:
+        """Удаляет результаты торгов указанной даты, кодов инструментов
+        и единиц измерения которых нет среди указанных ключей
+
+        Возвращает количество удаленных записей
+        """
+        statement = bulk_load.create_delete_stale_statement(date, keys)
+        result = await self.session.execute(
+            statement,
+            execution_options={'synchronize_session': False},
+        )
+        return len(result.all())
+    
+
     def _from_domain_model(
         self,
         trading_result: models.TradingResult,
@@ -129,6 +284,7 @@ class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
             date=trading_result.date,
             created_on=trading_result.created_on,
             updated_on=trading_result.updated_on,
+            unit=trading_result.unit,
         )
     
 
@@ -163,6 +319,47 @@ class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
         return [self._to_domain_model(res) for res in db_trading_results]
     
 
+    async def list_dates(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> List[datetime.date]:
+        """Возвращает даты торгов, результаты которых есть в репозитории,
+        в порядке возрастания
+        """
+        date_column = db_models.TradingResult.date
+        query = select(db_models.TradingResult)
+
+        if result_filter is not None:
+            query = self._filter_query(query, result_filter=result_filter)
+        
+        query = query.with_only_columns(date_column).distinct().order_by(date_column)
+        query_result = await self.session.execute(query)
+        return list(query_result.scalars().all())
+    
+
+    async def get_last_date(self) -> Optional[datetime.date]:
+        """Возвращает последнюю дату торгов, результаты которой есть
+        в репозитории, или None, если репозиторий пуст
+        """
+        query = select(sqlalchemy.func.max(db_models.TradingResult.date))
+        query_result = await self.session.execute(query)
+        return query_result.scalar()
+    
+
+    async def count(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> int:
+        """Возвращает количество результатов торгов в репозитории"""
+        query = select(sqlalchemy.func.count()).select_from(db_models.TradingResult)
+
+        if result_filter is not None:
+            query = self._filter_query(query, result_filter=result_filter)
+        
+        query_result = await self.session.execute(query)
+        return query_result.scalar_one()
+    
+
     def _filter_query(
         self,
         query: sqlalchemy.Select[Tuple[db_models.TradingResult]],
@@ -191,6 +388,9 @@ class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
                 db_models.TradingResult.date <= result_filter.end_date,
             )
         
+        if result_filter.unit is not None:
+            query = query.filter_by(unit=result_filter.unit)
+        
         return query
     
 
@@ -225,18 +425,473 @@ class AsyncSqlAlchemyTradingResultRepository(AsyncTradingResultsRepository):
         self,
         trading_result: db_models.TradingResult,
     ) -> models.TradingResult:
+        """Преобразует модель базы данных в доменную модель данных
+
+        Повторяющиеся строковые значения интернируются
+        """
         return models.TradingResult(
             id=trading_result.id,
-            exchange_product_id=trading_result.exchange_product_id,
-            exchange_product_name=trading_result.exchange_product_name,
-            oil_id=trading_result.oil_id,
-            delivery_basis_id=trading_result.delivery_basis_id,
-            delivery_basis_name=trading_result.delivery_basis_name,
-            delivery_type_id=trading_result.delivery_type_id,
+            exchange_product_id=string_util.intern_string(trading_result.exchange_product_id),
+            exchange_product_name=string_util.intern_string(trading_result.exchange_product_name),
+            oil_id=string_util.intern_string(trading_result.oil_id),
+            delivery_basis_id=string_util.intern_string(trading_result.delivery_basis_id),
+            delivery_basis_name=string_util.intern_string(trading_result.delivery_basis_name),
+            delivery_type_id=string_util.intern_string(trading_result.delivery_type_id),
             volume=trading_result.volume,
             total=trading_result.total,
             count=trading_result.count,
             date=trading_result.date,
             created_on=trading_result.created_on,
             updated_on=trading_result.updated_on,
+            unit=string_util.intern_string(trading_result.unit),
+        )
+
+
+class AsyncUpsertSqlAlchemyTradingResultRepository(AsyncSqlAlchemyTradingResultRepository):
+    """Асинхронный репозиторий SQL хранилища данных о результатах торгов
+    со Spimex, обновляющий уже добавленные записи
+
+    Пакеты и части данных добавляются запросом INSERT ... ON CONFLICT
+    DO UPDATE по дате, коду инструмента и единице измерения, поэтому
+    повторное добавление результатов торгов той же даты не создает
+    дубликатов. Методы добавления пакетов и частей возвращают количество
+    добавленных и измененных записей.
+
+    Синхронные add и add_bulk откладывают добавление до вызова flush,
+    который выполняет тот же запрос и проставляет возвращенным
+    результатам торгов id их записей, в том числе добавленных ранее
+    """
+    _pending_results: List[Tuple[models.TradingResult, Dict[str, Any]]]
+
+
+    def __init__(self, session: sqlalchemy.ext.asyncio.AsyncSession) -> None:
+        super().__init__(session)
+        self._pending_results = []
+    
+
+    def add(self, trading_result: models.TradingResult) -> models.TradingResult:
+        """Добавляет или обновляет данные о результатах сделки в репозитории"""
+        return self.add_bulk([trading_result])[0]
+    
+
+    def add_bulk(
+        self,
+        trading_results: List[models.TradingResult],
+    ) -> List[models.TradingResult]:
+        """Добавляет или обновляет список данных о результатах торгов
+        в репозитории
+        """
+        if any(res for res in trading_results if res.id is not None):
+            raise ValueError('You are not allowed to specify record ID manually')
+        
+        added_results: List[models.TradingResult] = []
+
+        for trading_result in trading_results:
+            record = bulk_load.result_to_record(trading_result)
+            added_result = dataclasses.replace(trading_result, id=record['id'])
+            self._pending_results.append((added_result, record))
+            added_results.append(added_result)
+        
+        return added_results
+    
+
+    async def flush(self) -> None:
+        """Записывает в хранилище данные, добавленные методами add и add_bulk"""
+        pending_results, self._pending_results = self._pending_results, []
+
+        if not pending_results:
+            return
+        
+        records = [record for _, record in pending_results]
+        await self._upsert_records(records)
+        record_ids = await self._get_record_ids(records)
+
+        for added_result, record in pending_results:
+            added_result.id = record_ids[bulk_load.get_record_key(record)]
+    
+
+    def discard(self) -> None:
+        """Отменяет добавление данных, еще не записанных в хранилище"""
+        self._pending_results = []
+    
+
+    async def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных и измененных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        return await self._upsert_records(bulk_load.batch_to_records(trading_results))
+    
+
+    async def add_chunks(
+        self,
+        chunks: AsyncIterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Возвращает количество добавленных и измененных записей
+        """
+        changed_count = 0
+
+        async for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            changed_count += await self._upsert_records(
+                [bulk_load.result_to_record(res) for res in chunk],
+            )
+        
+        return changed_count
+    
+
+    async def _upsert_records(self, records: List[Dict[str, Any]]) -> int:
+        """Добавляет или обновляет записи и возвращает количество
+        добавленных и измененных записей
+        """
+        result = await self.session.execute(
+            bulk_load.create_upsert_statement(),
+            records,
+        )
+        return len(result.all())
+    
+
+    async def _get_record_ids(
+        self,
+        records: List[Dict[str, Any]],
+    ) -> Dict[bulk_load.RecordKey, uuid.UUID]:
+        """Возвращает id записей репозитория с ключами указанных записей"""
+        statement = bulk_load.create_select_ids_statement(
+            bulk_load.get_record_key(record) for record in records
+        )
+        result = await self.session.execute(statement)
+        record_ids: Dict[bulk_load.RecordKey, uuid.UUID] = {}
+
+        for date, exchange_product_id, unit, trading_result_id in result:
+            record_ids[(date, exchange_product_id, unit)] = trading_result_id
+        
+        return record_ids
+
+
+class AsyncCopySqlAlchemyTradingResultRepository(AsyncUpsertSqlAlchemyTradingResultRepository):
+    """Асинхронный репозиторий SQL хранилища данных о результатах торгов
+    со Spimex, добавляющий записи командой COPY
+
+    Пакеты и части данных передаются PostgreSQL через copy_records_to_table
+    asyncpg в двоичном формате во временную промежуточную таблицу
+    в транзакции сессии, минуя создание объектов модели базы данных,
+    а затем переносятся в таблицу результатов торгов запросом INSERT ...
+    SELECT ... ON CONFLICT DO UPDATE. Поэтому, как и в репозитории
+    с обновлением записей, повторное добавление результатов торгов той же
+    даты не создает дубликатов, а методы добавления возвращают количество
+    добавленных и измененных записей
+    """
+    async def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных и измененных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        return await self._copy_rows(bulk_load.batch_to_rows(trading_results))
+    
+
+    async def add_chunks(
+        self,
+        chunks: AsyncIterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Каждая часть копируется отдельной командой COPY сразу по получении.
+        Возвращает количество добавленных и измененных записей
+        """
+        added_count = 0
+
+        async for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            added_count += await self._copy_rows(
+                bulk_load.result_to_row(dataclasses.replace(res, id=uuid.uuid4()))
+                for res in chunk
+            )
+        
+        return added_count
+    
+
+    async def _copy_rows(self, rows: Iterable[bulk_load.CopyRow]) -> int:
+        """Копирует строки через copy_records_to_table во временную
+        промежуточную таблицу и переносит их в таблицу результатов торгов
+
+        Возвращает количество добавленных и измененных записей
+        """
+        await self.session.execute(
+            sqlalchemy.text(bulk_load.CREATE_STAGING_TABLE_STATEMENT),
+        )
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            bulk_load.STAGING_TABLE_NAME,
+            records=rows,
+            columns=bulk_load.COPY_COLUMNS,
+        )
+
+        result = await self.session.execute(bulk_load.create_merge_staging_statement())
+        changed_count = len(result.all())
+        await self.session.execute(
+            sqlalchemy.text(bulk_load.CLEAR_STAGING_TABLE_STATEMENT),
+        )
+
+        return changed_count
+
+
+class AsyncIngestionJobsRepository:
+    """Асинхронный репозиторий журнала загрузки файлов данных"""
+    async def get(self, date: datetime.date) -> Optional[models.IngestionJob]:
+        """Возвращает запись журнала указанной даты или None в случае,
+        если файл данных этой даты еще не загружался
+        """
+        raise NotImplementedError()
+    
+
+    async def list(
+        self,
+        statuses: Optional[List[str]] = None,
+    ) -> List[models.IngestionJob]:
+        """Возвращает записи журнала с указанными состояниями в порядке
+        возрастания дат
+        """
+        raise NotImplementedError()
+    
+
+    async def save(self, job: models.IngestionJob) -> None:
+        """Добавляет или обновляет запись журнала"""
+        raise NotImplementedError()
+    
+
+    async def enqueue(
+        self,
+        dates: Iterable[datetime.date],
+        requeue: bool = False,
+    ) -> int:
+        """Добавляет в очередь загрузки даты, которых еще нет в журнале
+
+        Если requeue равен True, в очередь возвращаются и даты с записями
+        журнала, кроме загружаемых в данный момент. Возвращает количество
+        добавленных дат
+        """
+        raise NotImplementedError()
+    
+
+    async def claim(
+        self,
+        owner: str,
+        current_datetime: datetime.datetime,
+        lease_duration: datetime.timedelta,
+        max_attempts: int,
+    ) -> Optional[models.IngestionJob]:
+        """Берет в аренду запись журнала с самой ранней датой, которую пора
+        загрузить, или возвращает None, если таких записей нет
+        """
+        raise NotImplementedError()
+    
+
+    async def renew_lease(
+        self,
+        date: datetime.date,
+        owner: str,
+        lease_expires_at: datetime.datetime,
+    ) -> bool:
+        """Продлевает аренду записи журнала указанной даты
+
+        Возвращает False в случае, если запись арендована другим
+        исполнителем или уже освобождена
+        """
+        raise NotImplementedError()
+
+
+class AsyncSqlAlchemyIngestionJobRepository(AsyncIngestionJobsRepository):
+    """Асинхронный репозиторий SQL журнала загрузки файлов данных"""
+    session: sqlalchemy.ext.asyncio.AsyncSession
+
+
+    def __init__(self, session: sqlalchemy.ext.asyncio.AsyncSession) -> None:
+        self.session = session
+    
+
+    async def get(self, date: datetime.date) -> Optional[models.IngestionJob]:
+        """Возвращает запись журнала указанной даты или None в случае,
+        если файл данных этой даты еще не загружался
+        """
+        record = await self.session.get(db_models.IngestionJob, date)
+
+        if record is None:
+            return None
+        
+        return self._to_domain_model(record)
+    
+
+    async def list(
+        self,
+        statuses: Optional[List[str]] = None,
+    ) -> List[models.IngestionJob]:
+        """Возвращает записи журнала с указанными состояниями в порядке
+        возрастания дат
+        """
+        query = select(db_models.IngestionJob)
+
+        if statuses is not None:
+            query = query.where(db_models.IngestionJob.status.in_(statuses))
+        
+        query = query.order_by(db_models.IngestionJob.date)
+        query_result = await self.session.execute(query)
+        return [self._to_domain_model(record) for record in query_result.scalars()]
+    
+
+    async def save(self, job: models.IngestionJob) -> None:
+        """Добавляет или обновляет запись журнала"""
+        await self.session.merge(db_models.IngestionJob(**dataclasses.asdict(job)))
+    
+
+    async def enqueue(
+        self,
+        dates: Iterable[datetime.date],
+        requeue: bool = False,
+    ) -> int:
+        """Добавляет в очередь загрузки даты, которых еще нет в журнале
+
+        Если requeue равен True, в очередь возвращаются и даты с записями
+        журнала, кроме загружаемых в данный момент. Возвращает количество
+        добавленных дат
+        """
+        records = [
+            {'date': date, 'status': models.JOB_STATUS_PENDING, 'attempts': 0}
+            for date in dates
+        ]
+
+        if not records:
+            return 0
+        
+        job = db_models.IngestionJob
+        statement = postgresql.insert(job).values(records)
+
+        if requeue:
+            statement = statement.on_conflict_do_update(
+                index_elements=['date'],
+                set_={'status': models.JOB_STATUS_PENDING, 'next_attempt_at': None},
+                where=job.status != models.JOB_STATUS_RUNNING,
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=['date'])
+        
+        query_result = await self.session.execute(statement.returning(job.date))
+        return len(query_result.all())
+    
+
+    async def claim(
+        self,
+        owner: str,
+        current_datetime: datetime.datetime,
+        lease_duration: datetime.timedelta,
+        max_attempts: int,
+    ) -> Optional[models.IngestionJob]:
+        """Берет в аренду запись журнала с самой ранней датой, которую пора
+        загрузить, или возвращает None, если таких записей нет
+
+        Загрузить пора даты в очереди, неудачные загрузки, время повтора
+        которых наступило, и загрузки, аренда которых истекла. Загрузки
+        без аренды, оставленные консольными приложениями, считаются
+        брошенными, если начались раньше, чем lease_duration назад. Успешные
+        загрузки и даты, за которые нет отчетов, не берутся. Записи,
+        заблокированные другими исполнителями, пропускаются
+        (SELECT ... FOR UPDATE SKIP LOCKED), поэтому одну дату не могут
+        взять два исполнителя
+        """
+        job = db_models.IngestionJob
+        lease_expired = job.lease_expires_at < current_datetime
+        abandoned = and_(
+            job.lease_expires_at.is_(None),
+            or_(
+                job.started_at.is_(None),
+                job.started_at < current_datetime - lease_duration,
+            ),
+        )
+        query = (
+            select(job)
+            .where(or_(job.lease_expires_at.is_(None), lease_expired))
+            .where(or_(
+                job.status == models.JOB_STATUS_PENDING,
+                and_(
+                    job.status == models.JOB_STATUS_FAILED,
+                    job.attempts < max_attempts,
+                    or_(
+                        job.next_attempt_at.is_(None),
+                        job.next_attempt_at <= current_datetime,
+                    ),
+                ),
+                and_(
+                    job.status == models.JOB_STATUS_RUNNING,
+                    or_(lease_expired, abandoned),
+                ),
+            ))
+            .order_by(job.date)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        query_result = await self.session.execute(query)
+        record = query_result.scalar_one_or_none()
+
+        if record is None:
+            return None
+        
+        record.lease_owner = owner
+        record.lease_expires_at = current_datetime + lease_duration
+        return self._to_domain_model(record)
+    
+
+    async def renew_lease(
+        self,
+        date: datetime.date,
+        owner: str,
+        lease_expires_at: datetime.datetime,
+    ) -> bool:
+        """Продлевает аренду записи журнала указанной даты
+
+        Возвращает False в случае, если запись арендована другим
+        исполнителем или уже освобождена
+        """
+        statement = (
+            update(db_models.IngestionJob)
+            .where(db_models.IngestionJob.date == date)
+            .where(db_models.IngestionJob.lease_owner == owner)
+            .values(lease_expires_at=lease_expires_at)
+            .returning(db_models.IngestionJob.date)
+        )
+        query_result = await self.session.execute(statement)
+        return query_result.scalar_one_or_none() is not None
+    
+
+    def _to_domain_model(self, job: db_models.IngestionJob) -> models.IngestionJob:
+        """Преобразует модель базы данных в доменную модель данных"""
+        return models.IngestionJob(
+            date=job.date,
+            status=job.status,
+            attempts=job.attempts,
+            last_error=job.last_error,
+            file_hash=job.file_hash,
+            row_count=job.row_count,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            next_attempt_at=job.next_attempt_at,
+            lease_owner=job.lease_owner,
+            lease_expires_at=job.lease_expires_at,
         )
@@ -6,11 +6,19 @@ import sqlalchemy.ext.asyncio.engine
 from spimex_parser.modules.data_storage.asyncio import repositories
 
 
+DATA_REPOSITORY_CLASSES = {
+    'insert': repositories.AsyncSqlAlchemyTradingResultRepository,
+    'copy': repositories.AsyncCopySqlAlchemyTradingResultRepository,
+    'upsert': repositories.AsyncUpsertSqlAlchemyTradingResultRepository,
+}
+
+
 class AsyncTradingResultsUnitOfWork:
     """Асинхронная единица работы с хранилищем данных о результатах торгов
     со Spimex
     """
     data: repositories.AsyncTradingResultsRepository
+    jobs: repositories.AsyncIngestionJobsRepository
 
 
     async def __aenter__(self) -> 'AsyncTradingResultsUnitOfWork':
@@ -32,31 +40,52 @@ class AsyncTradingResultsUnitOfWork:
 class AsyncSqlAlchemyTradingResultsUnitOfWork(AsyncTradingResultsUnitOfWork):
     """Асинхронная диница работы с хранилищем данных о результатах торгов
     со Spimex
+
+    Способ добавления пакетов и частей результатов торгов задается
+    load_method: insert - запросами вставки, copy - командой COPY PostgreSQL,
+    upsert - запросами вставки с обновлением уже добавленных записей
     """
     session_factory: Callable[[], sqlalchemy.ext.asyncio.AsyncSession]
     session: sqlalchemy.ext.asyncio.AsyncSession
+    load_method: str
 
 
-    def __init__(self, engine: sqlalchemy.ext.asyncio.engine.AsyncEngine) -> None:
+    def __init__(
+        self,
+        engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+        load_method: str = 'insert',
+    ) -> None:
         self.session_factory = sqlalchemy.ext.asyncio.async_sessionmaker(
             bind=engine,
             expire_on_commit=False,
         )
+        self.load_method = load_method
     
 
     async def __aenter__(self) -> AsyncTradingResultsUnitOfWork:
         self.session = self.session_factory()
-        self.data = repositories.AsyncSqlAlchemyTradingResultRepository(self.session)
+        self.data = self._create_data_repository()
+        self.jobs = repositories.AsyncSqlAlchemyIngestionJobRepository(self.session)
         return self
     
 
+    def _create_data_repository(
+        self,
+    ) -> repositories.AsyncTradingResultsRepository:
+        """Создает репозиторий результатов торгов в текущей сессии"""
+        repository_class = DATA_REPOSITORY_CLASSES[self.load_method]
+        return repository_class(self.session)
+    
+
     async def __aexit__(self, *args, **kwargs) -> None:
         await self.session.close()
     
 
     async def commit(self) -> None:
+        await self.data.flush()
         await self.session.commit()
     
 
     async def rollback(self) -> None:
+        self.data.discard()
         await self.session.rollback()
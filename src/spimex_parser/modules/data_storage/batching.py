@@ -0,0 +1,249 @@
+import dataclasses
+import datetime
+import time
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from spimex_parser.domain import models
+from spimex_parser.modules.data_storage import filters
+from spimex_parser.modules.data_storage import unit_of_work
+
+
+@dataclasses.dataclass
+class PendingReport:
+    """Разобранный файл данных, ожидающий записи в базу данных
+
+    В context можно передать объект вызывающей стороны, например, единицу
+    работы разбора файла, которую нужно зафиксировать после записи
+    """
+    ingestion_job: models.IngestionJob
+    batches: List[models.TradingResultBatch]
+    file_hash: Optional[str] = None
+    context: Any = None
+
+
+    @property
+    def row_count(self) -> int:
+        """Число результатов торгов во всех пакетах файла"""
+        return sum(len(batch) for batch in self.batches)
+
+
+    def get_keys(self) -> Set[Tuple[str, str]]:
+        """Возвращает коды инструментов и единицы измерения результатов
+        торгов файла
+        """
+        return {
+            (exchange_product_id, batch.unit)
+            for batch in self.batches
+            for exchange_product_id in batch.exchange_product_id
+        }
+
+
+@dataclasses.dataclass
+class WriteBatchResult:
+    """Итоги записи пакета файлов данных одной транзакцией
+
+    row_count - число добавленных, измененных и удаленных записей
+    """
+    reports: List[PendingReport]
+    row_count: int
+    elapsed_time: float
+
+
+    def format(self) -> str:
+        """Возвращает итоги записи в виде строки"""
+        dates = [report.ingestion_job.date for report in self.reports]
+        return (
+            f'Committed {self.row_count} new, changed or deleted rows of {len(self.reports)} reports '
+            f'({min(dates)} - {max(dates)}) in {self.elapsed_time:.2f}s'
+        )
+
+
+class RowCountMismatchError(Exception):
+    """Число сохраненных в базе данных записей не совпадает с ожидаемым"""
+
+
+class BatchWriteError(Exception):
+    """Ошибка записи пакета файлов данных
+
+    Ни один файл пакета не записан, исходная ошибка доступна в __cause__
+    """
+    reports: List[PendingReport]
+
+
+    def __init__(self, reports: List[PendingReport], error: Exception) -> None:
+        super().__init__(f'Could not write {len(reports)} reports: {error!r}')
+        self.reports = reports
+
+
+class WriteBatch:
+    """Пакет файлов данных, накапливаемых для записи одной транзакцией
+
+    Пакет считается заполненным, когда число результатов торгов в нем
+    достигает max_rows или с добавления первого файла прошло max_delay
+    секунд
+    """
+    max_rows: int
+    max_delay: float
+    reports: List[PendingReport]
+    row_count: int
+    started_at: Optional[float]
+
+
+    def __init__(self, max_rows: int, max_delay: float) -> None:
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.reports = []
+        self.row_count = 0
+        self.started_at = None
+
+
+    def add(self, report: PendingReport) -> None:
+        """Добавляет файл данных в пакет"""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        self.reports.append(report)
+        self.row_count += report.row_count
+
+
+    def is_full(self) -> bool:
+        """Проверяет, пора ли записать пакет"""
+        if self.started_at is None:
+            return False
+
+        if self.row_count >= self.max_rows:
+            return True
+
+        return self.get_time_left() <= 0
+
+
+    def get_time_left(self) -> float:
+        """Возвращает число секунд, оставшихся до записи пакета по времени
+
+        Для пустого пакета возвращает max_delay
+        """
+        if self.started_at is None:
+            return self.max_delay
+
+        return self.started_at + self.max_delay - time.monotonic()
+
+
+    def take(self) -> List[PendingReport]:
+        """Возвращает накопленные файлы данных и очищает пакет"""
+        reports = self.reports
+        self.reports = []
+        self.row_count = 0
+        self.started_at = None
+        return reports
+
+
+class TradingResultsBatchWriter:
+    """Запись результатов торгов из нескольких файлов данных пакетами
+
+    Результаты торгов файлов накапливаются в пакете и записываются одной
+    транзакцией вместе с отметками об успешной загрузке в журнале.
+    Файл считается полным отчетом за свою дату, поэтому записи даты,
+    которых нет в файле (например, исключенные из переопубликованного
+    отчета), удаляются. Перед фиксацией транзакции число записей каждой
+    даты в базе данных сверяется с числом результатов торгов в файле
+    этой даты
+    """
+    uow_factory: Callable[[], ContextManager[unit_of_work.TradingResultsUnitOfWork]]
+    batch: WriteBatch
+
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], ContextManager[unit_of_work.TradingResultsUnitOfWork]],
+        max_rows: int,
+        max_delay: float,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.batch = WriteBatch(max_rows, max_delay)
+
+
+    def add(self, report: PendingReport) -> Optional[WriteBatchResult]:
+        """Добавляет файл данных в пакет и записывает заполненный пакет
+
+        Возвращает итоги записи или None, если пакет еще не записан
+        """
+        self.batch.add(report)
+
+        if not self.batch.is_full():
+            return None
+
+        return self.flush()
+
+
+    def flush(self) -> Optional[WriteBatchResult]:
+        """Записывает накопленные файлы данных
+
+        Возвращает итоги записи или None, если пакет пуст
+        """
+        reports = self.batch.take()
+
+        if not reports:
+            return None
+
+        started_at = time.perf_counter()
+
+        try:
+            row_count = self._write(reports)
+        except Exception as e:
+            raise BatchWriteError(reports, e) from e
+
+        return WriteBatchResult(reports, row_count, time.perf_counter() - started_at)
+
+
+    def _write(self, reports: List[PendingReport]) -> int:
+        """Записывает файлы данных одной транзакцией и возвращает число
+        добавленных, измененных и удаленных записей
+        """
+        with self.uow_factory() as uow:
+            row_count = 0
+
+            for report in reports:
+                for batch in report.batches:
+                    row_count += uow.data.add_batch(batch)
+
+                row_count += uow.data.delete_stale(
+                    report.ingestion_job.date,
+                    report.get_keys(),
+                )
+                stored_count = uow.data.count(get_report_filter(report))
+                check_row_count(report, stored_count)
+                report.ingestion_job.complete(
+                    datetime.datetime.now(),
+                    report.file_hash,
+                    stored_count,
+                )
+                uow.jobs.save(report.ingestion_job)
+
+            uow.commit()
+
+        return row_count
+
+
+def get_report_filter(report: PendingReport) -> filters.TradingResultFilter:
+    """Возвращает фильтр результатов торгов даты файла данных"""
+    return filters.TradingResultFilter(
+        start_date=report.ingestion_job.date,
+        end_date=report.ingestion_job.date,
+    )
+
+
+def check_row_count(report: PendingReport, stored_count: int) -> None:
+    """Сверяет число записей даты файла в базе данных с числом результатов
+    торгов файла
+    """
+    if stored_count != report.row_count:
+        raise RowCountMismatchError(
+            f'Expected {report.row_count} rows for {report.ingestion_job.date}, '
+            f'database stores {stored_count}'
+        )
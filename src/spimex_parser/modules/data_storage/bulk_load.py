@@ -0,0 +1,304 @@
+import datetime
+import io
+import uuid
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+from spimex_parser.database import models as db_models
+from spimex_parser.domain import models
+
+
+TABLE_NAME = db_models.TradingResult.__tablename__
+COPY_COLUMNS = (
+    'id',
+    'exchange_product_id',
+    'exchange_product_name',
+    'oil_id',
+    'delivery_basis_id',
+    'delivery_basis_name',
+    'delivery_type_id',
+    'volume',
+    'total',
+    'count',
+    'date',
+    'created_on',
+    'updated_on',
+    'unit',
+)
+STAGING_TABLE_NAME = f'{TABLE_NAME}_staging'
+CREATE_STAGING_TABLE_STATEMENT = (
+    f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE_NAME} '
+    f'(LIKE {TABLE_NAME} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'
+)
+CLEAR_STAGING_TABLE_STATEMENT = f'TRUNCATE {STAGING_TABLE_NAME}'
+COPY_STATEMENT = (
+    f'COPY {STAGING_TABLE_NAME} ({", ".join(COPY_COLUMNS)}) FROM STDIN'
+)
+UPSERT_VALUE_COLUMNS = (
+    'exchange_product_name',
+    'oil_id',
+    'delivery_basis_id',
+    'delivery_basis_name',
+    'delivery_type_id',
+    'volume',
+    'total',
+    'count',
+)
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+CopyRow = Tuple[Any, ...]
+TradingResultKey = Tuple[str, str]
+RecordKey = Tuple[datetime.date, str, str]
+
+
+def batch_to_rows(trading_results: models.TradingResultBatch) -> Iterator[CopyRow]:
+    """Последовательно создает строки для копирования из пакета данных
+    в порядке столбцов COPY_COLUMNS
+    """
+    columns = zip(
+        trading_results.exchange_product_id,
+        trading_results.exchange_product_name,
+        trading_results.oil_id,
+        trading_results.delivery_basis_id,
+        trading_results.delivery_basis_name,
+        trading_results.delivery_type_id,
+        trading_results.volume,
+        trading_results.total,
+        trading_results.count,
+    )
+
+    for row in columns:
+        yield (
+            uuid.uuid4(),
+            *row,
+            trading_results.date,
+            trading_results.created_on,
+            trading_results.updated_on,
+            trading_results.unit,
+        )
+
+
+def result_to_row(trading_result: models.TradingResult) -> CopyRow:
+    """Преобразует результат торгов в строку для копирования в порядке
+    столбцов COPY_COLUMNS
+    """
+    return (
+        trading_result.id,
+        trading_result.exchange_product_id,
+        trading_result.exchange_product_name,
+        trading_result.oil_id,
+        trading_result.delivery_basis_id,
+        trading_result.delivery_basis_name,
+        trading_result.delivery_type_id,
+        trading_result.volume,
+        trading_result.total,
+        trading_result.count,
+        trading_result.date,
+        trading_result.created_on,
+        trading_result.updated_on,
+        trading_result.unit,
+    )
+
+
+def batch_to_records(
+    trading_results: models.TradingResultBatch,
+) -> List[Dict[str, Any]]:
+    """Преобразует пакет данных в список записей для массовой вставки"""
+    return [
+        dict(zip(COPY_COLUMNS, row))
+        for row in batch_to_rows(trading_results)
+    ]
+
+
+def result_to_record(trading_result: models.TradingResult) -> Dict[str, Any]:
+    """Преобразует результат торгов в запись для массовой вставки
+    с новым идентификатором
+    """
+    record = dict(zip(COPY_COLUMNS, result_to_row(trading_result)))
+    record['id'] = uuid.uuid4()
+    return record
+
+
+def format_rows(rows: Iterable[CopyRow]) -> 'CopyRowsReader':
+    """Возвращает файлоподобный объект, из которого строки читаются
+    в текстовом формате команды COPY
+    """
+    return CopyRowsReader(rows)
+
+
+def format_row(row: CopyRow) -> str:
+    """Форматирует строку в текстовом формате команды COPY"""
+    return '\t'.join(format_value(value) for value in row) + '\n'
+
+
+def format_value(value: Any) -> str:
+    """Форматирует значение столбца в текстовом формате команды COPY"""
+    if value is None:
+        return '\\N'
+
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    return str(value).translate(COPY_ESCAPES)
+
+
+def create_upsert_statement() -> postgresql.Insert:
+    """Создает запрос вставки результатов торгов с обновлением записей
+    с той же датой, кодом инструмента и единицей измерения
+
+    Существующая запись обновляется, а ее updated_on изменяется, только
+    если изменилось хотя бы одно значение. Неизмененные записи
+    не перезаписываются. Запрос возвращает id добавленных и измененных
+    записей
+    """
+    return update_on_conflict(postgresql.insert(db_models.TradingResult))
+
+
+def create_merge_staging_statement() -> postgresql.Insert:
+    """Создает запрос переноса результатов торгов из промежуточной таблицы
+    в таблицу результатов торгов с обновлением записей с той же датой,
+    кодом инструмента и единицей измерения
+
+    Записи обновляются так же, как запросом create_upsert_statement.
+    Запрос возвращает id добавленных и измененных записей
+    """
+    staging_table = sqlalchemy.table(
+        STAGING_TABLE_NAME,
+        *(sqlalchemy.column(column_name) for column_name in COPY_COLUMNS),
+    )
+    statement = postgresql.insert(db_models.TradingResult).from_select(
+        COPY_COLUMNS,
+        sqlalchemy.select(staging_table),
+    )
+    return update_on_conflict(statement)
+
+
+def update_on_conflict(statement: postgresql.Insert) -> postgresql.Insert:
+    """Добавляет к запросу вставки результатов торгов обновление
+    измененных записей с той же датой, кодом инструмента и единицей
+    измерения и возврат id добавленных и измененных записей
+    """
+    columns = db_models.TradingResult.__table__.columns
+    current_values = sqlalchemy.tuple_(
+        *(columns[column_name] for column_name in UPSERT_VALUE_COLUMNS)
+    )
+    new_values = sqlalchemy.tuple_(
+        *(statement.excluded[column_name] for column_name in UPSERT_VALUE_COLUMNS)
+    )
+    updated_columns = {
+        column_name: statement.excluded[column_name]
+        for column_name in (*UPSERT_VALUE_COLUMNS, 'updated_on')
+    }
+    statement = statement.on_conflict_do_update(
+        constraint=db_models.TRADING_RESULT_KEY_CONSTRAINT,
+        set_=updated_columns,
+        where=current_values.is_distinct_from(new_values),
+    )
+    return statement.returning(db_models.TradingResult.id)
+
+
+def create_delete_stale_statement(
+    date: datetime.date,
+    keys: Set[TradingResultKey],
+) -> sqlalchemy.Delete:
+    """Создает запрос удаления результатов торгов указанной даты, ключей
+    которых (кода инструмента и единицы измерения) нет среди указанных
+
+    Запрос возвращает id удаленных записей
+    """
+    trading_result = db_models.TradingResult
+    statement = sqlalchemy.delete(trading_result).where(trading_result.date == date)
+
+    if keys:
+        statement = statement.where(
+            sqlalchemy.tuple_(
+                trading_result.exchange_product_id,
+                trading_result.unit,
+            ).not_in(sorted(keys))
+        )
+
+    return statement.returning(trading_result.id)
+
+
+def get_record_key(record: Dict[str, Any]) -> RecordKey:
+    """Возвращает ключ записи для массовой вставки: дату, код инструмента
+    и единицу измерения
+    """
+    return (record['date'], record['exchange_product_id'], record['unit'])
+
+
+def create_select_ids_statement(keys: Iterable[RecordKey]) -> sqlalchemy.Select:
+    """Создает запрос id результатов торгов с указанными ключами (датой,
+    кодом инструмента и единицей измерения)
+
+    Запрос возвращает ключ и id каждой найденной записи
+    """
+    trading_result = db_models.TradingResult
+    key_columns = (
+        trading_result.date,
+        trading_result.exchange_product_id,
+        trading_result.unit,
+    )
+    return sqlalchemy.select(*key_columns, trading_result.id).where(
+        sqlalchemy.tuple_(*key_columns).in_(sorted(set(keys)))
+    )
+
+
+class CopyRowsReader(io.TextIOBase):
+    """Файлоподобный объект, из которого строки читаются в текстовом
+    формате команды COPY
+
+    Строки форматируются по мере чтения, поэтому в памяти одновременно
+    находится только запрошенная часть данных, а не весь пакет
+    """
+    _lines: Iterator[str]
+    _buffer: str
+
+
+    def __init__(self, rows: Iterable[CopyRow]) -> None:
+        self._lines = (format_row(row) for row in rows)
+        self._buffer = ''
+
+
+    def readable(self) -> bool:
+        return True
+
+
+    def read(self, size: Optional[int] = -1) -> str:
+        """Возвращает не больше size символов или, если size не указан,
+        все оставшиеся строки
+        """
+        if size is None or size < 0:
+            contents = self._buffer + ''.join(self._lines)
+            self._buffer = ''
+            return contents
+
+        parts = [self._buffer]
+        length = len(self._buffer)
+
+        while length < size:
+            line = next(self._lines, None)
+
+            if line is None:
+                break
+
+            parts.append(line)
+            length += len(line)
+
+        contents = ''.join(parts)
+        self._buffer = contents[size:]
+        return contents[:size]
@@ -10,3 +10,4 @@ class TradingResultFilter:
     delivery_basis_id: Optional[str] = None
     start_date: Optional[datetime.date] = None
     end_date: Optional[datetime.date] = None
+    unit: Optional[str] = None
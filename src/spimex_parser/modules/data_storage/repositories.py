@@ -1,13 +1,23 @@
+import dataclasses
+import datetime
 import uuid
+from typing import Any
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 
+import sqlalchemy
 import sqlalchemy.orm
 from sqlalchemy import asc
 from sqlalchemy import desc
 
 from spimex_parser.database import models as db_models
 from spimex_parser.domain import models
+from spimex_parser.modules import string_util
+from spimex_parser.modules.data_storage import bulk_load
 from spimex_parser.modules.data_storage import filters
 
 
@@ -35,6 +45,38 @@ class TradingResultsRepository:
         raise NotImplementedError()
     
 
+    def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных записей
+        """
+        raise NotImplementedError()
+    
+
+    def add_chunks(
+        self,
+        chunks: Iterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Возвращает количество добавленных записей
+        """
+        raise NotImplementedError()
+    
+
+    def delete_stale(
+        self,
+        date: datetime.date,
+        keys: Set[Tuple[str, str]],
+    ) -> int:
+        """Удаляет результаты торгов указанной даты, кодов инструментов
+        и единиц измерения которых нет среди указанных ключей
+
+        Возвращает количество удаленных записей
+        """
+        raise NotImplementedError()
+    
+
     def list(
         self,
         result_filter: Optional[filters.TradingResultFilter] = None,
@@ -43,6 +85,31 @@ class TradingResultsRepository:
         ascending: bool = True,
     ) -> List[models.TradingResult]:
         raise NotImplementedError()
+    
+
+    def list_dates(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> List[datetime.date]:
+        """Возвращает даты торгов, результаты которых есть в репозитории,
+        в порядке возрастания
+        """
+        raise NotImplementedError()
+    
+
+    def get_last_date(self) -> Optional[datetime.date]:
+        """Возвращает последнюю дату торгов, результаты которой есть
+        в репозитории, или None, если репозиторий пуст
+        """
+        raise NotImplementedError()
+    
+
+    def count(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> int:
+        """Возвращает количество результатов торгов в репозитории"""
+        raise NotImplementedError()
 
 
 class SqlAlchemyTradingResultRepository(TradingResultsRepository):
@@ -102,6 +169,68 @@ class SqlAlchemyTradingResultRepository(TradingResultsRepository):
         return added_results
     
 
+    def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Записи добавляются одним запросом массовой вставки, минуя создание
+        объектов модели базы данных. Возвращает количество добавленных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        records = bulk_load.batch_to_records(trading_results)
+        self.session.execute(sqlalchemy.insert(db_models.TradingResult), records)
+
+        return len(records)
+    
+
+    def add_chunks(
+        self,
+        chunks: Iterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Каждая часть добавляется отдельным запросом массовой вставки сразу
+        по получении, поэтому в памяти одновременно находится только одна
+        часть. Возвращает количество добавленных записей
+        """
+        added_count = 0
+
+        for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            records = [bulk_load.result_to_record(res) for res in chunk]
+            self.session.execute(
+                sqlalchemy.insert(db_models.TradingResult),
+                records,
+            )
+            added_count += len(records)
+        
+        return added_count
+    
+
+    def delete_stale(
+        self,
+        date: datetime.date,
+        keys: Set[Tuple[str, str]],
+    ) -> int:
+        """Удаляет результаты торгов указанной даты, кодов инструментов
+        и единиц измерения которых нет среди указанных ключей
+
+        Возвращает количество удаленных записей
+        """
+        statement = bulk_load.create_delete_stale_statement(date, keys)
+        result = self.session.execute(
+            statement,
+            execution_options={'synchronize_session': False},
+        )
+        return len(result.all())
+    
+
     def _from_domain_model(
         self,
         trading_result: models.TradingResult,
@@ -121,6 +250,7 @@ class SqlAlchemyTradingResultRepository(TradingResultsRepository):
             date=trading_result.date,
             created_on=trading_result.created_on,
             updated_on=trading_result.updated_on,
+            unit=trading_result.unit,
         )
     
 
@@ -152,6 +282,44 @@ class SqlAlchemyTradingResultRepository(TradingResultsRepository):
 
         db_trading_results = query.all()
         return [self._to_domain_model(res) for res in db_trading_results]
+    
+
+    def list_dates(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> List[datetime.date]:
+        """Возвращает даты торгов, результаты которых есть в репозитории,
+        в порядке возрастания
+        """
+        query = self.session.query(db_models.TradingResult)
+
+        if result_filter is not None:
+            query = self._filter_query(query, result_filter=result_filter)
+        
+        date_column = db_models.TradingResult.date
+        query = query.with_entities(date_column).distinct().order_by(date_column)
+        return [date for date, in query.all()]
+    
+
+    def get_last_date(self) -> Optional[datetime.date]:
+        """Возвращает последнюю дату торгов, результаты которой есть
+        в репозитории, или None, если репозиторий пуст
+        """
+        query = self.session.query(sqlalchemy.func.max(db_models.TradingResult.date))
+        return query.scalar()
+    
+
+    def count(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> int:
+        """Возвращает количество результатов торгов в репозитории"""
+        query = self.session.query(db_models.TradingResult)
+
+        if result_filter is not None:
+            query = self._filter_query(query, result_filter=result_filter)
+        
+        return query.count()
 
 
     def _filter_query(
@@ -182,6 +350,9 @@ class SqlAlchemyTradingResultRepository(TradingResultsRepository):
                 db_models.TradingResult.date <= result_filter.end_date,
             )
         
+        if result_filter.unit is not None:
+            query = query.filter_by(unit=result_filter.unit)
+        
         return query
 
 
@@ -216,18 +387,275 @@ class SqlAlchemyTradingResultRepository(TradingResultsRepository):
         self,
         trading_result: db_models.TradingResult,
     ) -> models.TradingResult:
+        """Преобразует модель базы данных в доменную модель данных
+
+        Повторяющиеся строковые значения интернируются
+        """
         return models.TradingResult(
             id=trading_result.id,
-            exchange_product_id=trading_result.exchange_product_id,
-            exchange_product_name=trading_result.exchange_product_name,
-            oil_id=trading_result.oil_id,
-            delivery_basis_id=trading_result.delivery_basis_id,
-            delivery_basis_name=trading_result.delivery_basis_name,
-            delivery_type_id=trading_result.delivery_type_id,
+            exchange_product_id=string_util.intern_string(trading_result.exchange_product_id),
+            exchange_product_name=string_util.intern_string(trading_result.exchange_product_name),
+            oil_id=string_util.intern_string(trading_result.oil_id),
+            delivery_basis_id=string_util.intern_string(trading_result.delivery_basis_id),
+            delivery_basis_name=string_util.intern_string(trading_result.delivery_basis_name),
+            delivery_type_id=string_util.intern_string(trading_result.delivery_type_id),
             volume=trading_result.volume,
             total=trading_result.total,
             count=trading_result.count,
             date=trading_result.date,
             created_on=trading_result.created_on,
             updated_on=trading_result.updated_on,
+            unit=string_util.intern_string(trading_result.unit),
+        )
+
+
+class UpsertSqlAlchemyTradingResultRepository(SqlAlchemyTradingResultRepository):
+    """Репозиторий SQL хранилища данных о результатах торгов со Spimex,
+    обновляющий уже добавленные записи
+
+    Пакеты и части данных добавляются запросом INSERT ... ON CONFLICT
+    DO UPDATE по дате, коду инструмента и единице измерения, поэтому
+    повторное добавление результатов торгов той же даты не создает
+    дубликатов. Методы добавления пакетов и частей возвращают количество
+    добавленных и измененных записей.
+
+    Отдельные результаты торгов и их списки добавляются тем же запросом,
+    после чего из репозитория запрашиваются id их записей, в том числе
+    добавленных ранее
+    """
+    def add(self, trading_result: models.TradingResult) -> models.TradingResult:
+        """Добавляет или обновляет данные о результатах сделки в репозитории"""
+        return self.add_bulk([trading_result])[0]
+    
+
+    def add_bulk(
+        self,
+        trading_results: List[models.TradingResult],
+    ) -> List[models.TradingResult]:
+        """Добавляет или обновляет список данных о результатах торгов
+        в репозитории
+        """
+        if any(res for res in trading_results if res.id is not None):
+            raise ValueError('You are not allowed to specify record ID manually')
+        
+        if not trading_results:
+            return []
+        
+        records = [bulk_load.result_to_record(res) for res in trading_results]
+        self._upsert_records(records)
+        record_ids = self._get_record_ids(records)
+
+        return [
+            dataclasses.replace(res, id=record_ids[bulk_load.get_record_key(record)])
+            for res, record in zip(trading_results, records)
+        ]
+    
+
+    def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных и измененных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        return self._upsert_records(bulk_load.batch_to_records(trading_results))
+    
+
+    def add_chunks(
+        self,
+        chunks: Iterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Возвращает количество добавленных и измененных записей
+        """
+        changed_count = 0
+
+        for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            changed_count += self._upsert_records([bulk_load.result_to_record(res) for res in chunk])
+        
+        return changed_count
+    
+
+    def _upsert_records(self, records: List[Dict[str, Any]]) -> int:
+        """Добавляет или обновляет записи и возвращает количество
+        добавленных и измененных записей
+        """
+        result = self.session.execute(bulk_load.create_upsert_statement(), records)
+        return len(result.all())
+    
+
+    def _get_record_ids(
+        self,
+        records: List[Dict[str, Any]],
+    ) -> Dict[bulk_load.RecordKey, uuid.UUID]:
+        """Возвращает id записей репозитория с ключами указанных записей"""
+        statement = bulk_load.create_select_ids_statement(
+            bulk_load.get_record_key(record) for record in records
+        )
+        result = self.session.execute(statement)
+        record_ids: Dict[bulk_load.RecordKey, uuid.UUID] = {}
+
+        for date, exchange_product_id, unit, trading_result_id in result:
+            record_ids[(date, exchange_product_id, unit)] = trading_result_id
+        
+        return record_ids
+
+
+class CopySqlAlchemyTradingResultRepository(UpsertSqlAlchemyTradingResultRepository):
+    """Репозиторий SQL хранилища данных о результатах торгов со Spimex,
+    добавляющий записи командой COPY
+
+    Пакеты и части данных передаются PostgreSQL одним потоком в текстовом
+    формате команды COPY во временную промежуточную таблицу в транзакции
+    сессии, минуя создание объектов модели базы данных, а затем переносятся
+    в таблицу результатов торгов запросом INSERT ... SELECT ... ON CONFLICT
+    DO UPDATE. Поэтому, как и в репозитории с обновлением записей,
+    повторное добавление результатов торгов той же даты не создает
+    дубликатов, а методы добавления возвращают количество добавленных
+    и измененных записей
+    """
+    def add_batch(self, trading_results: models.TradingResultBatch) -> int:
+        """Добавляет пакет данных о результатах торгов в репозиторий
+
+        Возвращает количество добавленных и измененных записей
+        """
+        if not len(trading_results):
+            return 0
+        
+        return self._copy_rows(bulk_load.batch_to_rows(trading_results))
+    
+
+    def add_chunks(
+        self,
+        chunks: Iterable[List[models.TradingResult]],
+    ) -> int:
+        """Добавляет данные о результатах торгов, поступающие частями
+
+        Каждая часть копируется отдельной командой COPY сразу по получении.
+        Возвращает количество добавленных и измененных записей
+        """
+        added_count = 0
+
+        for chunk in chunks:
+            if any(res for res in chunk if res.id is not None):
+                raise ValueError('You are not allowed to specify record ID manually')
+            
+            if not chunk:
+                continue
+            
+            added_count += self._copy_rows(
+                bulk_load.result_to_row(dataclasses.replace(res, id=uuid.uuid4()))
+                for res in chunk
+            )
+        
+        return added_count
+    
+
+    def _copy_rows(self, rows: Iterable[bulk_load.CopyRow]) -> int:
+        """Копирует строки через copy_expert во временную промежуточную
+        таблицу и переносит их в таблицу результатов торгов
+
+        Возвращает количество добавленных и измененных записей
+        """
+        self.session.execute(sqlalchemy.text(bulk_load.CREATE_STAGING_TABLE_STATEMENT))
+        connection = self.session.connection().connection.dbapi_connection
+
+        with connection.cursor() as cursor: # type: ignore
+            cursor.copy_expert(bulk_load.COPY_STATEMENT, bulk_load.format_rows(rows))
+        
+        result = self.session.execute(bulk_load.create_merge_staging_statement())
+        changed_count = len(result.all())
+        self.session.execute(sqlalchemy.text(bulk_load.CLEAR_STAGING_TABLE_STATEMENT))
+
+        return changed_count
+
+
+class IngestionJobsRepository:
+    """Репозиторий журнала загрузки файлов данных"""
+    def get(self, date: datetime.date) -> Optional[models.IngestionJob]:
+        """Возвращает запись журнала указанной даты или None в случае,
+        если файл данных этой даты еще не загружался
+        """
+        raise NotImplementedError()
+    
+
+    def list(
+        self,
+        statuses: Optional[List[str]] = None,
+    ) -> List[models.IngestionJob]:
+        """Возвращает записи журнала с указанными состояниями в порядке
+        возрастания дат
+        """
+        raise NotImplementedError()
+    
+
+    def save(self, job: models.IngestionJob) -> None:
+        """Добавляет или обновляет запись журнала"""
+        raise NotImplementedError()
+
+
+class SqlAlchemyIngestionJobRepository(IngestionJobsRepository):
+    """Репозиторий SQL журнала загрузки файлов данных"""
+    session: sqlalchemy.orm.Session
+
+
+    def __init__(self, session: sqlalchemy.orm.Session) -> None:
+        self.session = session
+    
+
+    def get(self, date: datetime.date) -> Optional[models.IngestionJob]:
+        """Возвращает запись журнала указанной даты или None в случае,
+        если файл данных этой даты еще не загружался
+        """
+        record = self.session.get(db_models.IngestionJob, date)
+
+        if record is None:
+            return None
+        
+        return self._to_domain_model(record)
+    
+
+    def list(
+        self,
+        statuses: Optional[List[str]] = None,
+    ) -> List[models.IngestionJob]:
+        """Возвращает записи журнала с указанными состояниями в порядке
+        возрастания дат
+        """
+        query = self.session.query(db_models.IngestionJob)
+
+        if statuses is not None:
+            query = query.filter(db_models.IngestionJob.status.in_(statuses))
+        
+        query = query.order_by(db_models.IngestionJob.date)
+        return [self._to_domain_model(record) for record in query.all()]
+    
+
+    def save(self, job: models.IngestionJob) -> None:
+        """Добавляет или обновляет запись журнала"""
+        self.session.merge(db_models.IngestionJob(**dataclasses.asdict(job)))
+    
+
+    def _to_domain_model(self, job: db_models.IngestionJob) -> models.IngestionJob:
+        """Преобразует модель базы данных в доменную модель данных"""
+        return models.IngestionJob(
+            date=job.date,
+            status=job.status,
+            attempts=job.attempts,
+            last_error=job.last_error,
+            file_hash=job.file_hash,
+            row_count=job.row_count,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            next_attempt_at=job.next_attempt_at,
+            lease_owner=job.lease_owner,
+            lease_expires_at=job.lease_expires_at,
         )
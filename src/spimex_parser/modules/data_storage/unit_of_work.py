@@ -6,9 +6,17 @@ import sqlalchemy.orm
 from spimex_parser.modules.data_storage import repositories
 
 
+DATA_REPOSITORY_CLASSES = {
+    'insert': repositories.SqlAlchemyTradingResultRepository,
+    'copy': repositories.CopySqlAlchemyTradingResultRepository,
+    'upsert': repositories.UpsertSqlAlchemyTradingResultRepository,
+}
+
+
 class TradingResultsUnitOfWork:
     """Единица работы с хранилищем данных о результатах торгов со Spimex"""
     data: repositories.TradingResultsRepository
+    jobs: repositories.IngestionJobsRepository
 
 
     def __enter__(self) -> 'TradingResultsUnitOfWork':
@@ -28,21 +36,39 @@ class TradingResultsUnitOfWork:
 
 
 class SqlAlchemyTradingResultsUnitOfWork(TradingResultsUnitOfWork):
-    """Единица работы с хранилищем данных о результатах торгов со Spimex"""
+    """Единица работы с хранилищем данных о результатах торгов со Spimex
+
+    Способ добавления результатов торгов задается load_method: insert -
+    запросами вставки, copy - командой COPY PostgreSQL, upsert - запросами
+    вставки с обновлением уже добавленных записей
+    """
     session_factory: Callable[[], sqlalchemy.orm.Session]
     session: sqlalchemy.orm.Session
+    load_method: str
 
 
-    def __init__(self, engine: sqlalchemy.engine.Engine) -> None:
+    def __init__(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        load_method: str = 'insert',
+    ) -> None:
         self.session_factory = sqlalchemy.orm.sessionmaker(bind=engine)
+        self.load_method = load_method
     
 
     def __enter__(self) -> TradingResultsUnitOfWork:
         self.session = self.session_factory()
-        self.data = repositories.SqlAlchemyTradingResultRepository(self.session)
+        self.data = self._create_data_repository()
+        self.jobs = repositories.SqlAlchemyIngestionJobRepository(self.session)
         return self
     
 
+    def _create_data_repository(self) -> repositories.TradingResultsRepository:
+        """Создает репозиторий результатов торгов в текущей сессии"""
+        repository_class = DATA_REPOSITORY_CLASSES[self.load_method]
+        return repository_class(self.session)
+    
+
     def __exit__(self, *args, **kwargs) -> None:
         self.session.close()
     
@@ -1,5 +1,8 @@
 import datetime
 from typing import Generator
+from typing import Optional
+from typing import Tuple
+
 
 def datetime_range(
     start: datetime.datetime,
@@ -11,3 +14,30 @@ def datetime_range(
     while current_date < end:
         yield current_date
         current_date += datetime.timedelta(days=1)
+
+
+def get_incremental_start_date(
+    last_date: Optional[datetime.date],
+    default_start_date: datetime.date,
+) -> datetime.date:
+    """Возвращает первую дату, следующую за последней обработанной
+
+    Если обработанных дат нет, возвращает дату начала по умолчанию
+    """
+    if last_date is None:
+        return default_start_date
+    
+    return last_date + datetime.timedelta(days=1)
+
+
+def get_datetime_bounds(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    time: datetime.time,
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Возвращает границы диапазона datetime_range, включающего обе
+    указанные даты, с указанным временем
+    """
+    start = datetime.datetime.combine(start_date, time)
+    end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), time)
+    return start, end
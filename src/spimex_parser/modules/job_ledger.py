@@ -0,0 +1,128 @@
+import datetime
+from collections.abc import Iterable
+from typing import List
+
+from spimex_parser.domain import models
+
+
+FINAL_STATUSES = frozenset({models.JOB_STATUS_COMPLETED, models.JOB_STATUS_MISSING})
+
+
+class MissingReportError(Exception):
+    """Сервер подтвердил, что отчета за дату нет
+
+    Такая загрузка отмечается в журнале окончательным состоянием
+    и не повторяется
+    """
+
+
+class JobRetryPolicy:
+    """Правила выбора дат для загрузки по журналу загрузки файлов данных
+
+    Успешно загруженные даты и даты, за которые нет отчетов, пропускаются.
+    Неудачные загрузки образуют
+    список недоставленных файлов и повторяются с экспоненциально растущей
+    задержкой, пока число попыток не достигнет max_attempts. Загрузки,
+    оставшиеся в состоянии выполнения после аварийного завершения
+    предыдущего запуска, повторяются сразу. Даты, взятые в работу
+    исполнителями очереди загрузки, пропускаются до истечения аренды
+    """
+    max_attempts: int
+    base_delay: datetime.timedelta
+    max_delay: datetime.timedelta
+
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: datetime.timedelta,
+        max_delay: datetime.timedelta,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def get_retry_delay(self, attempts: int) -> datetime.timedelta:
+        """Возвращает задержку перед следующей попыткой после указанного
+        числа неудачных попыток
+        """
+        return min(self.base_delay * 2 ** max(attempts - 1, 0), self.max_delay)
+
+
+    def record_failure(
+        self,
+        job: models.IngestionJob,
+        current_datetime: datetime.datetime,
+        error: Exception,
+    ) -> None:
+        """Отмечает в записи журнала неудачную попытку загрузки
+
+        Отсутствие отчета отмечается окончательно, а остальные ошибки -
+        со временем следующей попытки
+        """
+        if isinstance(error, MissingReportError):
+            job.mark_missing(current_datetime, repr(error))
+            return
+
+        job.fail(current_datetime, repr(error), self.get_retry_delay(job.attempts))
+
+
+    def is_exhausted(self, job: models.IngestionJob) -> bool:
+        """Проверяет, что неудачная загрузка больше не повторяется"""
+        return job.status == models.JOB_STATUS_FAILED and job.attempts >= self.max_attempts
+
+
+    def is_due(
+        self,
+        job: models.IngestionJob,
+        current_datetime: datetime.datetime,
+    ) -> bool:
+        """Проверяет, нужно ли загрузить файл данных даты записи журнала"""
+        if job.status in FINAL_STATUSES or self.is_exhausted(job):
+            return False
+        
+        if job.is_leased(current_datetime):
+            return False
+
+        if job.next_attempt_at is None:
+            return True
+
+        return job.next_attempt_at <= current_datetime
+
+
+    def select_dates(
+        self,
+        dates: Iterable[datetime.date],
+        jobs: Iterable[models.IngestionJob],
+        current_datetime: datetime.datetime,
+        force: bool = False,
+    ) -> List[datetime.date]:
+        """Возвращает даты, файлы данных которых нужно загрузить
+
+        К указанным датам без записей журнала и с загрузками, которые пора
+        повторить, добавляются даты из журнала вне указанного диапазона,
+        загрузки которых пора повторить. Если force равен True, указанные
+        даты выбираются независимо от состояния их записей, кроме дат,
+        взятых в работу исполнителями очереди загрузки
+        """
+        jobs_by_date = {job.date: job for job in jobs}
+        selected_dates = {
+            date for date in dates
+            if date not in jobs_by_date
+            or self.is_due(jobs_by_date[date], current_datetime)
+            or force and not jobs_by_date[date].is_leased(current_datetime)
+        }
+        selected_dates.update(
+            job.date for job in jobs_by_date.values()
+            if self.is_due(job, current_datetime)
+        )
+        return sorted(selected_dates)
+
+
+    def list_exhausted(
+        self,
+        jobs: Iterable[models.IngestionJob],
+    ) -> List[models.IngestionJob]:
+        """Возвращает неудачные загрузки, которые больше не повторяются"""
+        return [job for job in jobs if self.is_exhausted(job)]
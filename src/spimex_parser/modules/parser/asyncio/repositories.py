@@ -1,4 +1,6 @@
+import asyncio
 import datetime
+from collections.abc import AsyncIterator
 from typing import List
 
 from spimex_parser.domain import models
@@ -10,6 +12,24 @@ class AsyncSpimexTradingResultsRepository:
     async def list(self) -> List[models.TradingResult]:
         """Возвращает список данных о результатах торгов"""
         raise NotImplementedError()
+    
+
+    async def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает данные о результатах торгов в виде пакета столбцов"""
+        raise NotImplementedError()
+    
+
+    async def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает данные о результатах торгов во всех единицах измерения"""
+        raise NotImplementedError()
+    
+
+    def iter_results(
+        self,
+        chunk_size: int = data_table.RESULTS_CHUNK_SIZE,
+    ) -> AsyncIterator[List[models.TradingResult]]:
+        """Возвращает данные о результатах торгов частями заданного размера"""
+        raise NotImplementedError()
 
 
 class AsyncTableSpimexTradingResultsRepository(AsyncSpimexTradingResultsRepository):
@@ -34,3 +54,27 @@ class AsyncTableSpimexTradingResultsRepository(AsyncSpimexTradingResultsReposito
     async def list(self) -> List[models.TradingResult]:
         """Возвращает список данных о результатах торгов"""
         return self.results_data_table.list_results()
+    
+
+    async def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает данные о результатах торгов в виде пакета столбцов"""
+        return self.results_data_table.list_batch()
+    
+
+    async def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает данные о результатах торгов во всех единицах измерения"""
+        return self.results_data_table.list_batches()
+    
+
+    async def iter_results(
+        self,
+        chunk_size: int = data_table.RESULTS_CHUNK_SIZE,
+    ) -> AsyncIterator[List[models.TradingResult]]:
+        """Возвращает данные о результатах торгов частями заданного размера
+        
+        После каждой части управление возвращается циклу событий, чтобы
+        потребитель мог обработать ее до создания следующей части
+        """
+        for chunk in self.results_data_table.iter_results(chunk_size):
+            yield chunk
+            await asyncio.sleep(0)
@@ -0,0 +1,382 @@
+import asyncio
+import datetime
+import email.utils
+import http
+import random
+import time
+from typing import Any
+from typing import AsyncContextManager
+from typing import Dict
+from typing import Optional
+from typing import Protocol
+from typing import Type
+
+import aiohttp
+
+
+TRANSIENT_STATUSES = frozenset({
+    http.HTTPStatus.REQUEST_TIMEOUT,
+    http.HTTPStatus.TOO_MANY_REQUESTS,
+})
+
+
+class AdaptiveConcurrencyLimiter:
+    """Адаптивное ограничение числа одновременных запросов
+
+    Лимит растет аддитивно: на increase_step за каждые limit успешных
+    запросов, ответ на которые пришел быстрее latency_threshold секунд.
+    При перегрузке сервера (таймауте, ответе 429 или 5xx) лимит
+    уменьшается в 1 / decrease_factor раз, но не ниже min_limit. Сигналы
+    перегрузки от запросов, начатых до предыдущего уменьшения, лимит
+    повторно не уменьшают, чтобы одна волна ошибок не сбрасывала его
+    до минимума. Если сервер указал Retry-After, новые запросы
+    не начинаются до истечения указанного времени
+    """
+    min_limit: int
+    max_limit: int
+    increase_step: float
+    decrease_factor: float
+    latency_threshold: float
+    in_flight: int
+    _limit: float
+    _paused_until: float
+    _last_decrease_at: float
+    _condition: asyncio.Condition
+
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: float = 5.0,
+    ) -> None:
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.in_flight = 0
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._paused_until = 0.0
+        self._last_decrease_at = 0.0
+        self._condition = asyncio.Condition()
+
+
+    @property
+    def limit(self) -> int:
+        """Текущее наибольшее число одновременных запросов"""
+        return int(self._limit)
+
+
+    async def acquire(self) -> float:
+        """Ждет, пока число запросов станет меньше лимита, и занимает место
+
+        Возвращает время начала запроса по часам time.monotonic
+        """
+        async with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+
+                    continue
+
+                if self.in_flight < self.limit:
+                    break
+
+                await self._condition.wait()
+
+            self.in_flight += 1
+
+        return time.monotonic()
+
+
+    async def release(self) -> None:
+        """Освобождает место, занятое запросом"""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+    def record_success(self, latency: float) -> None:
+        """Учитывает ответ сервера без признаков перегрузки"""
+        if latency > self.latency_threshold:
+            return
+
+        self._limit = min(self._limit + self.increase_step / self._limit, self.max_limit)
+
+
+    def record_overload(
+        self,
+        started_at: float,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Учитывает перегрузку сервера, о которой сообщил запрос,
+        начатый в started_at
+        """
+        now = time.monotonic()
+
+        if retry_after is not None:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+        if started_at < self._last_decrease_at:
+            return
+
+        self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+        self._last_decrease_at = now
+
+
+    def format(self) -> str:
+        """Возвращает текущий лимит в виде строки"""
+        return f'Download concurrency limit: {self.limit} (max {self.max_limit})'
+
+
+class DownloadRetryPolicy:
+    """Правила повтора запросов файлов данных
+
+    Постоянные ошибки, то есть ответы 4xx, кроме 408 и 429 (в том числе
+    404 для дня без торгов), не повторяются. Временные ошибки: таймауты,
+    ошибки соединения, ответы 408, 429 и 5xx - повторяются, пока число
+    попыток не достигнет attempts. Перед повтором выдерживается время,
+    указанное сервером в Retry-After, но не больше max_delay, а без него -
+    случайная задержка не больше экспоненциально растущей от base_delay
+    до max_delay
+    """
+    attempts: int
+    base_delay: float
+    max_delay: float
+
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ) -> None:
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Проверяет, нужно ли повторить запрос после указанной попытки"""
+        return attempt < self.attempts and is_transient_error(error)
+
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Возвращает задержку перед повтором после указанной попытки"""
+        if retry_after is not None:
+            return self.limit_delay(retry_after)
+
+        return random.uniform(0, min(self.base_delay * 2 ** (attempt - 1), self.max_delay))
+
+
+    def limit_delay(self, delay: float) -> float:
+        """Ограничивает задержку, указанную сервером, значением max_delay"""
+        return min(delay, self.max_delay)
+
+
+class HttpClient(Protocol):
+    """Клиент HTTP, выполняющий GET-запросы так же, как aiohttp.ClientSession
+
+    Метод get возвращает асинхронный контекстный менеджер ответа
+    """
+    def get(
+        self,
+        url: str,
+        **kwargs: Any,
+    ) -> AsyncContextManager[aiohttp.ClientResponse]:
+        """Возвращает контекстный менеджер GET-запроса"""
+        ...
+
+
+class AdaptiveClient:
+    """Клиент HTTP, ограничивающий число одновременных запросов адаптивным
+    лимитом и повторяющий запросы при временных ошибках
+
+    Метод get, как и у aiohttp.ClientSession, возвращает асинхронный
+    контекстный менеджер ответа. Место в лимите занято, пока ответ
+    не закрыт, то есть пока читается тело ответа. Ответы с постоянными
+    ошибками возвращаются вызывающей стороне без повторов
+    """
+    session: aiohttp.ClientSession
+    limiter: AdaptiveConcurrencyLimiter
+    retry_policy: DownloadRetryPolicy
+
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        limiter: AdaptiveConcurrencyLimiter,
+        retry_policy: DownloadRetryPolicy,
+    ) -> None:
+        self.session = session
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+
+
+    def get(self, url: str, **kwargs: Any) -> 'AdaptiveRequest':
+        """Возвращает контекстный менеджер GET-запроса"""
+        return AdaptiveRequest(self, url, kwargs)
+
+
+class AdaptiveRequest:
+    """Запрос клиента с адаптивным лимитом, выполняемый при входе
+    в контекст
+    """
+    client: AdaptiveClient
+    url: str
+    kwargs: Dict[str, Any]
+    _response: Optional[aiohttp.ClientResponse]
+    _started_at: float
+
+
+    def __init__(self, client: AdaptiveClient, url: str, kwargs: Dict[str, Any]) -> None:
+        self.client = client
+        self.url = url
+        self.kwargs = kwargs
+        self._response = None
+        self._started_at = 0.0
+
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        limiter = self.client.limiter
+        retry_policy = self.client.retry_policy
+        attempt = 0
+
+        while True:
+            attempt += 1
+            started_at = await limiter.acquire()
+
+            try:
+                response = await self._send(started_at)
+            except Exception as e:
+                await limiter.release()
+
+                if not retry_policy.should_retry(e, attempt):
+                    raise
+
+                await asyncio.sleep(retry_policy.get_delay(attempt, get_retry_after(e)))
+                continue
+            except BaseException:
+                await limiter.release()
+                raise
+
+            self._response = response
+            self._started_at = started_at
+            return response
+
+
+    async def _send(self, started_at: float) -> aiohttp.ClientResponse:
+        """Отправляет запрос и учитывает ответ в лимите
+
+        Ответы с временными ошибками закрываются, а ошибка выбрасывается
+        """
+        limiter = self.client.limiter
+
+        try:
+            response = await self.client.session.get(self.url, **self.kwargs)
+        except asyncio.TimeoutError:
+            limiter.record_overload(started_at)
+            raise
+
+        if not is_transient_status(response.status):
+            limiter.record_success(time.monotonic() - started_at)
+            return response
+
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+        if retry_after is not None:
+            retry_after = self.client.retry_policy.limit_delay(retry_after)
+
+        limiter.record_overload(started_at, retry_after)
+        response.release()
+        response.raise_for_status()
+        return response
+
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Any,
+    ) -> None:
+        if self._response is None:
+            return
+
+        self._response.release()
+        self._response = None
+
+        if isinstance(exc, asyncio.TimeoutError):
+            self.client.limiter.record_overload(self._started_at)
+
+        await self.client.limiter.release()
+
+
+def is_transient_status(status: int) -> bool:
+    """Проверяет, что ответ с указанным статусом может измениться
+    при повторе запроса
+    """
+    return status in TRANSIENT_STATUSES or status >= http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Проверяет, что запрос, завершившийся ошибкой, можно повторить"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return is_transient_status(error.status)
+
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+def is_permanent_miss(error: BaseException) -> bool:
+    """Проверяет, что запрошенного файла нет на сервере"""
+    return (
+        isinstance(error, aiohttp.ClientResponseError)
+        and error.status in (http.HTTPStatus.NOT_FOUND, http.HTTPStatus.GONE)
+    )
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Возвращает задержку из заголовка Retry-After ответа с ошибкой"""
+    if not isinstance(error, aiohttp.ClientResponseError) or error.headers is None:
+        return None
+
+    return parse_retry_after(error.headers.get('Retry-After'))
+
+
+def parse_retry_after(
+    value: Optional[str],
+    current_datetime: Optional[datetime.datetime] = None,
+) -> Optional[float]:
+    """Возвращает задержку в секундах из значения заголовка Retry-After
+
+    Значение может быть числом секунд или датой HTTP. Возвращает None
+    в случае, если значение отсутствует или не разобрано
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_datetime = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_datetime.tzinfo is None:
+        retry_datetime = retry_datetime.replace(tzinfo=datetime.timezone.utc)
+
+    if current_datetime is None:
+        current_datetime = datetime.datetime.now(datetime.timezone.utc)
+
+    return max((retry_datetime - current_datetime).total_seconds(), 0.0)
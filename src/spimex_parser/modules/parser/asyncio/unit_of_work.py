@@ -1,59 +1,382 @@
+import asyncio
+import concurrent.futures
+import dataclasses
 import datetime
-import io
+import http
 import os.path
 import urllib.parse
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import TypeVar
 
 import aiohttp
-import pandas as pd
 
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import caches
 from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import downloads
+from spimex_parser.modules.parser import metadata
+from spimex_parser.modules.parser import readers
 from spimex_parser.modules.parser.asyncio import repositories
+from spimex_parser.modules.parser.asyncio import throttling
+
+
+RESUMABLE_ERRORS = (
+    aiohttp.ClientPayloadError,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+)
+
+ResultT = TypeVar('ResultT')
 
 
 class AsyncSpimexTradingResultsUnitOfWork:
-    """Асинхронная единица работы с данными о результатах торгов со Spimex"""
+    """Асинхронная единица работы с данными о результатах торгов со Spimex
+    
+    Если файл не изменился с прошлой обработки, not_modified равен True,
+    а хранилище результатов торгов пусто. Хэш содержимого загруженного
+    файла доступен в file_hash после разбора файла
+    """
     data: repositories.AsyncSpimexTradingResultsRepository
+    not_modified: bool
+    file_hash: Optional[str]
 
     async def __aenter__(self) -> 'AsyncSpimexTradingResultsUnitOfWork':
         raise NotImplementedError()
     
 
+    async def download(self) -> None:
+        """Загружает файл данных, не разбирая его"""
+        raise NotImplementedError()
+    
+
+    async def parse(self) -> None:
+        """Разбирает загруженный файл данных и освобождает его"""
+        raise NotImplementedError()
+    
+
+    async def close(self) -> None:
+        """Освобождает загруженный, но не разобранный файл данных"""
+        raise NotImplementedError()
+    
+
+    async def commit(self) -> None:
+        """Отмечает файл как обработанный, чтобы не обрабатывать его
+        повторно, пока он не изменится
+        """
+        raise NotImplementedError()
+    
+
     async def __aexit__(self, *args, **kwargs) -> None:
         raise NotImplementedError()
 
 
-class AsyncPandasSpimexTradingResultsUnitOfWork(AsyncSpimexTradingResultsUnitOfWork):
+class AsyncExcelSpimexTradingResultsUnitOfWork(AsyncSpimexTradingResultsUnitOfWork):
     """Асинхронная единица работы с данными о результатах торгов со Spimex
     
     Асинхронная единица работы с данными о результатах торгов со Spimex,
-    полученных в виде excel-таблицы
+    полученных в виде excel-таблицы. Способ чтения загруженной таблицы
+    определяется наследниками.
+
+    Чтение таблицы выполняется в указанном пуле исполнителей (пуле потоков
+    или процессов), чтобы не блокировать цикл событий. Если пул не указан,
+    используется пул цикла событий по умолчанию. Файлы загружаются по ссылке
+    или берутся из указанного кэша загруженных файлов. Если указан кэш
+    разобранных результатов, результаты торгов берутся из него по хэшу
+    содержимого файла.
+
+    Файлы загружаются по частям в буфер, размер которого определяется
+    по заголовку Content-Length, а файлы больше max_memory_size или
+    без заголовка Content-Length - во временный файл на диске. Пулу
+    процессов всегда передается путь к временному файлу, чтобы не
+    передавать содержимое файла между процессами. Прерванные загрузки
+    докачиваются не более max_resume_attempts раз.
+
+    Если указано хранилище валидаторов HTTP, файлы запрашиваются условными
+    запросами по валидаторам, сохраненным при фиксации единицы работы,
+    но только если хэш файла, которому они соответствуют, равен
+    stored_file_hash - хэшу файла, результаты торгов которого сохранены
+    в базе данных. Неизмененные файлы не загружаются и не разбираются.
+    Файлы из кэша загруженных файлов также запрашиваются условными
+    запросами по валидаторам, сохраненным вместе с ними, и используются,
+    только если сервер подтвердил, что файл не изменился.
+
+    При входе в контекст файл загружается и разбирается сразу. Загрузку
+    и разбор можно также выполнить по отдельности методами download и parse,
+    например, на разных этапах конвейера
     """
-    client: aiohttp.ClientSession
+    client: throttling.HttpClient
+    executor: Optional[concurrent.futures.Executor]
+    report_cache: Optional[caches.ReportCache]
+    parsed_results_cache: Optional[caches.ParsedResultsCache]
+    metadata_store: Optional[metadata.ReportMetadataStore]
+    stored_file_hash: Optional[str]
+    max_memory_size: int
+    max_resume_attempts: int
+    _response_metadata: Optional[metadata.ReportMetadata]
+    _report_buffer: Optional[downloads.ReportBuffer]
 
 
-    def __init__(self, oil_data_path: str, client: aiohttp.ClientSession) -> None:
+    def __init__(
+        self,
+        oil_data_path: str,
+        client: throttling.HttpClient,
+        executor: Optional[concurrent.futures.Executor] = None,
+        report_cache: Optional[caches.ReportCache] = None,
+        parsed_results_cache: Optional[caches.ParsedResultsCache] = None,
+        max_memory_size: int = downloads.MAX_MEMORY_SIZE,
+        metadata_store: Optional[metadata.ReportMetadataStore] = None,
+        max_resume_attempts: int = downloads.MAX_RESUME_ATTEMPTS,
+        stored_file_hash: Optional[str] = None,
+    ) -> None:
         self.oil_data_path = oil_data_path
         self.client = client
+        self.executor = executor
+        self.report_cache = report_cache
+        self.parsed_results_cache = parsed_results_cache
+        self.max_memory_size = max_memory_size
+        self.metadata_store = metadata_store
+        self.max_resume_attempts = max_resume_attempts
+        self.stored_file_hash = stored_file_hash
+        self.not_modified = False
+        self.file_hash = None
+        self._response_metadata = None
+        self._report_buffer = None
 
 
     async def __aenter__(self) -> AsyncSpimexTradingResultsUnitOfWork:
-        frame = await self._read_excel(self.oil_data_path)
+        await self.download()
+        await self.parse()
+        return self
+    
+
+    async def download(self) -> None:
+        """Загружает файл данных, не разбирая его"""
+        self._report_buffer = await self._download_file(self.oil_data_path)
+        self.not_modified = self._report_buffer is None
+    
+
+    async def parse(self) -> None:
+        """Разбирает загруженный файл данных и освобождает его"""
         date = self._parse_date_from_path(self.oil_data_path)
-        trading_results_table = data_table.PandasTradingResultsDataTable(frame, date)
+
+        if self._report_buffer is None:
+            trading_results_batches = []
+        else:
+            try:
+                source = self._report_buffer.get_source()
+                self.file_hash = await self._hash_source(source)
+                trading_results_batches = await self._read_batches(source, date)
+            finally:
+                await self.close()
+
+        trading_results_table = data_table.BatchTradingResultsDataTable(
+            trading_results_batches,
+            date,
+        )
         self.data = repositories.AsyncTableSpimexTradingResultsRepository(
             trading_results_table,
             date,
         )
-        return self
+    
+
+    async def close(self) -> None:
+        """Освобождает загруженный, но не разобранный файл данных"""
+        if self._report_buffer is not None:
+            self._report_buffer.close()
+            self._report_buffer = None
+
 
+    async def _download_file(self, url: str) -> Optional[downloads.ReportBuffer]:
+        """Возвращает буфер с содержимым файла, асинхронно загруженного
+        по частям или взятого из кэша
 
-    async def _read_excel(self, url: str) -> pd.DataFrame:
-        """Возвращает асинхронно загруженный и прочитанный excel-файл"""
-        async with self.client.get(url) as resp:
-            file_bytes = await resp.read()
-            file_bytes_stream = io.BytesIO(file_bytes)
-            frame = pd.read_excel(file_bytes_stream, na_values=['-'])
-            return frame
+        Файл запрашивается условным запросом по валидаторам, сохраненным
+        при прошлой обработке, или по валидаторам файла в кэше. Файл из кэша
+        используется, только если сервер ответил, что он не изменился.
+        Возвращает None в случае, если файл не изменился с прошлой обработки
+        """
+        stored_metadata = self._get_stored_metadata(url)
+        cached_metadata = await self._get_cached_metadata(url)
+        download = await self._download(url, stored_metadata or cached_metadata)
+
+        if download.not_modified and stored_metadata is not None:
+            return None
+        
+        if download.not_modified and self.report_cache is not None:
+            cached_path = await self._run_in_thread(self.report_cache.get, url)
+
+            if cached_path is not None:
+                self._response_metadata = cached_metadata
+                return downloads.ReportBuffer.from_file(cached_path)
+            
+            download = await self._download(url, None)
+        
+        self._response_metadata = download.response_metadata
+        
+        if self.report_cache is not None:
+            await self._run_in_thread(
+                self.report_cache.put,
+                url,
+                download.buffer.get_source(),
+                download.response_metadata,
+            )
+        
+        return download.buffer
+    
+
+    async def _download(
+        self,
+        url: str,
+        request_metadata: Optional[metadata.ReportMetadata],
+    ) -> downloads.ReportDownload:
+        """Загружает файл по ссылке условным запросом по указанным
+        валидаторам или, если они не указаны, безусловным запросом
+        """
+        download = downloads.ReportDownload(
+            self._get_max_memory_size(),
+            request_metadata,
+        )
+
+        try:
+            await self._fetch(url, download)
+        except BaseException:
+            download.close()
+            raise
+
+        return download
+    
+
+    async def _fetch(self, url: str, download: downloads.ReportDownload) -> None:
+        """Загружает файл по ссылке, докачивая его при обрыве соединения"""
+        for attempt in range(self.max_resume_attempts + 1):
+            try:
+                async with self.client.get(
+                    url,
+                    headers=download.get_request_headers(),
+                ) as resp:
+                    resp.raise_for_status()
+                    download.start_response(resp.status, resp.headers)
+
+                    if download.not_modified:
+                        return
+                    
+                    async for chunk in resp.content.iter_chunked(
+                        downloads.DOWNLOAD_CHUNK_SIZE,
+                    ):
+                        download.buffer.write(chunk)
+            except aiohttp.ClientResponseError as e:
+                if e.status != http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+                    raise
+                
+                download.restart()
+                continue
+            except RESUMABLE_ERRORS:
+                if attempt == self.max_resume_attempts:
+                    raise
+                
+                continue
+            
+            if download.is_complete():
+                return
+        
+        raise downloads.IncompleteDownloadError(f'Could not download {url}')
+    
+
+    def _get_stored_metadata(self, url: str) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы файла, сохраненные при прошлой обработке
+
+        Валидаторы не используются, если результаты торгов файла, которому
+        они соответствуют, не сохранены в базе данных
+        """
+        if self.metadata_store is None or self.stored_file_hash is None:
+            return None
+        
+        stored_metadata = self.metadata_store.get(url)
+
+        if stored_metadata is None or stored_metadata.file_hash != self.stored_file_hash:
+            return None
+        
+        return stored_metadata
+    
+
+    async def _get_cached_metadata(
+        self,
+        url: str,
+    ) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы файла, сохраненные в кэше загруженных файлов"""
+        if self.report_cache is None:
+            return None
+        
+        return await self._run_in_thread(self.report_cache.get_metadata, url)
+    
+
+    async def _run_in_thread(
+        self,
+        function: Callable[..., ResultT],
+        *args: Any,
+    ) -> ResultT:
+        """Выполняет операцию с файлами кэша в пуле потоков цикла событий
+
+        Чтение, хэширование и копирование файлов кэша не блокируют цикл
+        событий. Пул исполнителей разбора для этого не используется,
+        поскольку им может быть пул процессов
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, function, *args)
+    
+
+    async def commit(self) -> None:
+        """Сохраняет валидаторы загруженного файла и хэш его содержимого
+        в хранилище валидаторов
+        """
+        if self.metadata_store is None or self._response_metadata is None:
+            return
+        
+        if not self._response_metadata.is_empty():
+            self.metadata_store.put(
+                self.oil_data_path,
+                dataclasses.replace(self._response_metadata, file_hash=self.file_hash),
+            )
+    
+
+    def _get_max_memory_size(self) -> int:
+        """Возвращает наибольший размер файла, загружаемого в память"""
+        if isinstance(self.executor, concurrent.futures.ProcessPoolExecutor):
+            return 0
+        
+        return self.max_memory_size
+    
+
+    async def _read_batches(
+        self,
+        source: downloads.ReportSource,
+        date: datetime.date,
+    ) -> List[models.TradingResultBatch]:
+        """Читает результаты торгов из файла в пуле исполнителей"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            readers.read_batches,
+            self._get_batch_reader(),
+            source,
+            date,
+            self.parsed_results_cache,
+            self.file_hash,
+        )
+    
+
+    async def _hash_source(self, source: downloads.ReportSource) -> str:
+        """Вычисляет хэш содержимого файла в пуле исполнителей"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, readers.hash_source, source)
+    
+
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        raise NotImplementedError()
     
 
     def _parse_date_from_path(self, path: str) -> datetime.date:
@@ -79,4 +402,26 @@ class AsyncPandasSpimexTradingResultsUnitOfWork(AsyncSpimexTradingResultsUnitOfW
     
 
     async def __aexit__(self, *args, **kwargs) -> None:
-        return
+        await self.close()
+
+
+class AsyncPandasSpimexTradingResultsUnitOfWork(AsyncExcelSpimexTradingResultsUnitOfWork):
+    """Асинхронная единица работы с данными о результатах торгов со Spimex
+    
+    Асинхронная единица работы с данными о результатах торгов со Spimex,
+    полученных в виде excel-таблицы и прочитанных через pandas
+    """
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        return readers.read_pandas_batches
+
+
+class AsyncXlrdSpimexTradingResultsUnitOfWork(AsyncExcelSpimexTradingResultsUnitOfWork):
+    """Асинхронная единица работы с данными о результатах торгов со Spimex
+    
+    Асинхронная единица работы с данными о результатах торгов со Spimex,
+    полученных в виде xls-таблицы и прочитанных напрямую через xlrd
+    """
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        return readers.read_xlrd_batches
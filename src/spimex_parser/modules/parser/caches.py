@@ -0,0 +1,592 @@
+import collections
+import dataclasses
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import Counter
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pyarrow as pa
+import pyarrow.ipc
+
+from spimex_parser.domain import models
+from spimex_parser.modules import string_util
+from spimex_parser.modules.parser import downloads
+from spimex_parser.modules.parser import metadata
+
+
+PARSER_VERSION = 3
+
+
+class ReportCache:
+    """Кэш загруженных файлов отчетов Spimex"""
+    def get(self, url: str) -> Optional[str]:
+        """Возвращает путь к копии файла, загруженного по указанной ссылке
+
+        Копия принадлежит вызывающей стороне, которая должна удалить ее
+        после чтения. Возвращает None в случае, если файла нет в кэше
+        """
+        raise NotImplementedError()
+
+
+    def get_metadata(self, url: str) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы HTTP, сохраненные вместе с файлом,
+        загруженным по указанной ссылке
+
+        Возвращает None в случае, если файла нет в кэше или валидаторы
+        не сохранены
+        """
+        raise NotImplementedError()
+
+
+    def put(
+        self,
+        url: str,
+        source: downloads.ReportSource,
+        report_metadata: Optional[metadata.ReportMetadata] = None,
+    ) -> None:
+        """Сохраняет содержимое файла или файл по пути, загруженный
+        по указанной ссылке, вместе с валидаторами HTTP ответа сервера
+        """
+        raise NotImplementedError()
+
+
+class FileSystemReportCache(ReportCache):
+    """Кэш загруженных файлов отчетов Spimex на диске
+
+    Содержимое файлов хранится в каталоге objects под именем, равным хэшу
+    содержимого, поэтому одинаковые файлы хранятся единожды. Записи в каталоге
+    entries связывают хэш ссылки с хэшем содержимого и валидаторами HTTP,
+    по которым сервер подтверждает, что файл не изменился. При превышении
+    ограничения на размер кэша удаляются давно не использованные записи.
+
+    Файлы не читаются в память целиком: при сохранении файл по пути
+    копируется потоком, а при чтении возвращается жесткая ссылка на файл
+    кэша (или, если файловая система их не поддерживает, его копия),
+    которую удаление записи из кэша не затрагивает.
+
+    Порядок использования записей и размеры файлов хранятся в индексе
+    в памяти, который строится по каталогу кэша при первом обращении
+    и затем обновляется при чтении и сохранении файлов, поэтому каталог
+    не просматривается заново при каждом сохранении. Доступ к индексу
+    синхронизирован, и кэш можно использовать из нескольких потоков
+    """
+    directory: pathlib.Path
+    max_size: int
+    _index_lock: threading.Lock
+    _entries: Optional['collections.OrderedDict[str, str]']
+    _references_count: Counter[str]
+    _object_sizes: Dict[str, int]
+    _total_size: int
+
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self._entries_directory.mkdir(parents=True, exist_ok=True)
+        self._objects_directory.mkdir(parents=True, exist_ok=True)
+        self._index_lock = threading.Lock()
+        self._entries = None
+        self._references_count = collections.Counter()
+        self._object_sizes = {}
+        self._total_size = 0
+
+
+    @property
+    def _entries_directory(self) -> pathlib.Path:
+        return self.directory / 'entries'
+
+
+    @property
+    def _objects_directory(self) -> pathlib.Path:
+        return self.directory / 'objects'
+
+
+    def get(self, url: str) -> Optional[str]:
+        """Возвращает путь к копии файла, загруженного по указанной ссылке
+
+        Копия принадлежит вызывающей стороне, которая должна удалить ее
+        после чтения. Возвращает None в случае, если файла нет в кэше
+        или его содержимое не совпадает с сохраненным хэшем
+        """
+        entry_path = self._get_entry_path(url)
+        copy_path = self.directory / f'{uuid.uuid4().hex}{downloads.REPORT_FILE_SUFFIX}'
+
+        try:
+            content_hash, _ = self._read_entry(entry_path)
+            self._link(self._objects_directory / content_hash, copy_path)
+        except FileNotFoundError:
+            return None
+
+        if hash_file(str(copy_path)) != content_hash:
+            copy_path.unlink(missing_ok=True)
+
+            with self._index_lock:
+                self._remove_entry(entry_path.name)
+
+            return None
+
+        self._touch(entry_path)
+
+        with self._index_lock:
+            self._use_entry(entry_path.name, content_hash)
+
+        return str(copy_path)
+
+
+    def get_metadata(self, url: str) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы HTTP, сохраненные вместе с файлом,
+        загруженным по указанной ссылке
+
+        Возвращает None в случае, если файла нет в кэше или валидаторы
+        не сохранены
+        """
+        try:
+            _, report_metadata = self._read_entry(self._get_entry_path(url))
+        except FileNotFoundError:
+            return None
+
+        return report_metadata
+
+
+    def put(
+        self,
+        url: str,
+        source: downloads.ReportSource,
+        report_metadata: Optional[metadata.ReportMetadata] = None,
+    ) -> None:
+        """Сохраняет содержимое файла или файл по пути, загруженный
+        по указанной ссылке, вместе с валидаторами HTTP ответа сервера
+        """
+        if isinstance(source, str):
+            content_hash = hash_file(source)
+        else:
+            content_hash = self._hash(source)
+
+        object_path = self._objects_directory / content_hash
+
+        if not object_path.exists():
+            self._write_atomically(object_path, source)
+
+        entry_path = self._get_entry_path(url)
+        self._write_atomically(
+            entry_path,
+            self._format_entry(content_hash, report_metadata).encode(),
+        )
+
+        with self._index_lock:
+            self._use_entry(entry_path.name, content_hash)
+            self._evict()
+
+
+    def _format_entry(
+        self,
+        content_hash: str,
+        report_metadata: Optional[metadata.ReportMetadata],
+    ) -> str:
+        """Составляет запись кэша: хэш содержимого в первой строке
+        и валидаторы HTTP в формате JSON во второй
+        """
+        if report_metadata is None or report_metadata.is_empty():
+            return content_hash
+
+        validators = metadata.ReportMetadata(
+            etag=report_metadata.etag,
+            last_modified=report_metadata.last_modified,
+        )
+        return f'{content_hash}\n{json.dumps(dataclasses.asdict(validators))}'
+
+
+    def _read_entry(
+        self,
+        entry_path: pathlib.Path,
+    ) -> Tuple[str, Optional[metadata.ReportMetadata]]:
+        """Читает хэш содержимого и валидаторы HTTP из записи кэша
+
+        Валидаторы поврежденной записи или записи, сохраненной без них,
+        равны None
+        """
+        content_hash, _, validators = entry_path.read_text().partition('\n')
+
+        try:
+            return content_hash, metadata.ReportMetadata(**json.loads(validators))
+        except (ValueError, TypeError):
+            return content_hash, None
+
+
+    def _get_entry_path(self, url: str) -> pathlib.Path:
+        """Возвращает путь к записи кэша для указанной ссылки"""
+        return self._entries_directory / self._hash(url.encode())
+
+
+    def _hash(self, contents: bytes) -> str:
+        return hash_contents(contents)
+
+
+    def _touch(self, path: pathlib.Path) -> None:
+        """Отмечает запись кэша как недавно использованную"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+
+    def _link(self, object_path: pathlib.Path, copy_path: pathlib.Path) -> None:
+        """Создает жесткую ссылку на файл кэша или, если это невозможно,
+        копирует его
+        """
+        try:
+            os.link(object_path, copy_path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(object_path, copy_path)
+
+
+    def _write_atomically(
+        self,
+        path: pathlib.Path,
+        source: downloads.ReportSource,
+    ) -> None:
+        """Записывает содержимое или файл по пути целиком, не оставляя
+        частично записанных файлов
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory)
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                if isinstance(source, str):
+                    with open(source, 'rb') as source_file:
+                        shutil.copyfileobj(source_file, temp_file)
+                else:
+                    temp_file.write(source)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def _load_index(self) -> 'collections.OrderedDict[str, str]':
+        """Возвращает индекс записей кэша, при первом обращении строя его
+        по каталогу кэша
+
+        Файлы, на которые не ссылается ни одна запись, удаляются.
+        Вызывается при захваченной блокировке индекса
+        """
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = collections.OrderedDict(self._list_entries())
+        self._references_count = collections.Counter(self._entries.values())
+        self._object_sizes = self._list_object_sizes()
+
+        for content_hash in list(self._object_sizes):
+            if self._references_count[content_hash] == 0:
+                self._remove_object(content_hash)
+
+        self._total_size = sum(self._object_sizes.values())
+        return self._entries
+
+
+    def _use_entry(self, entry_name: str, content_hash: str) -> None:
+        """Отмечает запись в индексе как недавно использованную
+
+        Вызывается при захваченной блокировке индекса
+        """
+        entries = self._load_index()
+        previous_hash = entries.get(entry_name)
+
+        if previous_hash != content_hash:
+            self._forget_entry(entry_name)
+            entries[entry_name] = content_hash
+            self._references_count[content_hash] += 1
+            self._add_object(content_hash)
+
+        entries.move_to_end(entry_name)
+
+
+    def _evict(self) -> None:
+        """Удаляет давно не использованные записи до соблюдения ограничения
+
+        Вызывается при захваченной блокировке индекса
+        """
+        entries = self._load_index()
+
+        while self._total_size > self.max_size and entries:
+            self._remove_entry(next(iter(entries)))
+
+
+    def _remove_entry(self, entry_name: str) -> None:
+        """Удаляет запись кэша
+
+        Вызывается при захваченной блокировке индекса
+        """
+        (self._entries_directory / entry_name).unlink(missing_ok=True)
+        self._forget_entry(entry_name)
+
+
+    def _forget_entry(self, entry_name: str) -> None:
+        """Удаляет запись из индекса и файл, на который больше не ссылается
+        ни одна запись
+
+        Вызывается при захваченной блокировке индекса
+        """
+        content_hash = self._load_index().pop(entry_name, None)
+
+        if content_hash is None:
+            return
+
+        self._references_count[content_hash] -= 1
+
+        if self._references_count[content_hash] <= 0:
+            del self._references_count[content_hash]
+            self._remove_object(content_hash)
+
+
+    def _add_object(self, content_hash: str) -> None:
+        """Учитывает в индексе размер сохраненного файла"""
+        if content_hash in self._object_sizes:
+            return
+
+        try:
+            object_size = (self._objects_directory / content_hash).stat().st_size
+        except FileNotFoundError:
+            return
+
+        self._object_sizes[content_hash] = object_size
+        self._total_size += object_size
+
+
+    def _remove_object(self, content_hash: str) -> None:
+        """Удаляет сохраненный файл и его размер из индекса"""
+        (self._objects_directory / content_hash).unlink(missing_ok=True)
+        self._total_size -= self._object_sizes.pop(content_hash, 0)
+
+
+    def _list_entries(self) -> List[Tuple[str, str]]:
+        """Возвращает названия записей кэша и хэши их содержимого, начиная
+        с давно не использованных
+        """
+        entries: List[Tuple[float, str, str]] = []
+
+        for entry_path in self._entries_directory.iterdir():
+            try:
+                modified_time = entry_path.stat().st_mtime
+                content_hash, _ = self._read_entry(entry_path)
+            except FileNotFoundError:
+                continue
+
+            entries.append((modified_time, entry_path.name, content_hash))
+
+        entries.sort(key=lambda entry: entry[0])
+        return [(entry_name, content_hash) for _, entry_name, content_hash in entries]
+
+
+    def _list_object_sizes(self) -> Dict[str, int]:
+        """Возвращает размеры хранимых файлов по хэшам их содержимого"""
+        object_sizes: Dict[str, int] = {}
+
+        for object_path in self._objects_directory.iterdir():
+            try:
+                object_sizes[object_path.name] = object_path.stat().st_size
+            except FileNotFoundError:
+                continue
+
+        return object_sizes
+
+
+class ParsedResultsCache:
+    """Кэш результатов торгов, извлеченных из файлов отчетов Spimex"""
+    def get(
+        self,
+        content_hash: str,
+        date: datetime.date,
+    ) -> Optional[List[models.TradingResultBatch]]:
+        """Возвращает результаты торгов, извлеченные из файла с указанным хэшем
+
+        Возвращает пакеты результатов торгов каждой единицы измерения
+        с указанной датой или None в случае, если результатов для файла
+        нет в кэше
+        """
+        raise NotImplementedError()
+
+
+    def put(
+        self,
+        content_hash: str,
+        batches: List[models.TradingResultBatch],
+    ) -> None:
+        """Сохраняет результаты торгов, извлеченные из файла с указанным хэшем"""
+        raise NotImplementedError()
+
+
+class ArrowParsedResultsCache(ParsedResultsCache):
+    """Кэш результатов торгов на диске в формате Arrow IPC
+
+    Результаты торгов каждого файла хранятся по столбцам в отдельном файле,
+    название которого составлено из хэша содержимого файла отчета и версии
+    парсера, поэтому изменение логики извлечения данных делает старые записи
+    недействительными. Пакеты всех единиц измерения хранятся друг за другом
+    в одном файле отдельными пакетами записей со столбцом единицы измерения.
+    Файлы кэша отображаются в память при чтении. Дата торгов определяется ссылкой на файл, а не его
+    содержимым, поэтому не сохраняется, а время создания проставляется
+    заново при чтении
+    """
+    directory: pathlib.Path
+
+    SCHEMA = pa.schema([
+        ('exchange_product_id', pa.string()),
+        ('exchange_product_name', pa.string()),
+        ('oil_id', pa.string()),
+        ('delivery_basis_id', pa.string()),
+        ('delivery_basis_name', pa.string()),
+        ('delivery_type_id', pa.string()),
+        ('volume', pa.int64()),
+        ('total', pa.int64()),
+        ('count', pa.int64()),
+        ('unit', pa.string()),
+    ])
+    BATCH_COLUMNS = [field.name for field in SCHEMA if field.name != 'unit']
+
+
+    def __init__(self, directory: str) -> None:
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+
+    def get(
+        self,
+        content_hash: str,
+        date: datetime.date,
+    ) -> Optional[List[models.TradingResultBatch]]:
+        """Возвращает результаты торгов, извлеченные из файла с указанным хэшем
+
+        Возвращает пакеты результатов торгов каждой единицы измерения
+        с указанной датой или None в случае, если результатов для файла
+        нет в кэше
+        """
+        try:
+            with pa.memory_map(str(self._get_path(content_hash))) as source:
+                reader = pa.ipc.open_file(source)
+                current_datetime = datetime.datetime.now()
+                return [
+                    self._convert_record_batch(
+                        reader.get_batch(index),
+                        date,
+                        current_datetime,
+                    )
+                    for index in range(reader.num_record_batches)
+                ]
+        except FileNotFoundError:
+            return None
+
+
+    def _convert_record_batch(
+        self,
+        record_batch: pa.RecordBatch,
+        date: datetime.date,
+        current_datetime: datetime.datetime,
+    ) -> models.TradingResultBatch:
+        """Преобразует пакет записей одной единицы измерения в пакет столбцов
+
+        Каждый столбец преобразуется из отображенного в память массива Arrow
+        отдельно. Повторяющиеся строковые значения интернируются
+        """
+        columns: Dict[str, List] = {}
+
+        for column_name in self.BATCH_COLUMNS:
+            values = record_batch.column(column_name).to_pylist()
+
+            if self.SCHEMA.field(column_name).type == pa.string():
+                values = string_util.intern_strings(values)
+            
+            columns[column_name] = values
+
+        return models.TradingResultBatch(
+            **columns,
+            date=date,
+            created_on=current_datetime,
+            updated_on=current_datetime,
+            unit=string_util.intern_string(record_batch.column('unit')[0].as_py()),
+        )
+
+
+    def put(
+        self,
+        content_hash: str,
+        batches: List[models.TradingResultBatch],
+    ) -> None:
+        """Сохраняет результаты торгов, извлеченные из файла с указанным хэшем
+
+        Пакет каждой единицы измерения сохраняется отдельным пакетом записей.
+        Пустые пакеты не сохраняются, а если пусты все пакеты, результаты
+        не сохраняются вовсе, чтобы файл был разобран заново
+        """
+        record_batches = [
+            self._create_record_batch(batch)
+            for batch in batches
+            if len(batch) > 0
+        ]
+
+        if not record_batches:
+            return
+        
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory)
+        os.close(file_descriptor)
+
+        try:
+            with pa.ipc.new_file(temp_path, self.SCHEMA) as writer:
+                for record_batch in record_batches:
+                    writer.write_batch(record_batch)
+
+            os.replace(temp_path, self._get_path(content_hash))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def _create_record_batch(
+        self,
+        batch: models.TradingResultBatch,
+    ) -> pa.RecordBatch:
+        """Создает пакет записей из пакета результатов торгов"""
+        columns = [
+            getattr(batch, column_name)
+            for column_name in self.BATCH_COLUMNS
+        ]
+        columns.append([batch.unit] * len(batch))
+        return pa.record_batch(columns, schema=self.SCHEMA)
+
+
+    def _get_path(self, content_hash: str) -> pathlib.Path:
+        """Возвращает путь к файлу результатов торгов в кэше"""
+        return self.directory / f'{content_hash}-v{PARSER_VERSION}.arrow'
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_contents(contents: bytes) -> str:
+    """Возвращает хэш содержимого файла"""
+    return hashlib.sha256(contents).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Возвращает хэш содержимого файла, читая его с диска по частям"""
+    content_hash = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
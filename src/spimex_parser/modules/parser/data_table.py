@@ -1,10 +1,88 @@
+import dataclasses
 import datetime
+from typing import Any
+from typing import Iterator
 from typing import List
-from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
 
 import pandas as pd
+import xlrd.sheet
 
 from spimex_parser.domain import models
+from spimex_parser.modules import string_util
+
+
+TABLE_NAME_PREFIX = 'Единица измерения:'
+TABLE_NAME = f'{TABLE_NAME_PREFIX} {models.METRIC_TON_UNIT}'
+SUMMARY_CELL_NAME = 'Итого:'
+HEADERS_OFFSET = 2
+
+PRODUCT_ID_COL_INDEX = 1
+PRODUCT_NAME_COL_INDEX = 2
+DELIVERY_BASIS_NAME_COL_INDEX = 3
+VOLUME_COL_INDEX = 4
+TOTAL_COL_INDEX = 5
+
+RESULTS_CHUNK_SIZE = 1000
+
+
+@dataclasses.dataclass(frozen=True)
+class TableSection:
+    """Расположение строк таблицы результатов торгов в одной единице измерения"""
+    unit: str
+    start_index: int
+    end_index: int
+
+
+    def shift(self, offset: int) -> 'TableSection':
+        """Возвращает расположение таблицы, смещенное на указанное число строк"""
+        return dataclasses.replace(
+            self,
+            start_index=self.start_index + offset,
+            end_index=self.end_index + offset,
+        )
+
+
+def find_table_sections(
+    key_column: Sequence[Any],
+    offset: int = 0,
+) -> List[TableSection]:
+    """Находит таблицы всех единиц измерения
+
+    Таблицы определяются за один проход по столбцу кодов инструментов.
+    Указанное смещение прибавляется к номерам строк, если столбец считан
+    не с начала листа
+    """
+    sections: List[TableSection] = []
+    unit = None
+    table_start_index = 0
+
+    for row_index, value in enumerate(key_column, start=offset):
+        if not isinstance(value, str):
+            continue
+
+        if unit is None:
+            if value.startswith(TABLE_NAME_PREFIX):
+                unit = value[len(TABLE_NAME_PREFIX):].strip()
+                table_start_index = row_index + 1 + HEADERS_OFFSET
+        elif row_index >= table_start_index and value == SUMMARY_CELL_NAME:
+            sections.append(TableSection(unit, table_start_index, row_index))
+            unit = None
+
+    return sections
+
+
+def find_section(
+    sections: Sequence[TableSection],
+    unit: str,
+) -> Optional[TableSection]:
+    """Возвращает таблицу указанной единицы измерения или None"""
+    for section in sections:
+        if section.unit == unit:
+            return section
+
+    return None
 
 
 class TradingResultsDataTable:
@@ -12,6 +90,33 @@ class TradingResultsDataTable:
     def list_results(self) -> List[models.TradingResult]:
         """Возвращает список результатов торгов"""
         raise NotImplementedError()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает результаты торгов в виде пакета столбцов"""
+        raise NotImplementedError()
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает результаты торгов во всех единицах измерения
+        
+        Результаты торгов каждой единицы измерения возвращаются отдельным
+        пакетом столбцов
+        """
+        raise NotImplementedError()
+    
+
+    def iter_results(
+        self,
+        chunk_size: int = RESULTS_CHUNK_SIZE,
+    ) -> Iterator[List[models.TradingResult]]:
+        """Возвращает результаты торгов частями заданного размера
+        
+        Результаты торгов создаются из пакета столбцов по мере обхода частей.
+        Таблицы, читающие исходные данные, создают каждую часть из них
+        по требованию, не создавая пакет всей таблицы
+        """
+        return self.list_batch().iter_chunks(chunk_size)
 
 
 class PandasTradingResultsDataTable(TradingResultsDataTable):
@@ -20,11 +125,13 @@ class PandasTradingResultsDataTable(TradingResultsDataTable):
     Таблица данных о результатах торгов, служащая адаптером для данных,
     импортированных в виде pandas таблицы
     """
+    source_frame: pd.DataFrame
     frame: pd.DataFrame
     date: datetime.date
 
 
     def __init__(self, frame: pd.DataFrame, date: datetime.date) -> None:
+        self.source_frame = frame
         self.frame = self._extract_table(frame)
         self.date = date
     
@@ -59,8 +166,6 @@ class PandasTradingResultsDataTable(TradingResultsDataTable):
 
     def _find_table_start_index(self, frame: pd.DataFrame) -> int:
         """Извлекает индекс строки начала нужной таблицы"""
-        HEADERS_OFFSET = 2
-        TABLE_NAME = 'Единица измерения: Метрическая тонна'
         table_name_search_result = frame.iloc[:, 0] == TABLE_NAME
         table_name_row_index = int(table_name_search_result.argmax())
         return table_name_row_index + 1 + HEADERS_OFFSET
@@ -68,7 +173,6 @@ class PandasTradingResultsDataTable(TradingResultsDataTable):
 
     def _find_table_end_index(self, frame: pd.DataFrame) -> int:
         """Извлекает индекс строки конца нужной таблицы"""
-        SUMMARY_CELL_NAME = 'Итого:'
         summary_row_search_result = frame.iloc[:, 0] == SUMMARY_CELL_NAME
         summary_row_row_index = int(summary_row_search_result.argmax())
         return summary_row_row_index
@@ -83,32 +187,350 @@ class PandasTradingResultsDataTable(TradingResultsDataTable):
 
     def list_results(self) -> List[models.TradingResult]:
         """Возвращает список результатов торгов"""
-        results: List[models.TradingResult] = []
+        return self.list_batch().list_results()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает результаты торгов в виде пакета столбцов"""
+        return self._convert_table(self.frame, models.METRIC_TON_UNIT)
+    
 
-        for row in self.frame.itertuples():
-            trading_result = self._parse_row(row)
-            results.append(trading_result)
+    def iter_results(
+        self,
+        chunk_size: int = RESULTS_CHUNK_SIZE,
+    ) -> Iterator[List[models.TradingResult]]:
+        """Возвращает результаты торгов частями заданного размера
         
-        return results
+        Каждая часть преобразуется из строк pandas таблицы по требованию
+        """
+        for chunk_start in range(0, len(self.frame), chunk_size):
+            chunk_frame = self.frame.iloc[chunk_start:chunk_start + chunk_size]
+            chunk = self._convert_table(chunk_frame, models.METRIC_TON_UNIT)
+            yield chunk.list_results()
     
 
-    def _parse_row(self, row: NamedTuple) -> models.TradingResult:
-        """Приводит строку столбца данных в необходимый вид"""
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает результаты торгов во всех единицах измерения
+        
+        Таблицы всех единиц измерения находятся за один проход по столбцу
+        кодов инструментов исходной таблицы
+        """
+        frame = self._skip_empty_column(self.source_frame)
+        sections = find_table_sections(frame.iloc[:, 0].tolist())
+        return [self._convert_section(frame, section) for section in sections]
+    
+
+    def _convert_section(
+        self,
+        frame: pd.DataFrame,
+        section: TableSection,
+    ) -> models.TradingResultBatch:
+        """Преобразует строки таблицы одной единицы измерения в пакет"""
+        section_frame = frame.iloc[section.start_index:section.end_index]
+        section_frame = self._drop_nan_contracts(section_frame)
+        return self._convert_table(section_frame, section.unit)
+    
+
+    def _convert_table(
+        self,
+        frame: pd.DataFrame,
+        unit: str,
+    ) -> models.TradingResultBatch:
+        """Преобразует строки таблицы в пакет столбцов
+
+        Преобразование выполняется по столбцам целиком, а не построчно.
+        Повторяющиеся строковые значения интернируются
+        """
+        exchange_product_ids = frame.iloc[:, 0].astype(str)
+        exchange_product_names = frame.iloc[:, 1]
+        delivery_basis_names = frame.iloc[:, 2]
+        volumes = frame.iloc[:, 3].astype('int64')
+        totals = frame.iloc[:, 4].astype('int64')
+        counts = frame.iloc[:, -1].astype('int64')
+
+        oil_ids = exchange_product_ids.str[:4]
+        delivery_basis_ids = exchange_product_ids.str[4:7]
+        delivery_type_ids = exchange_product_ids.str[-1]
+
         current_datetime = datetime.datetime.now()
-        exchange_product_id = row[1]
-        oil_trading_record = models.TradingResult(
-            id=None,
-            exchange_product_id=exchange_product_id,
-            exchange_product_name=row[2],
-            oil_id=exchange_product_id[:4],
-            delivery_basis_id=exchange_product_id[4:7],
-            delivery_basis_name=row[3],
-            delivery_type_id=exchange_product_id[-1],
-            volume=int(row[4]),
-            total=int(row[5]),
-            count=int(row[-1]),
+
+        return models.TradingResultBatch(
+            exchange_product_id=string_util.intern_strings(exchange_product_ids),
+            exchange_product_name=string_util.intern_strings(exchange_product_names),
+            oil_id=string_util.intern_strings(oil_ids),
+            delivery_basis_id=string_util.intern_strings(delivery_basis_ids),
+            delivery_basis_name=string_util.intern_strings(delivery_basis_names),
+            delivery_type_id=string_util.intern_strings(delivery_type_ids),
+            volume=volumes.tolist(),
+            total=totals.tolist(),
+            count=counts.tolist(),
             date=self.date,
             created_on=current_datetime,
             updated_on=current_datetime,
+            unit=string_util.intern_string(unit),
         )
-        return oil_trading_record
+
+
+class WindowedPandasTradingResultsDataTable(PandasTradingResultsDataTable):
+    """Таблица данных о результатах торгов
+    
+    Таблица данных о результатах торгов, служащая адаптером для pandas
+    таблицы, уже ограниченной строками таблиц результатов торгов и столбцами
+    кода инструмента, его названия, базиса поставки, объема, суммы
+    и количества договоров. Расположение таблиц каждой единицы измерения
+    указывается относительно начала переданной таблицы. Если оно не указано,
+    вся переданная таблица считается таблицей в метрических тоннах
+    """
+    sections: List[TableSection]
+
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        date: datetime.date,
+        sections: Optional[List[TableSection]] = None,
+    ) -> None:
+        if sections is None:
+            sections = [TableSection(models.METRIC_TON_UNIT, 0, len(frame))]
+        
+        self.sections = sections
+        super().__init__(frame, date)
+    
+
+    def _extract_table(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Извлекает таблицу в метрических тоннах без пустых строк"""
+        section = find_section(self.sections, models.METRIC_TON_UNIT)
+
+        if section is None:
+            return frame.iloc[0:0]
+        
+        frame = frame.iloc[section.start_index:section.end_index]
+        return self._drop_nan_contracts(frame)
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает результаты торгов во всех единицах измерения"""
+        return [
+            self._convert_section(self.source_frame, section)
+            for section in self.sections
+        ]
+
+
+class XlrdTradingResultsDataTable(TradingResultsDataTable):
+    """Таблица данных о результатах торгов
+    
+    Таблица данных о результатах торгов, читающая таблицы результатов торгов
+    напрямую из листа xls-файла, открытого через xlrd, без построения pandas
+    таблицы. Расположение таблиц всех единиц измерения, если оно не указано
+    заранее, определяется за один проход по столбцу кодов инструментов,
+    после чего считываются только нужные столбцы и строки
+    """
+    sheet: xlrd.sheet.Sheet
+    date: datetime.date
+    sections: List[TableSection]
+
+    MISSING_VALUES = ('', '-')
+
+
+    def __init__(
+        self,
+        sheet: xlrd.sheet.Sheet,
+        date: datetime.date,
+        sections: Optional[List[TableSection]] = None,
+    ) -> None:
+        self.sheet = sheet
+        self.date = date
+
+        if sections is None:
+            sections = self._find_table_sections()
+        
+        self.sections = sections
+    
+
+    def _find_table_sections(self) -> List[TableSection]:
+        """Находит таблицы всех единиц измерения"""
+        if self.sheet.ncols <= TOTAL_COL_INDEX:
+            return []
+        
+        return find_table_sections(self.sheet.col_values(PRODUCT_ID_COL_INDEX))
+    
+
+    def _read_column(self, col_index: int, section: TableSection) -> List[Any]:
+        """Считывает значения столбца в пределах таблицы"""
+        return self.sheet.col_values(
+            col_index,
+            start_rowx=section.start_index,
+            end_rowx=section.end_index,
+        )
+    
+
+    def _find_non_empty_contracts_rows(self, section: TableSection) -> List[int]:
+        """Возвращает номера строк таблицы с непустым числом контрактов"""
+        contracts = self._read_column(self.sheet.ncols - 1, section)
+        return [
+            row_index
+            for row_index, value in enumerate(contracts)
+            if value not in self.MISSING_VALUES
+        ]
+    
+
+    def _read_selected_rows(
+        self,
+        col_index: int,
+        section: TableSection,
+        rows: List[int],
+    ) -> List[Any]:
+        """Считывает значения указанных строк таблицы из столбца
+        
+        Номера строк должны идти по возрастанию. Считываются только строки
+        от первой указанной до последней
+        """
+        if not rows:
+            return []
+        
+        column = self.sheet.col_values(
+            col_index,
+            start_rowx=section.start_index + rows[0],
+            end_rowx=section.start_index + rows[-1] + 1,
+        )
+        return [column[row_index - rows[0]] for row_index in rows]
+
+
+    def list_results(self) -> List[models.TradingResult]:
+        """Возвращает список результатов торгов"""
+        return self.list_batch().list_results()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает результаты торгов в виде пакета столбцов"""
+        section = find_section(self.sections, models.METRIC_TON_UNIT)
+
+        if section is None:
+            return models.TradingResultBatch.create_empty(self.date)
+        
+        return self._read_section(section)
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает результаты торгов во всех единицах измерения"""
+        return [self._read_section(section) for section in self.sections]
+    
+
+    def iter_results(
+        self,
+        chunk_size: int = RESULTS_CHUNK_SIZE,
+    ) -> Iterator[List[models.TradingResult]]:
+        """Возвращает результаты торгов частями заданного размера
+        
+        Каждая часть считывается с листа по требованию
+        """
+        section = find_section(self.sections, models.METRIC_TON_UNIT)
+
+        if section is None:
+            return
+        
+        rows = self._find_non_empty_contracts_rows(section)
+
+        for chunk_start in range(0, len(rows), chunk_size):
+            chunk_rows = rows[chunk_start:chunk_start + chunk_size]
+            yield self._read_rows(section, chunk_rows).list_results()
+    
+
+    def _read_section(self, section: TableSection) -> models.TradingResultBatch:
+        """Считывает таблицу одной единицы измерения в пакет столбцов"""
+        rows = self._find_non_empty_contracts_rows(section)
+        return self._read_rows(section, rows)
+    
+
+    def _read_rows(
+        self,
+        section: TableSection,
+        rows: List[int],
+    ) -> models.TradingResultBatch:
+        """Считывает указанные строки таблицы в пакет столбцов
+        
+        Повторяющиеся строковые значения интернируются
+        """
+        exchange_product_ids = [
+            str(value)
+            for value in self._read_selected_rows(
+                PRODUCT_ID_COL_INDEX,
+                section,
+                rows,
+            )
+        ]
+        exchange_product_names = self._read_selected_rows(
+            PRODUCT_NAME_COL_INDEX,
+            section,
+            rows,
+        )
+        delivery_basis_names = self._read_selected_rows(
+            DELIVERY_BASIS_NAME_COL_INDEX,
+            section,
+            rows,
+        )
+        volumes = self._read_selected_rows(VOLUME_COL_INDEX, section, rows)
+        totals = self._read_selected_rows(TOTAL_COL_INDEX, section, rows)
+        counts = self._read_selected_rows(self.sheet.ncols - 1, section, rows)
+
+        current_datetime = datetime.datetime.now()
+
+        return models.TradingResultBatch(
+            exchange_product_id=string_util.intern_strings(exchange_product_ids),
+            exchange_product_name=string_util.intern_strings(exchange_product_names),
+            oil_id=string_util.intern_strings(
+                product_id[:4] for product_id in exchange_product_ids
+            ),
+            delivery_basis_id=string_util.intern_strings(
+                product_id[4:7] for product_id in exchange_product_ids
+            ),
+            delivery_basis_name=string_util.intern_strings(delivery_basis_names),
+            delivery_type_id=string_util.intern_strings(
+                product_id[-1] for product_id in exchange_product_ids
+            ),
+            volume=[int(value) for value in volumes],
+            total=[int(value) for value in totals],
+            count=[int(value) for value in counts],
+            date=self.date,
+            created_on=current_datetime,
+            updated_on=current_datetime,
+            unit=string_util.intern_string(section.unit),
+        )
+
+
+class BatchTradingResultsDataTable(TradingResultsDataTable):
+    """Таблица данных о результатах торгов
+    
+    Таблица данных о результатах торгов, уже прочитанных и преобразованных
+    в пакеты столбцов по одному на каждую единицу измерения
+    """
+    batches: List[models.TradingResultBatch]
+    date: datetime.date
+
+
+    def __init__(
+        self,
+        batches: List[models.TradingResultBatch],
+        date: datetime.date,
+    ) -> None:
+        self.batches = batches
+        self.date = date
+    
+
+    def list_results(self) -> List[models.TradingResult]:
+        """Возвращает список результатов торгов"""
+        return self.list_batch().list_results()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает результаты торгов в виде пакета столбцов"""
+        for batch in self.batches:
+            if batch.unit == models.METRIC_TON_UNIT:
+                return batch
+        
+        return models.TradingResultBatch.create_empty(self.date)
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает результаты торгов во всех единицах измерения"""
+        return self.batches
@@ -0,0 +1,300 @@
+import http
+import os
+import re
+import tempfile
+from typing import BinaryIO
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+from typing import Union
+
+from spimex_parser.modules.parser import metadata
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_MEMORY_SIZE = 64 * 1024 ** 2
+MAX_RESUME_ATTEMPTS = 3
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+)-\d+/(\d+|\*)')
+REPORT_FILE_SUFFIX = '.xls'
+
+ReportSource = Union[bytes, bytearray, str]
+
+
+class IncompleteDownloadError(IOError):
+    """Размер загруженного файла не совпадает с заявленным сервером"""
+
+
+def get_expected_size(headers: Mapping[str, str]) -> Optional[int]:
+    """Возвращает размер загружаемого файла по заголовкам ответа
+
+    Если размер неизвестен или содержимое передается в сжатом виде,
+    возвращает None
+    """
+    if headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    
+    content_length = headers.get('Content-Length')
+
+    if content_length is None or not content_length.isdigit():
+        return None
+    
+    return int(content_length)
+
+
+def get_range_start(headers: Mapping[str, str]) -> Optional[int]:
+    """Возвращает позицию начала части файла из заголовка Content-Range"""
+    match = CONTENT_RANGE_PATTERN.fullmatch(headers.get('Content-Range', ''))
+
+    if match is None:
+        return None
+    
+    return int(match.group(1))
+
+
+class ReportBuffer:
+    """Буфер, в который по частям загружается файл отчета
+
+    Если сервер сообщил размер файла и он не превышает max_memory_size,
+    под содержимое заранее выделяется bytearray нужного размера, и части
+    файла записываются прямо в него. Иначе части файла записываются во
+    временный файл на диске. Парсеру передается сам буфер или путь
+    к временному файлу, поэтому содержимое файла не копируется после
+    загрузки. Временный файл удаляется при закрытии буфера
+    """
+    size: int
+    expected_size: Optional[int]
+    _buffer: Optional[bytearray]
+    _file: Optional[BinaryIO]
+    _path: Optional[str]
+
+
+    def __init__(
+        self,
+        expected_size: Optional[int],
+        max_memory_size: int,
+    ) -> None:
+        self.size = 0
+        self.expected_size = expected_size
+        self._buffer = None
+        self._file = None
+        self._path = None
+
+        if expected_size is not None and expected_size <= max_memory_size:
+            self._buffer = bytearray(expected_size)
+        else:
+            self._file = tempfile.NamedTemporaryFile(
+                suffix=REPORT_FILE_SUFFIX,
+                delete=False,
+            )
+
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ReportBuffer':
+        """Создает буфер из уже полученного файла на диске
+
+        Файл передается парсеру по пути и удаляется при закрытии буфера
+        """
+        report_buffer = cls(expected_size=0, max_memory_size=0)
+        report_buffer._path = path
+        report_buffer.size = os.path.getsize(path)
+        report_buffer.expected_size = report_buffer.size
+        return report_buffer
+
+
+    def is_complete(self) -> bool:
+        """Проверяет, что файл заявленного размера загружен целиком"""
+        return self.expected_size is None or self.size == self.expected_size
+
+
+    def write(self, chunk: bytes) -> None:
+        """Записывает очередную часть файла"""
+        if self._buffer is None:
+            self._file.write(chunk)
+            self.size += len(chunk)
+            return
+
+        end_index = self.size + len(chunk)
+
+        if end_index > len(self._buffer):
+            raise IncompleteDownloadError(
+                f'Received more than {len(self._buffer)} bytes'
+            )
+
+        self._buffer[self.size:end_index] = chunk
+        self.size = end_index
+
+
+    def read_from(self, stream: BinaryIO) -> None:
+        """Записывает в буфер все содержимое потока
+
+        В заранее выделенный буфер данные читаются через readinto
+        без промежуточных объектов bytes
+        """
+        if self._buffer is None:
+            while chunk := stream.read(DOWNLOAD_CHUNK_SIZE):
+                self.write(chunk)
+            return
+
+        with memoryview(self._buffer) as view:
+            while self.size < len(view):
+                read_count = stream.readinto(view[self.size:])
+
+                if not read_count:
+                    break
+
+                self.size += read_count
+
+
+    def get_source(self) -> ReportSource:
+        """Возвращает содержимое файла или путь к нему для передачи парсеру"""
+        if self._path is not None:
+            return self._path
+
+        if not self.is_complete():
+            raise IncompleteDownloadError(
+                f'Received {self.size} of {self.expected_size} bytes'
+            )
+
+        if self._buffer is not None:
+            return self._buffer
+
+        self._file.flush()
+        return self._file.name
+
+
+    def read_contents(self) -> Union[bytes, bytearray]:
+        """Возвращает содержимое файла
+
+        Содержимое, находящееся в памяти, возвращается без копирования,
+        а временный файл читается с диска целиком
+        """
+        source = self.get_source()
+
+        if isinstance(source, str):
+            with open(source, 'rb') as report_file:
+                return report_file.read()
+
+        return source
+
+
+    def close(self) -> None:
+        """Освобождает буфер и удаляет временный файл"""
+        self._buffer = None
+
+        if self._path is not None:
+            os.unlink(self._path)
+            self._path = None
+
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self._file.name)
+            self._file = None
+
+
+    def __enter__(self) -> 'ReportBuffer':
+        return self
+
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+
+class ReportDownload:
+    """Загрузка файла отчета с проверкой изменений и докачкой
+
+    Если известны валидаторы ранее загруженного файла, файл запрашивается
+    условным запросом, на который сервер отвечает кодом 304, если файл
+    не изменился. Если загрузка прервалась, следующий запрос запрашивает
+    только недостающую часть файла заголовком Range. Заголовок If-Range
+    гарантирует, что при изменении файла сервер вернет его целиком,
+    и загрузка начнется заново
+    """
+    max_memory_size: int
+    stored_metadata: Optional[metadata.ReportMetadata]
+    response_metadata: Optional[metadata.ReportMetadata]
+    buffer: Optional[ReportBuffer]
+    not_modified: bool
+
+
+    def __init__(
+        self,
+        max_memory_size: int,
+        stored_metadata: Optional[metadata.ReportMetadata] = None,
+    ) -> None:
+        self.max_memory_size = max_memory_size
+        self.stored_metadata = stored_metadata
+        self.response_metadata = None
+        self.buffer = None
+        self.not_modified = False
+
+
+    def get_request_headers(self) -> Dict[str, str]:
+        """Возвращает заголовки очередного запроса файла"""
+        if self._can_resume():
+            return {
+                'Range': f'bytes={self.buffer.size}-',
+                'If-Range': self.response_metadata.get_range_validator(),
+            }
+        
+        if self.buffer is None and self.stored_metadata is not None:
+            return self.stored_metadata.get_conditional_headers()
+        
+        return {}
+
+
+    def _can_resume(self) -> bool:
+        """Проверяет, можно ли докачать прерванную загрузку"""
+        return (
+            self.buffer is not None
+            and self.buffer.size > 0
+            and self.response_metadata is not None
+            and self.response_metadata.get_range_validator() is not None
+        )
+
+
+    def start_response(self, status: int, headers: Mapping[str, str]) -> None:
+        """Подготавливает буфер к приему тела ответа сервера
+
+        Ответ с частью файла дописывается в имеющийся буфер, а ответ с файлом
+        целиком записывается в новый буфер
+        """
+        if status == http.HTTPStatus.NOT_MODIFIED:
+            self.not_modified = True
+            return
+        
+        if status == http.HTTPStatus.PARTIAL_CONTENT:
+            if self.buffer is None or get_range_start(headers) != self.buffer.size:
+                raise IncompleteDownloadError(
+                    f'Unexpected range: {headers.get("Content-Range")}'
+                )
+            
+            return
+        
+        self.restart()
+        self.buffer = ReportBuffer(
+            get_expected_size(headers),
+            self.max_memory_size,
+        )
+        self.response_metadata = metadata.ReportMetadata.from_headers(headers)
+
+
+    def restart(self) -> None:
+        """Отбрасывает загруженную часть файла"""
+        if self.buffer is not None:
+            self.buffer.close()
+        
+        self.buffer = None
+        self.response_metadata = None
+
+
+    def is_complete(self) -> bool:
+        """Проверяет, завершена ли загрузка"""
+        if self.not_modified:
+            return True
+        
+        return self.buffer is not None and self.buffer.is_complete()
+
+
+    def close(self) -> None:
+        """Освобождает буфер загрузки"""
+        self.restart()
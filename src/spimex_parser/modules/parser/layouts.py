@@ -0,0 +1,301 @@
+import collections
+import dataclasses
+import hashlib
+import threading
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import xlrd.sheet
+
+from spimex_parser.modules.parser import data_table
+
+
+EXPECTED_HEADERS = {
+    data_table.PRODUCT_ID_COL_INDEX: 'Код Инструмента',
+    data_table.PRODUCT_NAME_COL_INDEX: 'Наименование Инструмента',
+    data_table.DELIVERY_BASIS_NAME_COL_INDEX: 'Базис поставки',
+}
+
+
+class ReportLayoutError(ValueError):
+    """Расположение столбцов нужной таблицы отличается от ожидаемого"""
+
+
+@dataclasses.dataclass(frozen=True)
+class ReportLayout:
+    """Расположение таблиц результатов торгов в отчете
+
+    Отпечаток строится по положению и названию первой таблицы и содержимому
+    строки заголовков ее столбцов, поэтому одинаковые отпечатки означают
+    одинаковое расположение начала таблиц и их столбцов. Число строк листа
+    после последней таблицы запоминается, чтобы заметить таблицы, добавленные
+    после нее
+    """
+    fingerprint: str
+    sections: Tuple[data_table.TableSection, ...]
+    contracts_col_index: int
+    trailing_rows_count: int
+
+
+class ReportSheet:
+    """Лист отчета, по которому определяется расположение нужной таблицы"""
+    def count_rows(self) -> int:
+        """Возвращает число строк листа"""
+        raise NotImplementedError()
+
+
+    def read_key_value(self, row_index: int) -> Any:
+        """Возвращает значение столбца кодов инструментов в указанной строке"""
+        raise NotImplementedError()
+
+
+    def read_key_column(self, start_index: int = 0) -> Sequence[Any]:
+        """Возвращает столбец кодов инструментов, начиная с указанной строки"""
+        raise NotImplementedError()
+
+
+    def read_row(self, row_index: int) -> Sequence[Any]:
+        """Возвращает значения указанной строки"""
+        raise NotImplementedError()
+
+
+class XlrdReportSheet(ReportSheet):
+    """Лист отчета, открытый через xlrd"""
+    sheet: xlrd.sheet.Sheet
+
+
+    def __init__(self, sheet: xlrd.sheet.Sheet) -> None:
+        self.sheet = sheet
+
+
+    def count_rows(self) -> int:
+        """Возвращает число строк листа"""
+        return self.sheet.nrows
+
+
+    def read_key_value(self, row_index: int) -> Any:
+        """Возвращает значение столбца кодов инструментов в указанной строке"""
+        return self.sheet.cell_value(row_index, data_table.PRODUCT_ID_COL_INDEX)
+
+
+    def read_key_column(self, start_index: int = 0) -> Sequence[Any]:
+        """Возвращает столбец кодов инструментов, начиная с указанной строки"""
+        return self.sheet.col_values(
+            data_table.PRODUCT_ID_COL_INDEX,
+            start_rowx=start_index,
+        )
+
+
+    def read_row(self, row_index: int) -> Sequence[Any]:
+        """Возвращает значения указанной строки"""
+        return self.sheet.row_values(row_index)
+
+
+class ReportLayoutCache:
+    """Кэш расположения таблиц результатов торгов в отчетах
+
+    Расположение таблиц в отчетах Spimex подолгу не меняется, поэтому
+    после полного просмотра отчета оно запоминается по отпечатку заголовка
+    первой таблицы. Для следующих отчетов сначала проверяются запомненные
+    расположения: отпечаток заголовка первой таблицы и строки заголовков ее
+    столбцов должен совпадать, в столбце кодов инструментов на прежних
+    местах должны находиться названия всех таблиц и строки "Итого:", а
+    число строк после последней таблицы - не меняться. Проверяются только
+    эти граничные строки, а при несовпадении хотя бы одной из них (в том
+    числе при изменении числа строк таблиц) отчет просматривается полностью.
+
+    Заголовки столбцов, по которым читаются таблицы, проверяются у всех
+    таблиц, кроме первой таблицы запомненного расположения, и при их
+    несовпадении возбуждается ReportLayoutError
+    """
+    max_size: int
+    layouts: collections.OrderedDict
+    hits: int
+    misses: int
+
+
+    def __init__(self, max_size: int = 16) -> None:
+        self.max_size = max_size
+        self.layouts = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+
+    def resolve(self, sheet: ReportSheet) -> Optional[ReportLayout]:
+        """Возвращает расположение таблиц результатов торгов в отчете
+
+        Если таблицы в отчете не найдены, возвращает None
+        """
+        with self._lock:
+            known_layouts = list(reversed(self.layouts.values()))
+
+        for known_layout in known_layouts:
+            layout = self._validate(sheet, known_layout)
+
+            if layout is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.layouts[layout.fingerprint] = layout
+                    self.layouts.move_to_end(layout.fingerprint)
+                return layout
+
+        layout = self._scan(sheet)
+
+        with self._lock:
+            self.misses += 1
+
+            if layout is not None:
+                self.layouts[layout.fingerprint] = layout
+                self.layouts.move_to_end(layout.fingerprint)
+
+                while len(self.layouts) > self.max_size:
+                    self.layouts.popitem(last=False)
+
+        return layout
+
+
+    def clear(self) -> None:
+        """Забывает запомненные расположения и обнуляет счетчики"""
+        with self._lock:
+            self.layouts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+    def _validate(
+        self,
+        sheet: ReportSheet,
+        layout: ReportLayout,
+    ) -> Optional[ReportLayout]:
+        """Проверяет, подходит ли запомненное расположение к отчету
+
+        Возвращает расположение с найденными границами таблиц или None,
+        если расположение не подходит
+        """
+        first_section = layout.sections[0]
+        table_name_row_index = get_table_name_row_index(first_section.start_index)
+
+        trailing_rows_count = sheet.count_rows() - layout.sections[-1].end_index
+
+        if trailing_rows_count != layout.trailing_rows_count:
+            return None
+
+        table_name = sheet.read_key_value(table_name_row_index)
+        headers_row = sheet.read_row(table_name_row_index + 1)
+        fingerprint = compute_fingerprint(
+            table_name_row_index,
+            table_name,
+            headers_row,
+        )
+
+        if fingerprint != layout.fingerprint:
+            return None
+
+        for section in layout.sections:
+            if not matches_section_boundaries(sheet, section):
+                return None
+
+        for section in layout.sections[1:]:
+            validate_section_headers(sheet, section)
+
+        return layout
+
+
+    def _scan(self, sheet: ReportSheet) -> Optional[ReportLayout]:
+        """Определяет расположение таблиц полным просмотром отчета"""
+        sections = data_table.find_table_sections(sheet.read_key_column())
+
+        if not sections:
+            return None
+
+        headers_rows = [
+            validate_section_headers(sheet, section)
+            for section in sections
+        ]
+        table_name_row_index = get_table_name_row_index(sections[0].start_index)
+        fingerprint = compute_fingerprint(
+            table_name_row_index,
+            sheet.read_key_value(table_name_row_index),
+            headers_rows[0],
+        )
+
+        return ReportLayout(
+            fingerprint=fingerprint,
+            sections=tuple(sections),
+            contracts_col_index=len(headers_rows[0]) - 1,
+            trailing_rows_count=sheet.count_rows() - sections[-1].end_index,
+        )
+
+
+def get_table_name_row_index(table_start_index: int) -> int:
+    """Возвращает индекс строки заголовка таблицы по индексу ее начала"""
+    return table_start_index - 1 - data_table.HEADERS_OFFSET
+
+
+def compute_fingerprint(
+    table_name_row_index: int,
+    table_name: Any,
+    headers_row: Sequence[Any],
+) -> str:
+    """Вычисляет отпечаток расположения таблиц"""
+    fingerprint_source = '\x1f'.join([
+        str(table_name_row_index),
+        normalize_header(table_name),
+        *(normalize_header(value) for value in headers_row),
+    ])
+    return hashlib.sha1(fingerprint_source.encode('utf-8')).hexdigest()
+
+
+def matches_section_boundaries(
+    sheet: ReportSheet,
+    section: data_table.TableSection,
+) -> bool:
+    """Проверяет, что название таблицы и строка "Итого:" находятся на местах"""
+    table_name = sheet.read_key_value(get_table_name_row_index(section.start_index))
+    summary = sheet.read_key_value(section.end_index)
+
+    if not isinstance(table_name, str):
+        return False
+    
+    if not table_name.startswith(data_table.TABLE_NAME_PREFIX):
+        return False
+    
+    unit = table_name[len(data_table.TABLE_NAME_PREFIX):].strip()
+    return unit == section.unit and summary == data_table.SUMMARY_CELL_NAME
+
+
+def validate_section_headers(
+    sheet: ReportSheet,
+    section: data_table.TableSection,
+) -> Sequence[Any]:
+    """Проверяет заголовки столбцов таблицы и возвращает строку заголовков"""
+    headers_row = sheet.read_row(section.start_index - data_table.HEADERS_OFFSET)
+    validate_headers(headers_row)
+    return headers_row
+
+
+def validate_headers(headers_row: Sequence[Any]) -> None:
+    """Проверяет заголовки столбцов, по которым читается таблица"""
+    for col_index, expected_header in EXPECTED_HEADERS.items():
+        header = None
+
+        if col_index < len(headers_row):
+            header = normalize_header(headers_row[col_index])
+
+        if header != expected_header:
+            raise ReportLayoutError(
+                f'Unexpected header in column {col_index}: '
+                f'{header!r} instead of {expected_header!r}'
+            )
+
+
+def normalize_header(value: Any) -> str:
+    """Приводит заголовок столбца к виду без переносов и лишних пробелов"""
+    return ' '.join(str(value).split())
+
+
+layout_cache = ReportLayoutCache()
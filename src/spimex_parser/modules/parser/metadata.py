@@ -0,0 +1,128 @@
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+
+
+@dataclasses.dataclass(frozen=True)
+class ReportMetadata:
+    """Валидаторы HTTP загруженного файла отчета
+
+    Значения заголовков ETag и Last-Modified ответа сервера, по которым
+    при следующей загрузке проверяется, изменился ли файл, и хэш
+    содержимого файла, которому они соответствуют
+    """
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    file_hash: Optional[str] = None
+
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> 'ReportMetadata':
+        """Извлекает валидаторы из заголовков ответа сервера"""
+        return cls(
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+
+
+    def is_empty(self) -> bool:
+        """Проверяет, что сервер не передал ни одного валидатора"""
+        return self.etag is None and self.last_modified is None
+
+
+    def get_conditional_headers(self) -> Dict[str, str]:
+        """Возвращает заголовки условного запроса файла
+
+        Сервер отвечает на такой запрос кодом 304 без тела ответа, если файл
+        не изменился
+        """
+        headers = {}
+
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+
+        return headers
+
+
+    def get_range_validator(self) -> Optional[str]:
+        """Возвращает значение заголовка If-Range для докачки файла
+
+        Слабые ETag не подходят для докачки, поэтому вместо них
+        используется дата изменения файла
+        """
+        if self.etag is not None and not self.etag.startswith('W/'):
+            return self.etag
+
+        return self.last_modified
+
+
+class ReportMetadataStore:
+    """Хранилище валидаторов HTTP загруженных файлов отчетов"""
+    def get(self, url: str) -> Optional[ReportMetadata]:
+        """Возвращает валидаторы файла, загруженного по указанной ссылке
+
+        Возвращает None в случае, если файл по ссылке еще не загружался
+        """
+        raise NotImplementedError()
+
+
+    def put(self, url: str, metadata: ReportMetadata) -> None:
+        """Сохраняет валидаторы файла, загруженного по указанной ссылке"""
+        raise NotImplementedError()
+
+
+class FileSystemReportMetadataStore(ReportMetadataStore):
+    """Хранилище валидаторов HTTP загруженных файлов отчетов на диске
+
+    Валидаторы каждой ссылки хранятся в отдельном JSON-файле, название
+    которого равно хэшу ссылки
+    """
+    directory: pathlib.Path
+
+
+    def __init__(self, directory: str) -> None:
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+
+    def get(self, url: str) -> Optional[ReportMetadata]:
+        """Возвращает валидаторы файла, загруженного по указанной ссылке
+
+        Возвращает None в случае, если файл по ссылке еще не загружался
+        или запись хранилища повреждена
+        """
+        try:
+            fields = json.loads(self._get_path(url).read_text())
+            return ReportMetadata(**fields)
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            return None
+
+
+    def put(self, url: str, metadata: ReportMetadata) -> None:
+        """Сохраняет валидаторы файла, загруженного по указанной ссылке"""
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory)
+
+        try:
+            with os.fdopen(file_descriptor, 'w') as temp_file:
+                json.dump(dataclasses.asdict(metadata), temp_file)
+
+            os.replace(temp_path, self._get_path(url))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+    def _get_path(self, url: str) -> pathlib.Path:
+        """Возвращает путь к записи хранилища для указанной ссылки"""
+        return self.directory / f'{hashlib.sha256(url.encode()).hexdigest()}.json'
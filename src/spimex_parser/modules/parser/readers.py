@@ -0,0 +1,253 @@
+import datetime
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import pandas as pd
+import xlrd
+import xlrd.sheet
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import downloads
+from spimex_parser.modules.parser import layouts
+
+
+BatchReader = Callable[
+    [downloads.ReportSource, datetime.date],
+    List[models.TradingResultBatch],
+]
+
+TABLE_COLUMN_TYPES = {
+    data_table.PRODUCT_ID_COL_INDEX: 'str',
+    data_table.PRODUCT_NAME_COL_INDEX: 'str',
+    data_table.DELIVERY_BASIS_NAME_COL_INDEX: 'str',
+    data_table.VOLUME_COL_INDEX: 'object',
+    data_table.TOTAL_COL_INDEX: 'object',
+}
+
+
+def read_batches(
+    batch_reader: BatchReader,
+    source: downloads.ReportSource,
+    date: datetime.date,
+    parsed_results_cache: Optional[caches.ParsedResultsCache] = None,
+    content_hash: Optional[str] = None,
+) -> List[models.TradingResultBatch]:
+    """Читает результаты торгов из содержимого файла или файла по пути
+    указанной функцией
+    
+    Если указан кэш разобранных результатов, результаты берутся из него,
+    а при их отсутствии - читаются из файла и сохраняются в кэш. Если хэш
+    содержимого файла уже известен, он не вычисляется повторно
+    """
+    if parsed_results_cache is None:
+        return batch_reader(source, date)
+    
+    if content_hash is None:
+        content_hash = hash_source(source)
+
+    batches = parsed_results_cache.get(content_hash, date)
+
+    if batches is None:
+        batches = batch_reader(source, date)
+        parsed_results_cache.put(content_hash, batches)
+    
+    return batches
+
+
+def hash_source(source: downloads.ReportSource) -> str:
+    """Возвращает хэш содержимого файла или файла по пути"""
+    if isinstance(source, str):
+        return caches.hash_file(source)
+    
+    return caches.hash_contents(source)
+
+
+def read_pandas_batches(
+    source: downloads.ReportSource,
+    date: datetime.date,
+) -> List[models.TradingResultBatch]:
+    """Читает результаты торгов из xls-файла через pandas
+    
+    Книга открывается через xlrd прямо из переданного буфера или
+    отображенного в память файла без копирования содержимого файла. Функция не зависит от состояния вызывающей стороны,
+    поэтому может выполняться в отдельном потоке или процессе
+    """
+    workbook = open_xlrd_book(source)
+
+    try:
+        frame, sections = read_pandas_frame(workbook)
+    finally:
+        workbook.release_resources()
+
+    return data_table.WindowedPandasTradingResultsDataTable(
+        frame,
+        date,
+        sections,
+    ).list_batches()
+
+
+def read_pandas_frame(
+    source: Union[str, BinaryIO, xlrd.Book],
+    layout_cache: layouts.ReportLayoutCache = layouts.layout_cache,
+) -> Tuple[pd.DataFrame, List[data_table.TableSection]]:
+    """Читает из xls-файла только строки и столбцы таблиц результатов торгов
+    
+    Чтение выполняется в два этапа: сначала по столбцу кодов инструментов
+    и строкам заголовков определяется расположение таблиц всех единиц
+    измерения (с помощью кэша расположений), а затем через xlrd считываются
+    только ячейки нужных столбцов строк от начала первой таблицы до конца
+    последней, из которых строится pandas таблица. Остальные ячейки листа
+    не преобразуются. Книга открывается единожды для обоих этапов, а
+    переданная книга не закрывается.
+
+    Возвращает считанную таблицу и расположение таблиц каждой единицы
+    измерения относительно ее начала
+    """
+    if isinstance(source, xlrd.Book):
+        return read_xlrd_book_frame(source, layout_cache)
+    
+    if isinstance(source, str):
+        workbook = open_xlrd_book(source)
+    else:
+        workbook = open_xlrd_book(source.read())
+
+    try:
+        return read_xlrd_book_frame(workbook, layout_cache)
+    finally:
+        workbook.release_resources()
+
+
+def read_xlrd_book_frame(
+    workbook: xlrd.Book,
+    layout_cache: layouts.ReportLayoutCache,
+) -> Tuple[pd.DataFrame, List[data_table.TableSection]]:
+    """Читает таблицы результатов торгов с первого листа открытой книги"""
+    sheet = workbook.sheet_by_index(0)
+    layout = layout_cache.resolve(layouts.XlrdReportSheet(sheet))
+
+    if layout is None:
+        frame = pd.DataFrame(columns=range(len(TABLE_COLUMN_TYPES) + 1))
+        return frame, []
+    
+    window_start_index = layout.sections[0].start_index
+    window_end_index = layout.sections[-1].end_index
+    column_types = {
+        **TABLE_COLUMN_TYPES,
+        layout.contracts_col_index: 'object',
+    }
+
+    frame = pd.DataFrame({
+        col_index: read_xlrd_column(
+            sheet,
+            col_index,
+            window_start_index,
+            window_end_index,
+            column_type,
+        )
+        for col_index, column_type in column_types.items()
+    })
+    sections = [
+        section.shift(-window_start_index)
+        for section in layout.sections
+    ]
+    return frame, sections
+
+
+def read_xlrd_column(
+    sheet: xlrd.sheet.Sheet,
+    col_index: int,
+    start_index: int,
+    end_index: int,
+    column_type: str,
+) -> pd.Series:
+    """Считывает указанные строки столбца листа xls-файла
+    
+    Пустые ячейки и прочерки заменяются пропущенными значениями, а
+    значения строковых столбцов приводятся к строкам
+    """
+    values = sheet.col_values(col_index, start_index, end_index)
+    return pd.Series([
+        convert_xlrd_value(value, column_type)
+        for value in values
+    ], dtype=object)
+
+
+def convert_xlrd_value(value: Any, column_type: str) -> Any:
+    """Преобразует значение ячейки xls-файла к типу столбца"""
+    if value in data_table.XlrdTradingResultsDataTable.MISSING_VALUES:
+        return None
+    
+    if column_type == 'str':
+        return str(value)
+    
+    return value
+
+
+def read_xlrd_batches(
+    source: downloads.ReportSource,
+    date: datetime.date,
+) -> List[models.TradingResultBatch]:
+    """Читает результаты торгов из xls-файла через xlrd
+    
+    Функция не зависит от состояния вызывающей стороны, поэтому может
+    выполняться в отдельном потоке или процессе
+    """
+    if isinstance(source, str):
+        sheet = open_xlrd_sheet(path=source)
+    else:
+        sheet = open_xlrd_sheet(file_contents=source)
+
+    return create_xlrd_table(sheet, date).list_batches()
+
+
+def create_xlrd_table(
+    sheet: xlrd.sheet.Sheet,
+    date: datetime.date,
+    layout_cache: layouts.ReportLayoutCache = layouts.layout_cache,
+) -> data_table.XlrdTradingResultsDataTable:
+    """Создает таблицу результатов торгов по листу xls-файла
+    
+    Расположение таблиц определяется с помощью кэша расположений
+    """
+    layout = layout_cache.resolve(layouts.XlrdReportSheet(sheet))
+
+    if layout is None:
+        return data_table.XlrdTradingResultsDataTable(sheet, date, [])
+    
+    sections = list(layout.sections)
+    return data_table.XlrdTradingResultsDataTable(sheet, date, sections)
+
+
+def open_xlrd_book(source: downloads.ReportSource) -> xlrd.Book:
+    """Открывает xls-файл по пути или из содержимого файла
+    
+    Содержимое файла (bytes или bytearray) используется xlrd без
+    копирования, а файл по пути отображается в память. Листы книги
+    загружаются по требованию
+    """
+    if isinstance(source, str):
+        return xlrd.open_workbook(source, on_demand=True, use_mmap=True)
+    
+    return xlrd.open_workbook(file_contents=source, on_demand=True)
+
+
+def open_xlrd_sheet(
+    path: Optional[str] = None,
+    file_contents: Optional[Union[bytes, bytearray]] = None,
+) -> xlrd.sheet.Sheet:
+    """Открывает первый лист xls-файла по пути или из содержимого файла
+    
+    Файл по пути отображается в память. После загрузки листа ресурсы книги
+    освобождаются, а сам лист остается доступным для чтения
+    """
+    workbook = open_xlrd_book(path if path is not None else file_contents)
+    sheet = workbook.sheet_by_index(0)
+    workbook.release_resources()
+    return sheet
@@ -1,4 +1,5 @@
 import datetime
+from typing import Iterator
 from typing import List
 
 from spimex_parser.domain import models
@@ -10,6 +11,24 @@ class SpimexTradingResultsRepository:
     def list(self) -> List[models.TradingResult]:
         """Возвращает список данных о результатах торгов"""
         raise NotImplementedError()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает данные о результатах торгов в виде пакета столбцов"""
+        raise NotImplementedError()
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает данные о результатах торгов во всех единицах измерения"""
+        raise NotImplementedError()
+    
+
+    def iter_results(
+        self,
+        chunk_size: int = data_table.RESULTS_CHUNK_SIZE,
+    ) -> Iterator[List[models.TradingResult]]:
+        """Возвращает данные о результатах торгов частями заданного размера"""
+        raise NotImplementedError()
 
 
 class TableSpimexTradingResultsRepository(SpimexTradingResultsRepository):
@@ -34,3 +53,21 @@ class TableSpimexTradingResultsRepository(SpimexTradingResultsRepository):
     def list(self) -> List[models.TradingResult]:
         """Возвращает список данных о результатах торгов"""
         return self.results_data_table.list_results()
+    
+
+    def list_batch(self) -> models.TradingResultBatch:
+        """Возвращает данные о результатах торгов в виде пакета столбцов"""
+        return self.results_data_table.list_batch()
+    
+
+    def list_batches(self) -> List[models.TradingResultBatch]:
+        """Возвращает данные о результатах торгов во всех единицах измерения"""
+        return self.results_data_table.list_batches()
+    
+
+    def iter_results(
+        self,
+        chunk_size: int = data_table.RESULTS_CHUNK_SIZE,
+    ) -> Iterator[List[models.TradingResult]]:
+        """Возвращает данные о результатах торгов частями заданного размера"""
+        return self.results_data_table.iter_results(chunk_size)
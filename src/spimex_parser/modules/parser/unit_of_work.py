@@ -1,39 +1,120 @@
+import concurrent.futures
+import dataclasses
 import datetime
+import http
+import http.client
 import os.path
+import urllib.error
 import urllib.parse
+import urllib.request
+from typing import List
+from typing import Optional
 
-import pandas as pd
-
+from spimex_parser.domain import models
 from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import downloads
+from spimex_parser.modules.parser import readers
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import metadata
 from spimex_parser.modules.parser import repositories
 
 
+RESUMABLE_ERRORS = (http.client.IncompleteRead, ConnectionError, TimeoutError)
+
+
 class SpimexTradingResultsUnitOfWork:
-    """Единица работы с данными о результатах торгов со Spimex"""
+    """Единица работы с данными о результатах торгов со Spimex
+    
+    Если файл не изменился с прошлой обработки, not_modified равен True,
+    а хранилище результатов торгов пусто. Хэш содержимого загруженного
+    файла доступен в file_hash
+    """
     data: repositories.SpimexTradingResultsRepository
+    not_modified: bool
+    file_hash: Optional[str]
 
     def __enter__(self) -> 'SpimexTradingResultsUnitOfWork':
         raise NotImplementedError()
     
 
+    def commit(self) -> None:
+        """Отмечает файл как обработанный, чтобы не обрабатывать его
+        повторно, пока он не изменится
+        """
+        raise NotImplementedError()
+    
+
     def __exit__(self, *args, **kwargs) -> None:
         raise NotImplementedError()
 
 
-class PandasSpimexTradingResultsUnitOfWork(SpimexTradingResultsUnitOfWork):
+class ExcelSpimexTradingResultsUnitOfWork(SpimexTradingResultsUnitOfWork):
     """Единица работы с данными о результатах торгов со Spimex
     
     Единица работы с данными о результатах торгов со Spimex, полученных
-    в виде excel-таблицы
+    в виде excel-таблицы. Способ чтения таблицы определяется наследниками.
+
+    Локальные файлы читаются напрямую, а удаленные загружаются по ссылке
+    или берутся из указанного кэша загруженных файлов. Если указан кэш
+    разобранных результатов, результаты торгов берутся из него по хэшу
+    содержимого файла.
+
+    Удаленные файлы читаются из ответа сервера прямо в буфер, размер
+    которого определяется по заголовку Content-Length, а файлы больше
+    max_memory_size или без заголовка Content-Length - во временный файл
+    на диске. Прерванные загрузки докачиваются не более max_resume_attempts
+    раз.
+
+    Если указано хранилище валидаторов HTTP, файлы запрашиваются условными
+    запросами по валидаторам, сохраненным при фиксации единицы работы,
+    но только если хэш файла, которому они соответствуют, равен
+    stored_file_hash - хэшу файла, результаты торгов которого сохранены
+    в базе данных. Неизмененные файлы не загружаются и не разбираются.
+    Файлы из кэша загруженных файлов также запрашиваются условными
+    запросами по валидаторам, сохраненным вместе с ними, и используются,
+    только если сервер подтвердил, что файл не изменился.
+
+    Если указан пул исполнителей, загруженные файлы разбираются в нем.
+    Для пула процессов файлы всегда загружаются во временный файл на диске,
+    чтобы передавать процессу путь к файлу, а не его содержимое
     """
-    def __init__(self, oil_data_path: str) -> None:
+    executor: Optional[concurrent.futures.Executor]
+    report_cache: Optional[caches.ReportCache]
+    parsed_results_cache: Optional[caches.ParsedResultsCache]
+    metadata_store: Optional[metadata.ReportMetadataStore]
+    stored_file_hash: Optional[str]
+    max_memory_size: int
+    max_resume_attempts: int
+    _response_metadata: Optional[metadata.ReportMetadata]
+
+
+    def __init__(
+        self,
+        oil_data_path: str,
+        executor: Optional[concurrent.futures.Executor] = None,
+        report_cache: Optional[caches.ReportCache] = None,
+        parsed_results_cache: Optional[caches.ParsedResultsCache] = None,
+        max_memory_size: int = downloads.MAX_MEMORY_SIZE,
+        metadata_store: Optional[metadata.ReportMetadataStore] = None,
+        max_resume_attempts: int = downloads.MAX_RESUME_ATTEMPTS,
+        stored_file_hash: Optional[str] = None,
+    ) -> None:
         self.oil_data_path = oil_data_path
+        self.executor = executor
+        self.report_cache = report_cache
+        self.parsed_results_cache = parsed_results_cache
+        self.max_memory_size = max_memory_size
+        self.metadata_store = metadata_store
+        self.max_resume_attempts = max_resume_attempts
+        self.stored_file_hash = stored_file_hash
+        self.not_modified = False
+        self.file_hash = None
+        self._response_metadata = None
 
 
     def __enter__(self) -> SpimexTradingResultsUnitOfWork:
-        frame = pd.read_excel(self.oil_data_path, na_values=['-'])
         date = self._parse_date_from_path(self.oil_data_path)
-        trading_results_table = data_table.PandasTradingResultsDataTable(frame, date)
+        trading_results_table = self._load_table(self.oil_data_path, date)
         self.data = repositories.TableSpimexTradingResultsRepository(
             trading_results_table,
             date,
@@ -41,6 +122,216 @@ class PandasSpimexTradingResultsUnitOfWork(SpimexTradingResultsUnitOfWork):
         return self
     
 
+    def _load_table(
+        self,
+        path: str,
+        date: datetime.date,
+    ) -> data_table.TradingResultsDataTable:
+        """Загружает таблицу данных о результатах торгов из указанного файла"""
+        if self._is_url(path):
+            report_buffer = self._download_file(path)
+
+            if report_buffer is None:
+                self.not_modified = True
+                return data_table.BatchTradingResultsDataTable([], date)
+            
+            with report_buffer:
+                source = report_buffer.get_source()
+                self.file_hash = readers.hash_source(source)
+                trading_results_batches = self._read_batches(source, date)
+        elif self.parsed_results_cache is not None:
+            trading_results_batches = self._read_batches(path, date)
+        else:
+            return self._read_table(path, date)
+        
+        return data_table.BatchTradingResultsDataTable(
+            trading_results_batches,
+            date,
+        )
+    
+
+    def _is_url(self, path: str) -> bool:
+        """Проверяет, является ли путь к файлу ссылкой"""
+        return urllib.parse.urlparse(path).scheme in ('http', 'https')
+    
+
+    def _read_batches(
+        self,
+        source: downloads.ReportSource,
+        date: datetime.date,
+    ) -> List[models.TradingResultBatch]:
+        """Читает результаты торгов из содержимого файла или файла по пути
+
+        Если указан пул исполнителей, файл читается в нем
+        """
+        read_arguments = (
+            self._get_batch_reader(),
+            source,
+            date,
+            self.parsed_results_cache,
+            self.file_hash,
+        )
+
+        if self.executor is None:
+            return readers.read_batches(*read_arguments)
+        
+        return self.executor.submit(readers.read_batches, *read_arguments).result()
+    
+
+    def _download_file(self, url: str) -> Optional[downloads.ReportBuffer]:
+        """Возвращает буфер с содержимым файла, загруженного по ссылке
+        или взятого из кэша
+
+        Файл запрашивается условным запросом по валидаторам, сохраненным
+        при прошлой обработке, или по валидаторам файла в кэше. Файл из кэша
+        используется, только если сервер ответил, что он не изменился.
+        Возвращает None в случае, если файл не изменился с прошлой обработки
+        """
+        stored_metadata = self._get_stored_metadata(url)
+        cached_metadata = self._get_cached_metadata(url)
+        download = self._download(url, stored_metadata or cached_metadata)
+
+        if download.not_modified and stored_metadata is not None:
+            return None
+        
+        if download.not_modified and self.report_cache is not None:
+            cached_path = self.report_cache.get(url)
+
+            if cached_path is not None:
+                self._response_metadata = cached_metadata
+                return downloads.ReportBuffer.from_file(cached_path)
+            
+            download = self._download(url, None)
+        
+        self._response_metadata = download.response_metadata
+        
+        if self.report_cache is not None:
+            self.report_cache.put(
+                url,
+                download.buffer.get_source(),
+                download.response_metadata,
+            )
+        
+        return download.buffer
+    
+
+    def _download(
+        self,
+        url: str,
+        request_metadata: Optional[metadata.ReportMetadata],
+    ) -> downloads.ReportDownload:
+        """Загружает файл по ссылке условным запросом по указанным
+        валидаторам или, если они не указаны, безусловным запросом
+        """
+        download = downloads.ReportDownload(
+            self._get_max_memory_size(),
+            request_metadata,
+        )
+
+        try:
+            self._fetch(url, download)
+        except BaseException:
+            download.close()
+            raise
+
+        return download
+    
+
+    def _fetch(self, url: str, download: downloads.ReportDownload) -> None:
+        """Загружает файл по ссылке, докачивая его при обрыве соединения"""
+        for attempt in range(self.max_resume_attempts + 1):
+            request = urllib.request.Request(
+                url,
+                headers=download.get_request_headers(),
+            )
+
+            try:
+                with urllib.request.urlopen(request) as response:
+                    download.start_response(response.status, response.headers)
+                    download.buffer.read_from(response)
+            except urllib.error.HTTPError as e:
+                if e.code == http.HTTPStatus.NOT_MODIFIED:
+                    download.start_response(e.code, e.headers)
+                    return
+                
+                if e.code != http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+                    raise
+                
+                download.restart()
+                continue
+            except RESUMABLE_ERRORS:
+                if attempt == self.max_resume_attempts:
+                    raise
+                
+                continue
+            
+            if download.is_complete():
+                return
+        
+        raise downloads.IncompleteDownloadError(f'Could not download {url}')
+    
+
+    def _get_stored_metadata(self, url: str) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы файла, сохраненные при прошлой обработке
+
+        Валидаторы не используются, если результаты торгов файла, которому
+        они соответствуют, не сохранены в базе данных
+        """
+        if self.metadata_store is None or self.stored_file_hash is None:
+            return None
+        
+        stored_metadata = self.metadata_store.get(url)
+
+        if stored_metadata is None or stored_metadata.file_hash != self.stored_file_hash:
+            return None
+        
+        return stored_metadata
+    
+
+    def _get_cached_metadata(self, url: str) -> Optional[metadata.ReportMetadata]:
+        """Возвращает валидаторы файла, сохраненные в кэше загруженных файлов"""
+        if self.report_cache is None:
+            return None
+        
+        return self.report_cache.get_metadata(url)
+    
+
+    def _get_max_memory_size(self) -> int:
+        """Возвращает наибольший размер файла, загружаемого в память"""
+        if isinstance(self.executor, concurrent.futures.ProcessPoolExecutor):
+            return 0
+        
+        return self.max_memory_size
+    
+
+    def commit(self) -> None:
+        """Сохраняет валидаторы загруженного файла и хэш его содержимого
+        в хранилище валидаторов
+        """
+        if self.metadata_store is None or self._response_metadata is None:
+            return
+        
+        if not self._response_metadata.is_empty():
+            self.metadata_store.put(
+                self.oil_data_path,
+                dataclasses.replace(self._response_metadata, file_hash=self.file_hash),
+            )
+    
+
+    def _read_table(
+        self,
+        path: str,
+        date: datetime.date,
+    ) -> data_table.TradingResultsDataTable:
+        """Читает таблицу данных о результатах торгов из локального файла"""
+        raise NotImplementedError()
+    
+
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        raise NotImplementedError()
+    
+
     def _parse_date_from_path(self, path: str) -> datetime.date:
         """Извлекает дату из пути к файлу данных"""
         file_name = self._parse_file_name_from_path(path)
@@ -65,3 +356,50 @@ class PandasSpimexTradingResultsUnitOfWork(SpimexTradingResultsUnitOfWork):
 
     def __exit__(self, *args, **kwargs) -> None:
         return
+
+
+class PandasSpimexTradingResultsUnitOfWork(ExcelSpimexTradingResultsUnitOfWork):
+    """Единица работы с данными о результатах торгов со Spimex
+    
+    Единица работы с данными о результатах торгов со Spimex, полученных
+    в виде excel-таблицы и прочитанных через pandas
+    """
+    def _read_table(
+        self,
+        path: str,
+        date: datetime.date,
+    ) -> data_table.TradingResultsDataTable:
+        """Читает таблицу данных о результатах торгов из локального файла"""
+        frame, sections = readers.read_pandas_frame(path)
+        return data_table.WindowedPandasTradingResultsDataTable(
+            frame,
+            date,
+            sections,
+        )
+    
+
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        return readers.read_pandas_batches
+
+
+class XlrdSpimexTradingResultsUnitOfWork(ExcelSpimexTradingResultsUnitOfWork):
+    """Единица работы с данными о результатах торгов со Spimex
+    
+    Единица работы с данными о результатах торгов со Spimex, полученных
+    в виде xls-таблицы и прочитанных напрямую через xlrd. Локальные файлы
+    отображаются в память
+    """
+    def _read_table(
+        self,
+        path: str,
+        date: datetime.date,
+    ) -> data_table.TradingResultsDataTable:
+        """Читает таблицу данных о результатах торгов из локального файла"""
+        sheet = readers.open_xlrd_sheet(path=path)
+        return readers.create_xlrd_table(sheet, date)
+    
+
+    def _get_batch_reader(self) -> readers.BatchReader:
+        """Возвращает функцию чтения результатов торгов из содержимого файла"""
+        return readers.read_xlrd_batches
@@ -0,0 +1,90 @@
+import argparse
+import datetime
+from collections.abc import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from spimex_parser.domain import models
+from spimex_parser.modules import datetime_util
+from spimex_parser.modules import job_ledger
+from spimex_parser.modules import trading_calendar
+
+
+REPORT_TIME = datetime.time(hour=16, minute=20)
+
+
+def create_arg_parser() -> argparse.ArgumentParser:
+    """Создает разборщик аргументов командной строки консольных приложений"""
+    parser = argparse.ArgumentParser(
+        description='Загрузка результатов торгов Spimex в базу данных',
+    )
+    parser.add_argument(
+        '--start',
+        type=datetime.date.fromisoformat,
+        help='первая дата (по умолчанию день после последней сохраненной даты)',
+    )
+    parser.add_argument(
+        '--end',
+        type=datetime.date.fromisoformat,
+        help='последняя дата включительно (по умолчанию текущий день)',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help=(
+            'загрузить все даты диапазона, в том числе успешно загруженные, '
+            'например, чтобы проверить изменения опубликованных отчетов'
+        ),
+    )
+    return parser
+
+
+def get_date_range(
+    start: Optional[datetime.date],
+    end: Optional[datetime.date],
+    last_date: Optional[datetime.date],
+    default_start_date: datetime.date,
+) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Возвращает границы диапазона дат загружаемых файлов данных
+
+    По умолчанию загружаются только файлы дат, следующих за последней
+    сохраненной в базе данных датой last_date, вплоть до текущего дня
+    """
+    if start is None:
+        start = datetime_util.get_incremental_start_date(last_date, default_start_date)
+
+    if end is None:
+        end = datetime.date.today()
+
+    return datetime_util.get_datetime_bounds(start, end, REPORT_TIME)
+
+
+def select_report_dates(
+    calendar: trading_calendar.TradingCalendar,
+    retry_policy: job_ledger.JobRetryPolicy,
+    ingestion_jobs: Iterable[models.IngestionJob],
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    force: bool = False,
+) -> List[datetime.datetime]:
+    """Возвращает даты загружаемых файлов данных
+
+    Из указанного диапазона исключаются успешно загруженные даты (если
+    force не равен True), а неудачные и прерванные загрузки из журнала,
+    которые пора повторить, добавляются. Затем остаются только дни,
+    в которые могли проводиться торги
+    """
+    requested_dates = (
+        current_date.date()
+        for current_date in datetime_util.datetime_range(start_date, end_date)
+    )
+    selected_dates = retry_policy.select_dates(
+        requested_dates,
+        ingestion_jobs,
+        datetime.datetime.now(),
+        force,
+    )
+    return list(calendar.filter_trading_days(
+        datetime.datetime.combine(date, REPORT_TIME) for date in selected_dates
+    ))
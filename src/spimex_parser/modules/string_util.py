@@ -0,0 +1,46 @@
+import sys
+from collections.abc import Iterable
+from typing import List
+from typing import Optional
+from typing import overload
+
+
+@overload
+def intern_string(value: str) -> str:
+    ...
+
+
+@overload
+def intern_string(value: Optional[str]) -> Optional[str]:
+    ...
+
+
+def intern_string(value: Optional[str]) -> Optional[str]:
+    """Интернирует строку, пропуская значения других типов
+
+    Одинаковые интернированные строки разделяют один объект в памяти,
+    что экономит память при большом числе повторяющихся значений
+    """
+    if not isinstance(value, str):
+        return value
+    
+    return sys.intern(value)
+
+
+@overload
+def intern_strings(values: Iterable[str]) -> List[str]:
+    ...
+
+
+@overload
+def intern_strings(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    ...
+
+
+def intern_strings(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Интернирует каждую строку из указанной последовательности
+
+    Тип элементов возвращаемого списка совпадает с типом элементов
+    указанной последовательности
+    """
+    return [intern_string(value) for value in values]
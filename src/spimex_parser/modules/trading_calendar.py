@@ -0,0 +1,159 @@
+import datetime
+import json
+import os
+import pathlib
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+WEEKEND_DAYS = (5, 6)
+
+
+class MissingDatesStore:
+    """Хранилище дат, за которые подтверждено отсутствие отчетов"""
+    def list(self) -> List[datetime.date]:
+        """Возвращает сохраненные даты"""
+        raise NotImplementedError()
+
+
+    def add(self, date: datetime.date) -> None:
+        """Сохраняет дату, за которую нет отчета"""
+        raise NotImplementedError()
+
+
+class FileSystemMissingDatesStore(MissingDatesStore):
+    """Хранилище дат без отчетов в JSON-файле"""
+    path: pathlib.Path
+
+
+    def __init__(self, path: str) -> None:
+        self.path = pathlib.Path(path)
+
+
+    def list(self) -> List[datetime.date]:
+        """Возвращает сохраненные даты"""
+        try:
+            formatted_dates = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return []
+
+        return [datetime.date.fromisoformat(value) for value in formatted_dates]
+
+
+    def add(self, date: datetime.date) -> None:
+        """Сохраняет дату, за которую нет отчета"""
+        dates = set(self.list())
+
+        if date in dates:
+            return
+
+        dates.add(date)
+        formatted_dates = [value.isoformat() for value in sorted(dates)]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.path.parent)
+
+        try:
+            with os.fdopen(file_descriptor, 'w') as temp_file:
+                json.dump(formatted_dates, temp_file)
+
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class TradingCalendar:
+    """Календарь торговых дней биржи
+
+    Торговыми считаются все дни, кроме выходных, праздников и дат,
+    за которые подтверждено отсутствие отчетов. Выходные дни, перенесенные
+    на рабочие (например, рабочие субботы), задаются отдельно и считаются
+    торговыми, как и будние дни. Даты, результаты торгов которых уже
+    известны, считаются торговыми в любом случае. Даты без отчетов подтверждаются только для прошедших
+    дней, поскольку отчет за текущий день публикуется после окончания торгов
+    """
+    holidays: Set[datetime.date]
+    workdays: Set[datetime.date]
+    trading_dates: Set[datetime.date]
+    missing_dates: Set[datetime.date]
+    missing_dates_store: Optional[MissingDatesStore]
+
+
+    def __init__(
+        self,
+        holidays: Iterable[datetime.date] = (),
+        trading_dates: Iterable[datetime.date] = (),
+        missing_dates_store: Optional[MissingDatesStore] = None,
+        workdays: Iterable[datetime.date] = (),
+    ) -> None:
+        self.holidays = set(holidays)
+        self.workdays = set(workdays)
+        self.trading_dates = set(trading_dates)
+        self.missing_dates = set()
+        self.missing_dates_store = missing_dates_store
+
+        if missing_dates_store is not None:
+            self.missing_dates.update(missing_dates_store.list())
+
+
+    def is_trading_day(self, date: datetime.date) -> bool:
+        """Проверяет, могли ли в указанный день проводиться торги"""
+        if date in self.trading_dates:
+            return True
+
+        if date.weekday() in WEEKEND_DAYS and date not in self.workdays:
+            return False
+
+        return date not in self.holidays and date not in self.missing_dates
+
+
+    def filter_trading_days(
+        self,
+        datetimes: Iterable[datetime.datetime],
+    ) -> Iterator[datetime.datetime]:
+        """Оставляет только даты, в которые могли проводиться торги"""
+        for current_datetime in datetimes:
+            if self.is_trading_day(current_datetime.date()):
+                yield current_datetime
+
+
+    def add_trading_dates(self, dates: Iterable[datetime.date]) -> None:
+        """Отмечает даты, результаты торгов которых известны"""
+        self.trading_dates.update(dates)
+
+
+    def confirm_missing_date(
+        self,
+        date: datetime.date,
+        today: Optional[datetime.date] = None,
+    ) -> bool:
+        """Отмечает дату, за которую нет отчета
+
+        Возвращает True, если дата отмечена. Текущий и будущие дни, а также
+        дни с известными результатами торгов не отмечаются
+        """
+        if today is None:
+            today = datetime.date.today()
+
+        if date >= today or date in self.trading_dates:
+            return False
+
+        self.missing_dates.add(date)
+
+        if self.missing_dates_store is not None:
+            self.missing_dates_store.add(date)
+
+        return True
+
+
+def parse_dates(value: str) -> List[datetime.date]:
+    """Разбирает список дат в формате ISO, разделенных запятыми"""
+    return [
+        datetime.date.fromisoformat(formatted_date.strip())
+        for formatted_date in value.split(',')
+        if formatted_date.strip()
+    ]
@@ -15,6 +15,9 @@ import spimex_parser.apps.fastapi_app.main
 from spimex_parser import config
 from spimex_parser.database import models as db_models
 
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
 
 @pytest.fixture
 def engine() -> sqlalchemy.engine.Engine:
@@ -30,6 +33,15 @@ async def async_client() -> AsyncIterable[aiohttp.ClientSession]:
         yield client
 
 
+@pytest.fixture
+def reports_server() -> Iterable[server.FakeReportsServer]:
+    reports_server = server.FakeReportsServer({
+        reports.REPORT_FILE_NAME: reports.create_report_bytes(),
+    })
+    with reports_server:
+        yield reports_server
+
+
 @pytest_asyncio.fixture
 async def async_engine() -> sqlalchemy.ext.asyncio.engine.AsyncEngine:
     aengine = sqlalchemy.ext.asyncio.engine.create_async_engine(
@@ -1,3 +1,4 @@
+import datetime
 import uuid
 from typing import Any
 from typing import Dict
@@ -83,6 +84,37 @@ class AsyncFakeTradingResultsRepository(repositories.AsyncTradingResultsReposito
         return trading_results
     
 
+    async def list_dates(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> List[datetime.date]:
+        trading_results = list(self._data.values())
+
+        if result_filter is not None:
+            trading_results = self._filter(trading_results, result_filter)
+        
+        return sorted({trading_result.date for trading_result in trading_results})
+    
+
+    async def count(
+        self,
+        result_filter: Optional[filters.TradingResultFilter] = None,
+    ) -> int:
+        trading_results = list(self._data.values())
+
+        if result_filter is not None:
+            trading_results = self._filter(trading_results, result_filter)
+        
+        return len(trading_results)
+    
+
+    async def get_last_date(self) -> Optional[datetime.date]:
+        return max(
+            (trading_result.date for trading_result in self._data.values()),
+            default=None,
+        )
+    
+
     def _filter(
         self,
         trading_results: List[models.TradingResult],
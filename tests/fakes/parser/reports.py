@@ -0,0 +1,74 @@
+import io
+from typing import Any
+from typing import List
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xlwt
+
+
+REPORT_FILE_NAME = 'oil_xls_20230921162000.xls'
+COLUMNS_COUNT = 15
+
+
+def create_row(*values: Any) -> List[Any]:
+    row = [np.nan, *values]
+    return row + [np.nan] * (COLUMNS_COUNT - len(row))
+
+
+def create_data_row(
+    exchange_product_id: str,
+    volume: Any,
+    total: Any,
+    count: Any,
+) -> List[Any]:
+    row = create_row(
+        exchange_product_id,
+        'Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
+        'ст. Новоярославская',
+        volume,
+        total,
+    )
+    row[-1] = count
+    return row
+
+
+def create_report_rows() -> List[List[Any]]:
+    return [
+        create_row('Бюллетень по итогам торгов'),
+        create_row('Дата торгов: 21.09.2023'),
+        create_row('Единица измерения: Метрическая тонна'),
+        create_row('Код Инструмента', 'Наименование Инструмента', 'Базис поставки'),
+        create_row(np.nan),
+        create_data_row('A100NVY060F', 60, 4_200_000, 1),
+        create_data_row('A592ACH005A', 20.0, 1_100_000.0, 2.0),
+        create_data_row('DSC5ANK060F', np.nan, np.nan, np.nan),
+        create_row('Итого:'),
+        create_row('Единица измерения: Килограмм'),
+        create_row('Код Инструмента', 'Наименование Инструмента', 'Базис поставки'),
+        create_row(np.nan),
+        create_data_row('G000KRS001A', 5, 100, 3),
+        create_row('Итого:'),
+    ]
+
+
+def create_report_frame() -> pd.DataFrame:
+    return pd.DataFrame(create_report_rows())
+
+
+def create_report_bytes(rows: Optional[List[List[Any]]] = None) -> bytes:
+    if rows is None:
+        rows = create_report_rows()
+    
+    workbook = xlwt.Workbook(encoding='utf-8')
+    sheet = workbook.add_sheet('TRADE_SUMMARY')
+
+    for row_index, row in enumerate(rows):
+        for col_index, value in enumerate(row):
+            if not pd.isna(value):
+                sheet.write(row_index, col_index, value)
+    
+    stream = io.BytesIO()
+    workbook.save(stream)
+    return stream.getvalue()
@@ -0,0 +1,152 @@
+import hashlib
+import http.server
+import re
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+REPORTS_PATH = '/upload/reports/oil_xls'
+LAST_MODIFIED = 'Thu, 21 Sep 2023 16:20:00 GMT'
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-')
+
+
+class ReportsRequestHandler(http.server.BaseHTTPRequestHandler):
+    server: 'FakeReportsServer'
+
+
+    def do_GET(self) -> None:
+        self.server.requests.append(self.path)
+        self.server.request_headers.append(dict(self.headers))
+        file_name = self.path.rsplit('/', 1)[-1]
+
+        if self.server.failures:
+            self._send_failure(*self.server.failures.pop(0))
+            return
+
+        if not self.path.startswith(REPORTS_PATH) or file_name not in self.server.reports:
+            self.send_error(404)
+            return
+
+        body = self.server.reports[file_name]
+        etag = self.server.get_etag(file_name)
+
+        if self._is_not_modified(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        range_start = self._get_range_start(etag)
+
+        if range_start is not None and range_start >= len(body):
+            self.send_error(416)
+            return
+
+        if range_start is None:
+            range_start = 0
+            self.send_response(200)
+        else:
+            self.send_response(206)
+            self.send_header(
+                'Content-Range',
+                f'bytes {range_start}-{len(body) - 1}/{len(body)}',
+            )
+
+        part = body[range_start:]
+        self.send_header('Content-Length', str(len(part)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        if self.server.interruptions > 0:
+            self.server.interruptions -= 1
+            part = part[:self.server.interrupt_after]
+
+        self.wfile.write(part)
+
+
+    def _send_failure(self, status: int, retry_after: Optional[str]) -> None:
+        self.send_response(status)
+
+        if retry_after is not None:
+            self.send_header('Retry-After', retry_after)
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+    def _is_not_modified(self, etag: str) -> bool:
+        if 'If-None-Match' in self.headers:
+            return self.headers['If-None-Match'] == etag
+
+        return self.headers.get('If-Modified-Since') == LAST_MODIFIED
+
+
+    def _get_range_start(self, etag: str) -> Optional[int]:
+        match = RANGE_PATTERN.fullmatch(self.headers.get('Range', ''))
+
+        if match is None:
+            return None
+
+        if self.headers.get('If-Range', etag) not in (etag, LAST_MODIFIED):
+            return None
+
+        return int(match.group(1))
+
+
+    def log_message(self, *args, **kwargs) -> None:
+        return
+
+
+class FakeReportsServer(http.server.ThreadingHTTPServer):
+    """Локальный HTTP-сервер, раздающий файлы отчетов по их названиям
+
+    Сервер поддерживает условные запросы по ETag и Last-Modified и запросы
+    части файла. Первые interruptions ответов обрываются после передачи
+    interrupt_after байт тела. Очередные запросы получают ответы
+    из failures: статус и значение заголовка Retry-After
+    """
+    reports: Dict[str, bytes]
+    requests: List[str]
+    request_headers: List[Dict[str, str]]
+    interruptions: int
+    interrupt_after: int
+    failures: List[Tuple[int, Optional[str]]]
+
+
+    def __init__(self, reports: Dict[str, bytes]) -> None:
+        super().__init__(('127.0.0.1', 0), ReportsRequestHandler)
+        self.reports = reports
+        self.requests = []
+        self.request_headers = []
+        self.interruptions = 0
+        self.interrupt_after = 0
+        self.failures = []
+
+
+    def __enter__(self) -> 'FakeReportsServer':
+        thread = threading.Thread(
+            target=self.serve_forever,
+            kwargs={'poll_interval': 0.05},
+            daemon=True,
+        )
+        thread.start()
+        return self
+
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+    def make_url(self, file_name: str) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}{REPORTS_PATH}/{file_name}'
+
+
+    def get_etag(self, file_name: str) -> str:
+        return f'"{hashlib.sha1(self.reports[file_name]).hexdigest()}"'
@@ -1,5 +1,6 @@
 import uuid
 import datetime
+from collections.abc import AsyncIterator
 from typing import List
 
 import pytest
@@ -10,9 +11,11 @@ from spimex_parser.domain import models
 from spimex_parser.modules.data_storage.asyncio import unit_of_work
 
 
-def create_trading_result() -> models.TradingResult:
+def create_trading_result(
+    exchange_product_id: str = 'A100NVY060F',
+) -> models.TradingResult:
     return models.TradingResult(
-        exchange_product_id='A100NVY060F',
+        exchange_product_id=exchange_product_id,
         exchange_product_name='Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
         oil_id='A100',
         delivery_basis_id='NVY',
@@ -27,9 +30,12 @@ def create_trading_result() -> models.TradingResult:
     )
 
 
-def create_trading_result_with_date(date: datetime.date) -> models.TradingResult:
+def create_trading_result_with_date(
+    date: datetime.date,
+    exchange_product_id: str = 'A100NVY060F',
+) -> models.TradingResult:
     return models.TradingResult(
-        exchange_product_id='A100NVY060F',
+        exchange_product_id=exchange_product_id,
         exchange_product_name='Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
         oil_id='A100',
         delivery_basis_id='NVY',
@@ -44,6 +50,29 @@ def create_trading_result_with_date(date: datetime.date) -> models.TradingResult
     )
 
 
+
+def create_trading_results_batch(
+    date: datetime.date = datetime.date(year=2023, month=9, day=21),
+) -> models.TradingResultBatch:
+    return models.TradingResultBatch(
+        exchange_product_id=['A100NVY060F', 'A592ACH005A'],
+        exchange_product_name=[
+            'Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
+            'Бензин (АИ-92-К5), ст. Ачинск (ст. отправления)',
+        ],
+        oil_id=['A100', 'A592'],
+        delivery_basis_id=['NVY', 'ACH'],
+        delivery_basis_name=['ст. Новоярославская', 'ст. Ачинск'],
+        delivery_type_id=['F', 'A'],
+        volume=[60, 20],
+        total=[4_200_000, 1_100_000],
+        count=[1, 2],
+        date=date,
+        created_on=datetime.datetime.now(),
+        updated_on=datetime.datetime.now(),
+    )
+
+
 @pytest.mark.usefixtures('async_engine')
 @pytest.mark.asyncio
 async def test_add_trading_result(
@@ -67,7 +96,7 @@ async def test_add_trading_results(
     async with uow:
         trading_results = [
             create_trading_result(),
-            create_trading_result(),
+            create_trading_result(exchange_product_id='A592ACH005A'),
         ]
         uow.data.add_bulk(trading_results=trading_results)
         await uow.commit()
@@ -113,5 +142,173 @@ async def test_list_trading_results_list_in_order(
         assert get_ids(desc_list) == get_ids(list(reversed(asc_trading_results)))
 
 
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_add_trading_results_batch(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        trading_results_batch = create_trading_results_batch()
+        added_count = await uow.data.add_batch(trading_results_batch)
+        await uow.commit()
+
+        assert added_count == 2
+        assert len(await uow.data.list()) == 2
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_add_trading_results_chunks(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        added_count = await uow.data.add_chunks(iterate_chunks(chunk_size=1))
+        await uow.commit()
+
+        assert added_count == 2
+        assert len(await uow.data.list()) == 2
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_copy_trading_results(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(
+        async_engine,
+        load_method='copy',
+    )
+    later_date = datetime.date(year=2023, month=9, day=22)
+    async with uow:
+        assert await uow.data.add_batch(create_trading_results_batch()) == 2
+        assert await uow.data.add_chunks(iterate_chunks(chunk_size=1, date=later_date)) == 2
+        await uow.commit()
+
+        trading_results = await uow.data.list()
+        assert len(trading_results) == 4
+        assert len(set(get_ids(trading_results))) == 4
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_copy_same_date_twice(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(
+        async_engine,
+        load_method='copy',
+    )
+    async with uow:
+        assert await uow.data.add_batch(create_trading_results_batch()) == 2
+        await uow.commit()
+
+        changed_batch = create_trading_results_batch()
+        changed_batch.volume[0] = 120
+        assert await uow.data.add_chunks(iterate_chunks(chunk_size=1)) == 0
+        assert await uow.data.add_batch(changed_batch) == 1
+        await uow.commit()
+
+        assert await uow.data.count() == 2
+        assert {res.volume for res in await uow.data.list()} == {120, 20}
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_upsert_trading_results(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(
+        async_engine,
+        load_method='upsert',
+    )
+    async with uow:
+        assert await uow.data.add_batch(create_trading_results_batch()) == 2
+        assert await uow.data.add_chunks(iterate_chunks(chunk_size=1)) == 0
+        await uow.commit()
+
+        changed_batch = create_trading_results_batch()
+        changed_batch.volume[0] = 120
+        assert await uow.data.add_batch(changed_batch) == 1
+        await uow.commit()
+
+        assert await uow.data.count() == 2
+        assert {res.volume for res in await uow.data.list()} == {120, 20}
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_upsert_trading_results_added_twice(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(
+        async_engine,
+        load_method='upsert',
+    )
+    async with uow:
+        first_results = uow.data.add_bulk([create_trading_result()])
+        await uow.commit()
+
+        changed_result = create_trading_result()
+        changed_result.volume = 120
+        second_results = uow.data.add_bulk([changed_result])
+        await uow.commit()
+
+        assert second_results[0].id == first_results[0].id
+        assert await uow.data.count() == 1
+        assert (await uow.data.get(first_results[0].id)).volume == 120
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_list_trading_dates(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        uow.data.add_bulk([
+            create_trading_result_with_date(datetime.date(year=2023, month=9, day=25)),
+            create_trading_result_with_date(datetime.date(year=2023, month=9, day=21)),
+            create_trading_result_with_date(
+                datetime.date(year=2023, month=9, day=21),
+                exchange_product_id='A592ACH005A',
+            ),
+        ])
+        await uow.commit()
+
+        assert await uow.data.list_dates() == [
+            datetime.date(year=2023, month=9, day=21),
+            datetime.date(year=2023, month=9, day=25),
+        ]
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_last_trading_date(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    uow = unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        assert await uow.data.get_last_date() is None
+
+        uow.data.add_bulk([
+            create_trading_result_with_date(datetime.date(year=2023, month=9, day=21)),
+            create_trading_result_with_date(datetime.date(year=2023, month=9, day=25)),
+        ])
+        await uow.commit()
+
+        assert await uow.data.get_last_date() == datetime.date(year=2023, month=9, day=25)
+
+
+async def iterate_chunks(
+    chunk_size: int,
+    date: datetime.date = datetime.date(year=2023, month=9, day=21),
+) -> AsyncIterator[List[models.TradingResult]]:
+    for chunk in create_trading_results_batch(date).iter_chunks(chunk_size):
+        yield chunk
+
+
 def get_ids(trading_results: List[models.TradingResult]) -> List[uuid.UUID]:
     return [result.id for result in trading_results] # type: ignore
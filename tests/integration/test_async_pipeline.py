@@ -0,0 +1,171 @@
+import asyncio
+import datetime
+from typing import List
+from typing import Optional
+
+import aiohttp
+import pytest
+import sqlalchemy.ext.asyncio.engine
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import main
+from spimex_parser.domain import models
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage import batching
+from spimex_parser.modules.data_storage.asyncio import unit_of_work as data_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+class FakeServerTradingResultsManager(main.AsyncTradingResultsManager):
+    reports_server: server.FakeReportsServer
+
+
+    def _get_data_file_url(self, date: datetime.datetime) -> str:
+        return self.reports_server.make_url(
+            f'oil_xls_{self._format_date(date)}.xls',
+        )
+
+
+@pytest.mark.usefixtures('async_engine', 'reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_pipeline_stores_results_of_available_dates(
+    monkeypatch: pytest.MonkeyPatch,
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    monkeypatch.setattr(config, 'REPORT_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'PARSED_RESULTS_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'REPORT_METADATA_DIR', None)
+    monkeypatch.setattr(main.deps.database, 'engine', async_engine)
+    calendar = trading_calendar.TradingCalendar()
+    results_manager = FakeServerTradingResultsManager(
+        async_client,
+        calendar=calendar,
+        download_workers=2,
+        parse_workers=2,
+        store_workers=1,
+        queue_size=1,
+    )
+    results_manager.reports_server = reports_server
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (20, 21, 22)
+    ]
+
+    statistics = await results_manager.load_results_from_dates_to_repo(dates)
+
+    assert [stage.name for stage in statistics] == ['download', 'parse', 'store']
+    assert [stage.processed for stage in statistics] == [1, 1, 1]
+    assert statistics[0].failed == 2
+    assert calendar.missing_dates == {
+        datetime.date(year=2023, month=9, day=20),
+        datetime.date(year=2023, month=9, day=22),
+    }
+
+    uow = data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        assert len(await uow.data.list()) == 3
+
+        ingestion_jobs = await uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [
+            models.JOB_STATUS_MISSING,
+            models.JOB_STATUS_COMPLETED,
+            models.JOB_STATUS_MISSING,
+        ]
+        assert ingestion_jobs[1].row_count == 3
+        assert ingestion_jobs[1].file_hash is not None
+        assert all(job.attempts == 1 for job in ingestion_jobs)
+        assert '404' in ingestion_jobs[0].last_error
+
+
+@pytest.mark.usefixtures('async_engine', 'reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_pipeline_writes_reports_in_batches(
+    monkeypatch: pytest.MonkeyPatch,
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    monkeypatch.setattr(config, 'REPORT_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'PARSED_RESULTS_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'REPORT_METADATA_DIR', None)
+    monkeypatch.setattr(main.deps.database, 'engine', async_engine)
+    reports_server.reports['oil_xls_20230922162000.xls'] = reports_server.reports[
+        reports.REPORT_FILE_NAME
+    ]
+    results_manager = FakeServerTradingResultsManager(
+        async_client,
+        write_batch_rows=1000,
+        write_batch_delay=60,
+    )
+    results_manager.reports_server = reports_server
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (21, 22)
+    ]
+
+    await results_manager.load_results_from_dates_to_repo(dates)
+
+    uow = data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        assert len(await uow.data.list()) == 6
+        assert [job.row_count for job in await uow.jobs.list()] == [3, 3]
+
+
+class DelayedTradingResultsManager(FakeServerTradingResultsManager):
+    delayed_date: datetime.datetime
+    written_batches: List[List[datetime.date]]
+
+
+    async def _download_report(self, date: datetime.datetime) -> Optional[main.ReportJob]:
+        if date == self.delayed_date:
+            await asyncio.sleep(0.5)
+
+        return await super()._download_report(date)
+
+
+    async def _commit_written_reports(self, write_result: batching.WriteBatchResult) -> None:
+        self.written_batches.append([
+            report.ingestion_job.date for report in write_result.reports
+        ])
+        await super()._commit_written_reports(write_result)
+
+
+@pytest.mark.usefixtures('async_engine', 'reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_expired_batch_written_without_new_reports(
+    monkeypatch: pytest.MonkeyPatch,
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    monkeypatch.setattr(config, 'REPORT_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'PARSED_RESULTS_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'REPORT_METADATA_DIR', None)
+    monkeypatch.setattr(main.deps.database, 'engine', async_engine)
+    reports_server.reports['oil_xls_20230922162000.xls'] = reports_server.reports[
+        reports.REPORT_FILE_NAME
+    ]
+    results_manager = DelayedTradingResultsManager(
+        async_client,
+        download_workers=2,
+        write_batch_rows=1000,
+        write_batch_delay=0.1,
+    )
+    results_manager.reports_server = reports_server
+    results_manager.delayed_date = datetime.datetime(year=2023, month=9, day=22, hour=16, minute=20)
+    results_manager.written_batches = []
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (21, 22)
+    ]
+
+    await results_manager.load_results_from_dates_to_repo(dates)
+
+    assert results_manager.written_batches == [
+        [datetime.date(year=2023, month=9, day=21)],
+        [datetime.date(year=2023, month=9, day=22)],
+    ]
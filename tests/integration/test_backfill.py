@@ -0,0 +1,82 @@
+import datetime
+
+import aiohttp
+import pytest
+import sqlalchemy.ext.asyncio.engine
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import backfill
+from spimex_parser.apps.console_async import main
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage.asyncio import unit_of_work as data_unit_of_work
+
+from tests.fakes.parser import server
+
+
+class FakeServerTradingResultsManager(main.AsyncTradingResultsManager):
+    reports_url: str
+
+
+    def _get_data_file_url(self, date: datetime.datetime) -> str:
+        return f'{self.reports_url}oil_xls_{self._format_date(date)}.xls'
+
+
+class FakeServerShardRunner(backfill.ShardRunner):
+    reports_url: str
+
+
+    def __init__(self, reports_url: str) -> None:
+        self.reports_url = reports_url
+
+
+    def create_manager(
+        self,
+        client: aiohttp.ClientSession,
+        calendar: trading_calendar.TradingCalendar,
+    ) -> main.AsyncTradingResultsManager:
+        config.REPORT_CACHE_DIR = None
+        config.PARSED_RESULTS_CACHE_DIR = None
+        config.REPORT_METADATA_DIR = None
+        results_manager = FakeServerTradingResultsManager(client, calendar=calendar)
+        results_manager.reports_url = self.reports_url
+        return results_manager
+
+
+@pytest.mark.usefixtures('async_engine', 'reports_server')
+@pytest.mark.asyncio
+async def test_backfill_runs_shards_in_processes(
+    monkeypatch: pytest.MonkeyPatch,
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    monkeypatch.setattr(main.deps.database, 'engine', async_engine)
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (20, 21, 22)
+    ]
+
+    backfill_result = await backfill.run_backfill(
+        dates,
+        processes=2,
+        shard_runner=FakeServerShardRunner(reports_server.make_url('')),
+        progress_interval=0.1,
+    )
+
+    assert backfill_result.errors == []
+    assert backfill_result.missing_dates == {
+        datetime.date(year=2023, month=9, day=20),
+        datetime.date(year=2023, month=9, day=22),
+    }
+    download_statistics = backfill_result.statistics[0]
+    assert download_statistics.name == 'download'
+    assert download_statistics.workers == 2
+    assert download_statistics.processed == 1
+    assert download_statistics.failed == 2
+
+    uow = data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+    async with uow:
+        assert len(await uow.data.list()) == 3
+
+        ingestion_jobs = await uow.jobs.list()
+        progress = backfill.count_progress(dates, ingestion_jobs, datetime.datetime.min)
+        assert progress == backfill.BackfillProgress(total=3, completed=1, missing=2)
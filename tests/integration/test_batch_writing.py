@@ -0,0 +1,124 @@
+import contextlib
+import datetime
+from collections.abc import Iterator
+
+import pytest
+import sqlalchemy.engine
+
+from spimex_parser.domain import models
+from spimex_parser.modules.data_storage import batching
+from spimex_parser.modules.data_storage import unit_of_work
+
+from tests.integration.test_data_storage import create_trading_result
+from tests.integration.test_data_storage import create_trading_results_batch
+
+
+def create_pending_report(day: int) -> batching.PendingReport:
+    trading_results_batch = create_trading_results_batch()
+    trading_results_batch.date = datetime.date(year=2023, month=9, day=day)
+    ingestion_job = models.IngestionJob(trading_results_batch.date)
+    ingestion_job.start(datetime.datetime.now())
+    return batching.PendingReport(ingestion_job, [trading_results_batch], 'hash')
+
+
+def create_writer(
+    engine: sqlalchemy.engine.Engine,
+    max_rows: int,
+) -> batching.TradingResultsBatchWriter:
+    @contextlib.contextmanager
+    def get_data_uow() -> Iterator[unit_of_work.TradingResultsUnitOfWork]:
+        with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, 'upsert') as uow:
+            yield uow
+
+    return batching.TradingResultsBatchWriter(get_data_uow, max_rows, max_delay=60)
+
+
+@pytest.mark.usefixtures('engine')
+def test_reports_written_in_one_batch(engine: sqlalchemy.engine.Engine) -> None:
+    writer = create_writer(engine, max_rows=4)
+
+    assert writer.add(create_pending_report(21)) is None
+    write_result = writer.add(create_pending_report(22))
+
+    assert write_result is not None
+    assert write_result.row_count == 4
+    assert len(write_result.reports) == 2
+    assert writer.flush() is None
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert len(uow.data.list()) == 4
+
+        ingestion_jobs = uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [models.JOB_STATUS_COMPLETED] * 2
+        assert [job.row_count for job in ingestion_jobs] == [2, 2]
+
+
+@pytest.mark.usefixtures('engine')
+def test_rewritten_reports_not_duplicated(engine: sqlalchemy.engine.Engine) -> None:
+    writer = create_writer(engine, max_rows=100)
+    writer.add(create_pending_report(21))
+    writer.flush()
+
+    writer.add(create_pending_report(21))
+    write_result = writer.flush()
+
+    assert write_result is not None
+    assert write_result.row_count == 0
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert len(uow.data.list()) == 2
+
+        ingestion_job = uow.jobs.get(datetime.date(year=2023, month=9, day=21))
+        assert ingestion_job is not None
+        assert ingestion_job.status == models.JOB_STATUS_COMPLETED
+        assert ingestion_job.row_count == 2
+
+
+@pytest.mark.usefixtures('engine')
+def test_rows_dropped_from_republished_report_deleted(engine: sqlalchemy.engine.Engine) -> None:
+    stale_result = create_trading_result(exchange_product_id='A100ANK060F')
+    stale_result.date = datetime.date(year=2023, month=9, day=21)
+    other_date_result = create_trading_result(exchange_product_id='A100ANK060F')
+    other_date_result.date = datetime.date(year=2023, month=9, day=22)
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        uow.data.add(stale_result)
+        uow.data.add(other_date_result)
+        uow.commit()
+
+    writer = create_writer(engine, max_rows=100)
+    writer.add(create_pending_report(21))
+    write_result = writer.flush()
+
+    assert write_result is not None
+    assert write_result.row_count == 3
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        trading_results = uow.data.list()
+        assert len(trading_results) == 3
+        assert stale_result.id not in {result.id for result in trading_results}
+
+        ingestion_job = uow.jobs.get(datetime.date(year=2023, month=9, day=21))
+        assert ingestion_job is not None
+        assert ingestion_job.status == models.JOB_STATUS_COMPLETED
+        assert ingestion_job.row_count == 2
+
+
+@pytest.mark.usefixtures('engine')
+def test_batch_with_row_count_mismatch_not_written(engine: sqlalchemy.engine.Engine) -> None:
+    duplicated_report = create_pending_report(22)
+    duplicated_report.batches.append(create_pending_report(22).batches[0])
+
+    writer = create_writer(engine, max_rows=100)
+    writer.add(create_pending_report(21))
+    writer.add(duplicated_report)
+
+    with pytest.raises(batching.BatchWriteError) as error_info:
+        writer.flush()
+
+    assert len(error_info.value.reports) == 2
+    assert isinstance(error_info.value.__cause__, batching.RowCountMismatchError)
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert uow.data.list() == []
+        assert uow.jobs.list() == []
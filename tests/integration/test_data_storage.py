@@ -4,12 +4,15 @@ import pytest
 import sqlalchemy.engine
 
 from spimex_parser.domain import models
+from spimex_parser.modules.data_storage import filters
 from spimex_parser.modules.data_storage import unit_of_work
 
 
-def create_trading_result() -> models.TradingResult:
+def create_trading_result(
+    exchange_product_id: str = 'A100NVY060F',
+) -> models.TradingResult:
     return models.TradingResult(
-        exchange_product_id='A100NVY060F',
+        exchange_product_id=exchange_product_id,
         exchange_product_name='Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
         oil_id='A100',
         delivery_basis_id='NVY',
@@ -24,6 +27,29 @@ def create_trading_result() -> models.TradingResult:
     )
 
 
+
+def create_trading_results_batch(
+    date: datetime.date = datetime.date(year=2023, month=9, day=21),
+) -> models.TradingResultBatch:
+    return models.TradingResultBatch(
+        exchange_product_id=['A100NVY060F', 'A592ACH005A'],
+        exchange_product_name=[
+            'Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)',
+            'Бензин (АИ-92-К5), ст. Ачинск (ст. отправления)',
+        ],
+        oil_id=['A100', 'A592'],
+        delivery_basis_id=['NVY', 'ACH'],
+        delivery_basis_name=['ст. Новоярославская', 'ст. Ачинск'],
+        delivery_type_id=['F', 'A'],
+        volume=[60, 20],
+        total=[4_200_000, 1_100_000],
+        count=[1, 2],
+        date=date,
+        created_on=datetime.datetime.now(),
+        updated_on=datetime.datetime.now(),
+    )
+
+
 @pytest.mark.usefixtures('engine')
 def test_add_trading_result(engine: sqlalchemy.engine.Engine) -> None:
     with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
@@ -39,7 +65,7 @@ def test_add_trading_results(engine: sqlalchemy.engine.Engine) -> None:
     with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
         trading_results = [
             create_trading_result(),
-            create_trading_result(),
+            create_trading_result(exchange_product_id='A592ACH005A'),
         ]
         uow.data.add_bulk(trading_results=trading_results)
         uow.commit()
@@ -56,3 +82,201 @@ def test_get_trading_result(engine: sqlalchemy.engine.Engine) -> None:
 
         assert added_trading_result.id is not None
         assert uow.data.get(trading_result_id=added_trading_result.id) is not None
+
+
+@pytest.mark.usefixtures('engine')
+def test_add_trading_results_batch(engine: sqlalchemy.engine.Engine) -> None:
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        trading_results_batch = create_trading_results_batch()
+        added_count = uow.data.add_batch(trading_results_batch)
+        uow.commit()
+
+        assert added_count == 2
+        assert len(uow.data.list()) == 2
+
+
+@pytest.mark.usefixtures('engine')
+def test_add_trading_results_chunks(engine: sqlalchemy.engine.Engine) -> None:
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        chunks = create_trading_results_batch().iter_chunks(chunk_size=1)
+        added_count = uow.data.add_chunks(chunks)
+        uow.commit()
+
+        assert added_count == 2
+        assert len(uow.data.list()) == 2
+
+
+@pytest.mark.usefixtures('engine')
+def test_trading_results_unit_stored(engine: sqlalchemy.engine.Engine) -> None:
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        trading_results_batch = create_trading_results_batch()
+        trading_results_batch.unit = 'Килограмм'
+        uow.data.add_batch(create_trading_results_batch())
+        uow.data.add_batch(trading_results_batch)
+        uow.commit()
+
+        result_filter = filters.TradingResultFilter(unit='Килограмм')
+        trading_results = uow.data.list(result_filter)
+
+        assert len(trading_results) == 2
+        assert all(res.unit == 'Килограмм' for res in trading_results)
+
+
+@pytest.mark.usefixtures('engine')
+def test_copy_trading_results(engine: sqlalchemy.engine.Engine) -> None:
+    trading_results_batch = create_trading_results_batch()
+    trading_results_batch.exchange_product_name[0] = 'Бензин\tАИ-100\\К5\n'
+    later_batch = create_trading_results_batch(datetime.date(year=2023, month=9, day=22))
+    later_result = create_trading_result()
+    later_result.date = datetime.date(year=2023, month=9, day=25)
+    uow = unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, load_method='copy')
+
+    with uow:
+        assert uow.data.add_batch(trading_results_batch) == 2
+        assert uow.data.add_chunks(later_batch.iter_chunks(chunk_size=1)) == 2
+        added_results = uow.data.add_bulk([later_result])
+        uow.commit()
+
+        assert added_results[0].id is not None
+        assert uow.data.get(added_results[0].id) == added_results[0]
+        assert len(uow.data.list()) == 5
+
+        result_filter = filters.TradingResultFilter(oil_id='A100')
+        product_names = {res.exchange_product_name for res in uow.data.list(result_filter)}
+        assert 'Бензин\tАИ-100\\К5\n' in product_names
+
+
+@pytest.mark.usefixtures('engine')
+def test_copy_same_date_twice(engine: sqlalchemy.engine.Engine) -> None:
+    uow = unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, load_method='copy')
+
+    with uow:
+        assert uow.data.add_batch(create_trading_results_batch()) == 2
+        uow.commit()
+        stored_ids = {res.exchange_product_id: res.id for res in uow.data.list()}
+
+        changed_batch = create_trading_results_batch()
+        changed_batch.volume[1] = 40
+        assert uow.data.add_batch(create_trading_results_batch()) == 0
+        assert uow.data.add_chunks(changed_batch.iter_chunks(chunk_size=1)) == 1
+        uow.commit()
+
+        updated_results = uow.data.list()
+        assert {res.exchange_product_id: res.id for res in updated_results} == stored_ids
+        assert {res.volume for res in updated_results} == {60, 40}
+
+
+@pytest.mark.usefixtures('engine')
+def test_copy_rolled_back_with_transaction(engine: sqlalchemy.engine.Engine) -> None:
+    uow = unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, load_method='copy')
+
+    with uow:
+        uow.data.add_batch(create_trading_results_batch())
+        uow.rollback()
+
+        assert uow.data.list() == []
+
+
+@pytest.mark.usefixtures('engine')
+def test_upsert_trading_results(engine: sqlalchemy.engine.Engine) -> None:
+    uow = unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, load_method='upsert')
+
+    with uow:
+        assert uow.data.add_batch(create_trading_results_batch()) == 2
+        uow.commit()
+        stored_results = {res.exchange_product_id: res for res in uow.data.list()}
+
+        changed_batch = create_trading_results_batch()
+        changed_batch.volume[1] = 40
+        assert uow.data.add_batch(create_trading_results_batch()) == 0
+        assert uow.data.add_chunks(changed_batch.iter_chunks(chunk_size=1)) == 1
+        uow.commit()
+
+        assert uow.data.count() == 2
+
+        updated_results = {res.exchange_product_id: res for res in uow.data.list()}
+        unchanged_result = updated_results['A100NVY060F']
+        changed_result = updated_results['A592ACH005A']
+        assert unchanged_result.id == stored_results['A100NVY060F'].id
+        assert unchanged_result.updated_on == stored_results['A100NVY060F'].updated_on
+        assert changed_result.id == stored_results['A592ACH005A'].id
+        assert changed_result.volume == 40
+        assert changed_result.updated_on > stored_results['A592ACH005A'].updated_on
+
+
+@pytest.mark.usefixtures('engine')
+def test_upsert_trading_results_added_twice(engine: sqlalchemy.engine.Engine) -> None:
+    uow = unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine, load_method='upsert')
+
+    with uow:
+        first_results = uow.data.add_bulk([create_trading_result()])
+        uow.commit()
+
+        changed_result = create_trading_result()
+        changed_result.volume = 120
+        second_results = uow.data.add_bulk([changed_result])
+        added_result = uow.data.add(create_trading_result('A592ACH005A'))
+        uow.commit()
+
+        assert second_results[0].id == first_results[0].id
+        assert uow.data.count() == 2
+        assert uow.data.get(first_results[0].id).volume == 120
+        assert uow.data.get(added_result.id) == added_result
+
+
+@pytest.mark.usefixtures('engine')
+def test_list_trading_dates(engine: sqlalchemy.engine.Engine) -> None:
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        later_batch = create_trading_results_batch()
+        later_batch.date = datetime.date(year=2023, month=9, day=22)
+        uow.data.add_batch(later_batch)
+        uow.data.add_batch(create_trading_results_batch())
+        uow.commit()
+
+        result_filter = filters.TradingResultFilter(
+            end_date=datetime.date(year=2023, month=9, day=21),
+        )
+
+        assert uow.data.list_dates() == [
+            datetime.date(year=2023, month=9, day=21),
+            datetime.date(year=2023, month=9, day=22),
+        ]
+        assert uow.data.list_dates(result_filter) == [
+            datetime.date(year=2023, month=9, day=21),
+        ]
+
+
+@pytest.mark.usefixtures('engine')
+def test_last_trading_date(engine: sqlalchemy.engine.Engine) -> None:
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert uow.data.get_last_date() is None
+
+        later_batch = create_trading_results_batch()
+        later_batch.date = datetime.date(year=2023, month=9, day=22)
+        uow.data.add_batch(later_batch)
+        uow.data.add_batch(create_trading_results_batch())
+        uow.commit()
+
+        assert uow.data.get_last_date() == datetime.date(year=2023, month=9, day=22)
+
+
+@pytest.mark.usefixtures('engine')
+def test_ingestion_jobs_stored(engine: sqlalchemy.engine.Engine) -> None:
+    job_date = datetime.date(year=2023, month=9, day=21)
+
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert uow.jobs.get(job_date) is None
+
+        job = models.IngestionJob(job_date)
+        job.start(datetime.datetime.now())
+        uow.jobs.save(job)
+        uow.commit()
+
+        job.complete(datetime.datetime.now(), 'hash', 2)
+        uow.jobs.save(job)
+        uow.commit()
+    
+    with unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert uow.jobs.get(job_date) == job
+        assert uow.jobs.list([models.JOB_STATUS_COMPLETED]) == [job]
+        assert uow.jobs.list([models.JOB_STATUS_FAILED]) == []
@@ -0,0 +1,219 @@
+import datetime
+
+import aiohttp
+import pytest
+import sqlalchemy.ext.asyncio.engine
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import main
+from spimex_parser.apps.console_async import queue_worker
+from spimex_parser.domain import models
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage.asyncio import unit_of_work as data_unit_of_work
+
+from tests.fakes.parser import server
+from tests.integration.test_async_pipeline import FakeServerTradingResultsManager
+
+
+NOW = datetime.datetime(year=2023, month=10, day=1, hour=12)
+LEASE_DURATION = datetime.timedelta(minutes=5)
+DATES = [datetime.date(year=2023, month=9, day=day) for day in (20, 21, 22)]
+
+
+def create_uow(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork:
+    return data_unit_of_work.AsyncSqlAlchemyTradingResultsUnitOfWork(async_engine)
+
+
+async def enqueue(async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine) -> None:
+    async with create_uow(async_engine) as uow:
+        assert await uow.jobs.enqueue(DATES) == 3
+        await uow.commit()
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_dates_enqueued_once(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    await enqueue(async_engine)
+
+    async with create_uow(async_engine) as uow:
+        assert await uow.jobs.enqueue(DATES[1:] + [datetime.date(year=2023, month=9, day=25)]) == 1
+        await uow.commit()
+
+        ingestion_jobs = await uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [models.JOB_STATUS_PENDING] * 4
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_finished_dates_requeued(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    async with create_uow(async_engine) as uow:
+        completed_job = models.IngestionJob(DATES[0])
+        completed_job.start(NOW)
+        completed_job.complete(NOW, 'hash', 3)
+        await uow.jobs.save(completed_job)
+        running_job = models.IngestionJob(DATES[1])
+        running_job.start(NOW)
+        await uow.jobs.save(running_job)
+        await uow.commit()
+
+        assert await uow.jobs.enqueue(DATES) == 1
+        assert await uow.jobs.enqueue(DATES, requeue=True) == 2
+        await uow.commit()
+
+        ingestion_jobs = await uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [
+            models.JOB_STATUS_PENDING,
+            models.JOB_STATUS_RUNNING,
+            models.JOB_STATUS_PENDING,
+        ]
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_locked_jobs_skipped_by_other_workers(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    await enqueue(async_engine)
+
+    async with create_uow(async_engine) as first_uow:
+        first_job = await first_uow.jobs.claim('first', NOW, LEASE_DURATION, 5)
+
+        async with create_uow(async_engine) as second_uow:
+            second_job = await second_uow.jobs.claim('second', NOW, LEASE_DURATION, 5)
+            await second_uow.commit()
+
+        await first_uow.commit()
+
+    assert first_job is not None and second_job is not None
+    assert first_job.date == DATES[0]
+    assert second_job.date == DATES[1]
+
+    async with create_uow(async_engine) as uow:
+        third_job = await uow.jobs.claim('third', NOW, LEASE_DURATION, 5)
+        assert third_job is not None
+        assert third_job.date == DATES[2]
+        assert third_job.lease_expires_at == NOW + LEASE_DURATION
+        assert await uow.jobs.claim('third', NOW, LEASE_DURATION, 5) is None
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_expired_lease_claimed_again(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    async with create_uow(async_engine) as uow:
+        await uow.jobs.enqueue(DATES[:1])
+        crashed_job = await uow.jobs.claim('crashed', NOW, LEASE_DURATION, 5)
+        assert crashed_job is not None
+        crashed_job.start(NOW)
+        await uow.jobs.save(crashed_job)
+        await uow.commit()
+
+    async with create_uow(async_engine) as uow:
+        renewed_at = NOW + datetime.timedelta(minutes=4)
+        assert await uow.jobs.claim('other', renewed_at, LEASE_DURATION, 5) is None
+        assert await uow.jobs.renew_lease(DATES[0], 'crashed', renewed_at + LEASE_DURATION)
+        assert not await uow.jobs.renew_lease(DATES[0], 'other', renewed_at + LEASE_DURATION)
+        await uow.commit()
+
+    async with create_uow(async_engine) as uow:
+        assert await uow.jobs.claim('other', renewed_at + LEASE_DURATION / 2, LEASE_DURATION, 5) is None
+
+        expired_at = renewed_at + LEASE_DURATION * 2
+        reclaimed_job = await uow.jobs.claim('other', expired_at, LEASE_DURATION, 5)
+        assert reclaimed_job is not None
+        assert reclaimed_job.lease_owner == 'other'
+        assert reclaimed_job.attempts == 1
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_abandoned_jobs_without_lease_claimed(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    async with create_uow(async_engine) as uow:
+        abandoned_job = models.IngestionJob(DATES[0])
+        abandoned_job.start(NOW - LEASE_DURATION * 2)
+        await uow.jobs.save(abandoned_job)
+        running_job = models.IngestionJob(DATES[1])
+        running_job.start(NOW - LEASE_DURATION / 2)
+        await uow.jobs.save(running_job)
+        await uow.commit()
+
+        claimed_job = await uow.jobs.claim('worker', NOW, LEASE_DURATION, 5)
+        assert claimed_job is not None
+        assert claimed_job.date == DATES[0]
+        assert await uow.jobs.claim('worker', NOW, LEASE_DURATION, 5) is None
+
+
+@pytest.mark.usefixtures('async_engine')
+@pytest.mark.asyncio
+async def test_failed_jobs_claimed_when_due(
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+) -> None:
+    async with create_uow(async_engine) as uow:
+        failed_job = models.IngestionJob(DATES[0])
+        failed_job.start(NOW)
+        failed_job.fail(NOW, 'error', datetime.timedelta(hours=1))
+        await uow.jobs.save(failed_job)
+        exhausted_job = models.IngestionJob(DATES[1], attempts=4)
+        exhausted_job.start(NOW)
+        exhausted_job.fail(NOW, 'error', datetime.timedelta(hours=1))
+        await uow.jobs.save(exhausted_job)
+        missing_job = models.IngestionJob(DATES[2])
+        missing_job.start(NOW)
+        missing_job.mark_missing(NOW, 'error')
+        await uow.jobs.save(missing_job)
+        await uow.commit()
+
+        assert await uow.jobs.claim('worker', NOW, LEASE_DURATION, 5) is None
+
+        retry_at = NOW + datetime.timedelta(hours=2)
+        retried_job = await uow.jobs.claim('worker', retry_at, LEASE_DURATION, 5)
+        assert retried_job is not None
+        assert retried_job.date == DATES[0]
+        assert await uow.jobs.claim('worker', retry_at, LEASE_DURATION, 5) is None
+
+
+@pytest.mark.usefixtures('async_engine', 'reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_worker_loads_queued_dates(
+    monkeypatch: pytest.MonkeyPatch,
+    async_engine: sqlalchemy.ext.asyncio.engine.AsyncEngine,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    monkeypatch.setattr(config, 'REPORT_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'PARSED_RESULTS_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'REPORT_METADATA_DIR', None)
+    monkeypatch.setattr(main.deps.database, 'engine', async_engine)
+    await enqueue(async_engine)
+    calendar = trading_calendar.TradingCalendar()
+    results_manager = FakeServerTradingResultsManager(async_client, calendar=calendar)
+    results_manager.reports_server = reports_server
+    worker = queue_worker.IngestionQueueWorker(
+        results_manager,
+        owner='worker',
+        heartbeat_interval=0.01,
+    )
+
+    assert await worker.run(exit_when_empty=True) == 3
+    assert calendar.missing_dates == {DATES[0], DATES[2]}
+
+    async with create_uow(async_engine) as uow:
+        assert len(await uow.data.list()) == 3
+
+        ingestion_jobs = await uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [
+            models.JOB_STATUS_MISSING,
+            models.JOB_STATUS_COMPLETED,
+            models.JOB_STATUS_MISSING,
+        ]
+        assert all(job.attempts == 1 for job in ingestion_jobs)
+        assert all(job.lease_owner is None for job in ingestion_jobs)
@@ -0,0 +1,116 @@
+import datetime
+import threading
+import time
+from typing import List
+
+import pytest
+import sqlalchemy.engine
+
+from spimex_parser import config
+from spimex_parser.apps.console import deps
+from spimex_parser.apps.console import main
+from spimex_parser.domain import models
+from spimex_parser.modules import trading_calendar
+from spimex_parser.modules.data_storage import unit_of_work as data_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def test_map_in_order_keeps_item_order() -> None:
+    running_count = 0
+    max_running_count = 0
+    lock = threading.Lock()
+
+    def delay_inversely(item: int) -> int:
+        nonlocal running_count, max_running_count
+
+        with lock:
+            running_count += 1
+            max_running_count = max(max_running_count, running_count)
+
+        time.sleep(0.01 * (5 - item))
+
+        with lock:
+            running_count -= 1
+
+        return item * 10
+
+    with deps.get_download_executor(max_workers=4) as executor:
+        results = list(main.map_in_order(executor, delay_inversely, range(5), max_pending=2))
+
+    assert results == [0, 10, 20, 30, 40]
+    assert max_running_count <= 2
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.usefixtures('engine', 'reports_server')
+def test_results_loaded_in_order_with_workers(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+    engine: sqlalchemy.engine.Engine,
+    reports_server: server.FakeReportsServer,
+    workers: int,
+) -> None:
+    monkeypatch.setattr(config, 'REPORT_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'PARSED_RESULTS_CACHE_DIR', None)
+    monkeypatch.setattr(config, 'REPORT_METADATA_DIR', None)
+    monkeypatch.setattr(deps.database, 'engine', engine)
+    monkeypatch.setattr(
+        main,
+        'get_data_file_url',
+        lambda date: reports_server.make_url(f'oil_xls_{main.format_date(date)}.xls'),
+    )
+    calendar = trading_calendar.TradingCalendar()
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (20, 21, 22)
+    ]
+
+    main.load_results(dates, calendar, deps.get_job_retry_policy(), workers)
+
+    output_lines: List[str] = capsys.readouterr().out.splitlines()
+    assert [line.split('requested date: ')[-1] for line in output_lines[:2]] == [
+        '2023-09-20 16:20:00)',
+        '2023-09-22 16:20:00)',
+    ]
+    assert calendar.missing_dates == {
+        datetime.date(year=2023, month=9, day=20),
+        datetime.date(year=2023, month=9, day=22),
+    }
+
+    with data_unit_of_work.SqlAlchemyTradingResultsUnitOfWork(engine) as uow:
+        assert len(uow.data.list()) == 3
+
+        ingestion_jobs = uow.jobs.list()
+        assert [job.status for job in ingestion_jobs] == [
+            models.JOB_STATUS_MISSING,
+            models.JOB_STATUS_COMPLETED,
+            models.JOB_STATUS_MISSING,
+        ]
+        assert ingestion_jobs[1].row_count == 3
+
+
+def test_ledger_errors_do_not_stop_loading(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    def fail_ledger(*args) -> None:
+        raise RuntimeError('Ledger is unavailable')
+
+    monkeypatch.setattr(main, 'start_job', fail_ledger)
+    monkeypatch.setattr(main, 'save_job', fail_ledger)
+    dates = [
+        datetime.datetime(year=2023, month=9, day=day, hour=16, minute=20)
+        for day in (20, 21)
+    ]
+
+    loaded_report = main.load_date_report(dates[0])
+
+    assert isinstance(loaded_report.error, RuntimeError)
+    assert loaded_report.ingestion_job.date == dates[0].date()
+
+    main.load_results(dates, trading_calendar.TradingCalendar(), deps.get_job_retry_policy())
+
+    output_lines: List[str] = capsys.readouterr().out.splitlines()
+    assert sum('Ledger is unavailable' in line for line in output_lines) == 4
@@ -0,0 +1,77 @@
+import concurrent.futures
+import datetime
+from collections.abc import Iterable
+from typing import List
+from typing import Optional
+
+import aiohttp
+import pytest
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser.asyncio import unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+uow_classes = [
+    unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork,
+    unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork,
+]
+
+
+@pytest.fixture(params=[None, 'thread', 'process'])
+def executor(
+    request: pytest.FixtureRequest,
+) -> Iterable[Optional[concurrent.futures.Executor]]:
+    if request.param is None:
+        yield None
+    elif request.param == 'thread':
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            yield executor
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            yield executor
+
+
+@pytest.mark.parametrize('uow_class', uow_classes)
+@pytest.mark.usefixtures('reports_server', 'async_client', 'executor')
+@pytest.mark.asyncio
+async def test_async_loading_with_executor(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+    executor: Optional[concurrent.futures.Executor],
+    uow_class: type,
+) -> None:
+    uow = uow_class(
+        reports_server.make_url(reports.REPORT_FILE_NAME),
+        async_client,
+        executor,
+    )
+    async with uow:
+        trading_results: List[models.TradingResult] = await uow.data.list()
+    
+    assert [res.exchange_product_id for res in trading_results] == [
+        'A100NVY060F',
+        'A592ACH005A',
+    ]
+    assert all(
+        res.date == datetime.date(year=2023, month=9, day=21)
+        for res in trading_results
+    )
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_iter_results_yields_chunks(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    uow = unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        reports_server.make_url(reports.REPORT_FILE_NAME),
+        async_client,
+    )
+    async with uow:
+        chunks = [chunk async for chunk in uow.data.iter_results(chunk_size=1)]
+    
+    assert [len(chunk) for chunk in chunks] == [1, 1]
@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+
+from spimex_parser import config
+from spimex_parser.apps.console_async import backfill
+from spimex_parser.apps.console_async import deps
+from spimex_parser.apps.console_async import pipeline
+from spimex_parser.domain import models
+
+
+def create_dates(count: int) -> list:
+    return [
+        datetime.datetime(year=2023, month=9, day=1, hour=16, minute=20)
+        + datetime.timedelta(days=day)
+        for day in range(count)
+    ]
+
+
+def test_dates_split_into_ordered_shards() -> None:
+    dates = create_dates(10)
+    shards = backfill.split_into_shards(dates, 3)
+
+    assert [len(shard) for shard in shards] == [4, 4, 2]
+    assert [date for shard in shards for date in shard] == dates
+
+
+def test_shards_not_more_than_dates() -> None:
+    assert [len(shard) for shard in backfill.split_into_shards(create_dates(2), 8)] == [1, 1]
+    assert backfill.split_into_shards([], 4) == []
+
+
+def test_download_limits_divided_between_shards(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, 'DOWNLOAD_INITIAL_CONCURRENCY', 4)
+    monkeypatch.setattr(config, 'DOWNLOAD_MAX_CONCURRENCY', 8)
+
+    limiter = deps.get_download_limiter(3)
+
+    assert limiter.limit == 1
+    assert limiter.max_limit == 2
+    assert deps.get_download_limiter(16).max_limit == 1
+
+
+def test_progress_counts_jobs_finished_since_start() -> None:
+    started_at = datetime.datetime(year=2023, month=10, day=1)
+    dates = create_dates(4)
+    completed_job = models.IngestionJob(dates[0].date())
+    completed_job.complete(started_at + datetime.timedelta(minutes=1), 'hash', 2)
+    failed_job = models.IngestionJob(dates[1].date())
+    failed_job.fail(
+        started_at + datetime.timedelta(minutes=2),
+        'error',
+        datetime.timedelta(minutes=10),
+    )
+    earlier_job = models.IngestionJob(dates[2].date())
+    earlier_job.complete(started_at - datetime.timedelta(days=1), 'hash', 2)
+    running_job = models.IngestionJob(dates[3].date())
+    running_job.start(started_at)
+    missing_job = models.IngestionJob(dates[2].date())
+    missing_job.mark_missing(started_at + datetime.timedelta(minutes=3), 'error')
+    other_job = models.IngestionJob(datetime.date(year=2023, month=1, day=10))
+    other_job.complete(started_at + datetime.timedelta(minutes=1), 'hash', 2)
+
+    progress = backfill.count_progress(
+        dates,
+        [completed_job, failed_job, missing_job, running_job, other_job],
+        started_at,
+    )
+
+    assert progress == backfill.BackfillProgress(
+        total=4,
+        completed=1,
+        failed=1,
+        missing=1,
+    )
+
+
+def test_shard_results_merged() -> None:
+    dates = create_dates(4)
+    first_statistics = pipeline.StageStatistics(
+        'download',
+        2,
+        processed=3,
+        failed=1,
+        busy_time=2.0,
+        started_at=10.0,
+        finished_at=12.0,
+    )
+    second_statistics = pipeline.StageStatistics(
+        'download',
+        2,
+        processed=2,
+        busy_time=1.0,
+        started_at=11.0,
+        finished_at=15.0,
+    )
+    error = RuntimeError('worker crashed')
+
+    backfill_result = backfill.merge_shard_results([
+        (dates[:2], backfill.ShardResult([first_statistics], {dates[0].date()}, 2)),
+        (dates[2:3], backfill.ShardResult([second_statistics], set(), 3)),
+        (dates[3:], error),
+    ])
+
+    assert backfill_result.statistics == [
+        pipeline.StageStatistics(
+            'download',
+            4,
+            processed=5,
+            failed=1,
+            busy_time=3.0,
+            started_at=10.0,
+            finished_at=15.0,
+        ),
+    ]
+    assert backfill_result.missing_dates == {dates[0].date()}
+    assert backfill_result.errors == [backfill.ShardError(dates[3:], error)]
+    assert backfill_result.download_limit == 5
@@ -0,0 +1,49 @@
+import datetime
+from typing import Any
+from typing import List
+
+import pytest
+
+from spimex_parser.apps.benchmark import workbooks
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import readers
+
+
+@pytest.mark.parametrize('batch_reader', [
+    readers.read_pandas_batches,
+    readers.read_xlrd_batches,
+])
+def test_generated_report_is_parsed_by_engines(
+    batch_reader: readers.BatchReader,
+) -> None:
+    parameters = workbooks.WorkbookParameters(rows_count=200, seed=1)
+    report_rows = workbooks.create_report_rows(parameters)
+    expected_count = count_metric_ton_deals(report_rows, parameters.rows_count)
+
+    trading_results_batches = batch_reader(
+        workbooks.create_report_bytes(parameters),
+        datetime.date(year=2023, month=9, day=21),
+    )
+    trading_results = trading_results_batches[0]
+
+    assert [batch.unit for batch in trading_results_batches] == [
+        models.METRIC_TON_UNIT,
+        'Килограмм',
+        'Кубический метр',
+    ]
+    assert 0 < len(trading_results) < parameters.rows_count
+    assert len(trading_results) == expected_count
+
+
+def count_metric_ton_deals(report_rows: List[List[Any]], rows_count: int) -> int:
+    table_name_row_index = [row[1] for row in report_rows].index(
+        data_table.TABLE_NAME,
+    )
+    table_start_index = table_name_row_index + 1 + data_table.HEADERS_OFFSET
+    metric_ton_rows = report_rows[table_start_index:table_start_index + rows_count]
+    return sum(
+        1
+        for row in metric_ton_rows
+        if row[-1] != workbooks.MISSING_VALUE
+    )
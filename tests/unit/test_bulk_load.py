@@ -0,0 +1,59 @@
+import datetime
+import uuid
+from collections.abc import Iterator
+from typing import List
+
+from spimex_parser.domain import models
+from spimex_parser.modules.data_storage import bulk_load
+
+
+def iterate_rows(consumed: List[int], count: int) -> Iterator[bulk_load.CopyRow]:
+    for index in range(count):
+        consumed.append(index)
+        yield (uuid.UUID(int=index), f'Бензин\t{index}', None, datetime.date(2023, 9, 21))
+
+
+def test_rows_formatted_while_read() -> None:
+    consumed: List[int] = []
+    reader = bulk_load.format_rows(iterate_rows(consumed, count=100))
+
+    first_part = reader.read(10)
+
+    assert len(first_part) == 10
+    assert consumed == [0]
+
+    contents = first_part + reader.read(1000) + reader.read()
+
+    assert len(consumed) == 100
+    assert contents.splitlines()[1] == (
+        '00000000-0000-0000-0000-000000000001\tБензин\\t1\t\\N\t2023-09-21'
+    )
+    assert reader.read(10) == ''
+
+
+def test_batch_converted_to_records() -> None:
+    date = datetime.date(2023, 9, 21)
+    current_datetime = datetime.datetime(2023, 9, 21, 12)
+    batch = models.TradingResultBatch(
+        exchange_product_id=['A100NVY060F', 'A592ACH005A'],
+        exchange_product_name=['Бензин', 'Бензин'],
+        oil_id=['A100', 'A592'],
+        delivery_basis_id=['NVY', 'ACH'],
+        delivery_basis_name=['ст. Новоярославская', 'ст. Новоярославская'],
+        delivery_type_id=['F', 'A'],
+        volume=[60, 20],
+        total=[4_200_000, 1_100_000],
+        count=[1, 2],
+        date=date,
+        created_on=current_datetime,
+        updated_on=current_datetime,
+    )
+
+    records = bulk_load.batch_to_records(batch)
+
+    assert [set(record) for record in records] == [set(bulk_load.COPY_COLUMNS)] * 2
+    assert records[1]['exchange_product_id'] == 'A592ACH005A'
+    assert records[1]['count'] == 2
+    assert records[1]['date'] == date
+    assert records[0]['id'] != records[1]['id']
+    assert bulk_load.result_to_record(batch[1])['id'] != records[1]['id']
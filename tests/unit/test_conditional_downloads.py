@@ -0,0 +1,205 @@
+import pathlib
+from typing import Optional
+
+import aiohttp
+import pytest
+
+from spimex_parser.modules.parser import metadata
+from spimex_parser.modules.parser import unit_of_work
+from spimex_parser.modules.parser.asyncio import unit_of_work as async_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def create_store(tmp_path: pathlib.Path) -> metadata.FileSystemReportMetadataStore:
+    return metadata.FileSystemReportMetadataStore(str(tmp_path / 'metadata'))
+
+
+def test_metadata_store_round_trip(tmp_path: pathlib.Path) -> None:
+    store = create_store(tmp_path)
+    report_metadata = metadata.ReportMetadata(etag='"abc"', last_modified='today')
+
+    store.put('https://example.com/report.xls', report_metadata)
+
+    assert store.get('https://example.com/report.xls') == report_metadata
+    assert store.get('https://example.com/other.xls') is None
+
+
+def test_weak_etag_not_used_for_resume() -> None:
+    report_metadata = metadata.ReportMetadata(etag='W/"abc"', last_modified='today')
+    assert report_metadata.get_range_validator() == 'today'
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_committed_report_not_parsed_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    store = create_store(tmp_path)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, metadata_store=store) as uow:
+        assert not uow.not_modified
+        assert len(uow.data.list()) == 2
+        uow.commit()
+        stored_file_hash = uow.file_hash
+
+    uow = unit_of_work.XlrdSpimexTradingResultsUnitOfWork(
+        url,
+        metadata_store=store,
+        stored_file_hash=stored_file_hash,
+    )
+    with uow:
+        assert uow.not_modified
+        assert uow.data.list() == []
+
+    assert reports_server.request_headers[1]['If-None-Match'] == reports_server.get_etag(
+        reports.REPORT_FILE_NAME,
+    )
+
+
+@pytest.mark.parametrize('stored_file_hash', [None, 'other'])
+@pytest.mark.usefixtures('reports_server')
+def test_report_not_stored_in_database_downloaded_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    stored_file_hash: Optional[str],
+) -> None:
+    store = create_store(tmp_path)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, metadata_store=store) as uow:
+        uow.commit()
+
+    uow = unit_of_work.XlrdSpimexTradingResultsUnitOfWork(
+        url,
+        metadata_store=store,
+        stored_file_hash=stored_file_hash,
+    )
+    with uow:
+        assert not uow.not_modified
+        assert len(uow.data.list()) == 2
+
+    assert 'If-None-Match' not in reports_server.request_headers[1]
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_uncommitted_report_downloaded_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    store = create_store(tmp_path)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    for _ in range(2):
+        with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, metadata_store=store) as uow:
+            assert len(uow.data.list()) == 2
+
+    assert 'If-None-Match' not in reports_server.request_headers[1]
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_changed_report_downloaded_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    store = create_store(tmp_path)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, metadata_store=store) as uow:
+        uow.commit()
+        stored_file_hash = uow.file_hash
+
+    reports_server.reports[reports.REPORT_FILE_NAME] = reports.create_report_bytes(
+        reports.create_report_rows()[:9],
+    )
+
+    uow = unit_of_work.XlrdSpimexTradingResultsUnitOfWork(
+        url,
+        metadata_store=store,
+        stored_file_hash=stored_file_hash,
+    )
+    with uow:
+        assert not uow.not_modified
+        assert len(uow.data.list()) == 2
+
+
+@pytest.mark.parametrize('max_memory_size', [0, 1024 ** 2])
+@pytest.mark.usefixtures('reports_server')
+def test_interrupted_download_resumed(
+    reports_server: server.FakeReportsServer,
+    max_memory_size: int,
+) -> None:
+    reports_server.interruptions = 2
+    reports_server.interrupt_after = 1000
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+    uow = unit_of_work.PandasSpimexTradingResultsUnitOfWork(
+        url,
+        max_memory_size=max_memory_size,
+    )
+
+    with uow:
+        assert len(uow.data.list()) == 2
+
+    assert [headers.get('Range') for headers in reports_server.request_headers] == [
+        None,
+        'bytes=1000-',
+        'bytes=2000-',
+    ]
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_committed_report_not_parsed_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    store = create_store(tmp_path)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    uow = async_unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        metadata_store=store,
+    )
+    async with uow:
+        assert len(await uow.data.list()) == 2
+        await uow.commit()
+
+    uow = async_unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        metadata_store=store,
+        stored_file_hash=uow.file_hash,
+    )
+    async with uow:
+        assert uow.not_modified
+        assert await uow.data.list() == []
+
+
+@pytest.mark.parametrize('max_memory_size', [0, 1024 ** 2])
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_interrupted_download_resumed(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+    max_memory_size: int,
+) -> None:
+    reports_server.interruptions = 1
+    reports_server.interrupt_after = 1000
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+    uow = async_unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        max_memory_size=max_memory_size,
+    )
+
+    async with uow:
+        assert len(await uow.data.list()) == 2
+
+    assert reports_server.request_headers[1]['Range'] == 'bytes=1000-'
+    assert reports_server.request_headers[1]['If-Range'] == reports_server.get_etag(
+        reports.REPORT_FILE_NAME,
+    )
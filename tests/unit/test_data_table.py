@@ -0,0 +1,144 @@
+import datetime
+
+import pandas as pd
+
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import readers
+
+from tests.fakes.parser.reports import create_report_bytes
+from tests.fakes.parser.reports import create_report_frame
+from tests.fakes.parser.reports import create_report_rows
+
+
+def test_list_results_extracts_metric_ton_table() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    trading_results = table.list_results()
+
+    assert [res.exchange_product_id for res in trading_results] == [
+        'A100NVY060F',
+        'A592ACH005A',
+    ]
+    assert all(res.date == date for res in trading_results)
+
+
+def test_list_results_parses_columns() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    trading_result = table.list_results()[1]
+
+    assert trading_result.oil_id == 'A592'
+    assert trading_result.delivery_basis_id == 'ACH'
+    assert trading_result.delivery_type_id == 'A'
+    assert trading_result.delivery_basis_name == 'ст. Новоярославская'
+    assert trading_result.volume == 20
+    assert trading_result.total == 1_100_000
+    assert trading_result.count == 2
+    assert all(
+        isinstance(value, int)
+        for value in (trading_result.volume, trading_result.total, trading_result.count)
+    )
+
+
+def test_list_results_shares_timestamps() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    trading_results = table.list_results()
+
+    assert len({res.created_on for res in trading_results}) == 1
+    assert all(res.created_on == res.updated_on for res in trading_results)
+
+
+def test_list_batch_matches_list_results() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    trading_results_batch = table.list_batch()
+
+    assert len(trading_results_batch) == 2
+    assert trading_results_batch.volume == [60, 20]
+    assert trading_results_batch.date == date
+    assert [
+        res.exchange_product_id for res in trading_results_batch
+    ] == [
+        res.exchange_product_id for res in table.list_results()
+    ]
+
+
+def copy_string(value: str) -> str:
+    return ''.join(list(value))
+
+
+def test_list_batch_interns_repeated_strings() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    rows = create_report_rows()
+
+    for row in rows[5:7]:
+        row[2] = copy_string(row[2])
+        row[3] = copy_string(row[3])
+
+    assert rows[5][3] == rows[6][3] and rows[5][3] is not rows[6][3]
+
+    frame = pd.DataFrame(rows)
+    table = data_table.PandasTradingResultsDataTable(frame, date)
+
+    first_result, second_result = table.list_results()
+
+    assert first_result.delivery_basis_name is second_result.delivery_basis_name
+    assert first_result.exchange_product_name is second_result.exchange_product_name
+    assert not hasattr(first_result, '__dict__')
+
+
+def test_iter_results_yields_fixed_size_chunks() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    chunks = list(table.iter_results(chunk_size=1))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    assert [chunk[0].exchange_product_id for chunk in chunks] == [
+        'A100NVY060F',
+        'A592ACH005A',
+    ]
+
+
+def test_iter_results_does_not_build_whole_batch(monkeypatch) -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+    monkeypatch.setattr(table, 'list_batch', None)
+
+    chunks = list(table.iter_results(chunk_size=1))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+
+
+def test_xlrd_iter_results_does_not_build_whole_batch(monkeypatch) -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    sheet = readers.open_xlrd_sheet(file_contents=create_report_bytes())
+    table = data_table.XlrdTradingResultsDataTable(sheet, date)
+    expected_product_ids = table.list_batch().exchange_product_id
+    monkeypatch.setattr(table, 'list_batch', None)
+
+    chunks = list(table.iter_results(chunk_size=1))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    assert [
+        res.exchange_product_id for chunk in chunks for res in chunk
+    ] == expected_product_ids
+
+
+def test_list_batches_extracts_every_unit() -> None:
+    date = datetime.date(year=2023, month=9, day=21)
+    table = data_table.PandasTradingResultsDataTable(create_report_frame(), date)
+
+    trading_results_batches = table.list_batches()
+
+    assert [batch.unit for batch in trading_results_batches] == [
+        'Метрическая тонна',
+        'Килограмм',
+    ]
+    assert trading_results_batches[1].exchange_product_id == ['G000KRS001A']
+    assert trading_results_batches[1][0].unit == 'Килограмм'
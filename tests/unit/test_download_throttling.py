@@ -0,0 +1,147 @@
+import datetime
+import time
+
+import aiohttp
+import pytest
+
+from spimex_parser.modules.parser.asyncio import throttling
+from spimex_parser.modules.parser.asyncio import unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def create_client(
+    async_client: aiohttp.ClientSession,
+    limiter: throttling.AdaptiveConcurrencyLimiter,
+    max_delay: float = 0.01,
+) -> throttling.AdaptiveClient:
+    retry_policy = throttling.DownloadRetryPolicy(attempts=3, base_delay=0.01, max_delay=max_delay)
+    return throttling.AdaptiveClient(async_client, limiter, retry_policy)
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_additively_and_shrinks_multiplicatively() -> None:
+    limiter = throttling.AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8)
+
+    for _ in range(5):
+        limiter.record_success(0.1)
+
+    assert limiter.limit == 5
+
+    limiter.record_success(limiter.latency_threshold + 1)
+    started_at = await limiter.acquire()
+    limiter.record_overload(started_at)
+    await limiter.release()
+
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_overload_wave_shrinks_limit_once() -> None:
+    limiter = throttling.AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=2)
+    started_at = [await limiter.acquire() for _ in range(4)]
+
+    for request_started_at in started_at:
+        limiter.record_overload(request_started_at)
+        await limiter.release()
+
+    assert limiter.limit == 4
+
+    limiter.record_overload(await limiter.acquire())
+    limiter.record_overload(await limiter.acquire())
+
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_new_requests() -> None:
+    limiter = throttling.AdaptiveConcurrencyLimiter()
+    limiter.record_overload(await limiter.acquire(), retry_after=0.2)
+    await limiter.release()
+
+    started_at = time.monotonic()
+    await limiter.acquire()
+
+    assert time.monotonic() - started_at >= 0.15
+
+
+def test_retry_after_parsed_from_seconds_and_http_date() -> None:
+    current_datetime = datetime.datetime(2023, 9, 21, 16, 20, tzinfo=datetime.timezone.utc)
+
+    assert throttling.parse_retry_after('120') == 120
+    assert throttling.parse_retry_after(
+        'Thu, 21 Sep 2023 16:20:30 GMT',
+        current_datetime,
+    ) == 30
+    assert throttling.parse_retry_after('soon') is None
+    assert throttling.parse_retry_after(None) is None
+
+
+def test_retry_after_limited_by_max_delay() -> None:
+    retry_policy = throttling.DownloadRetryPolicy(max_delay=30)
+
+    assert retry_policy.get_delay(1, retry_after=10) == 10
+    assert retry_policy.get_delay(1, retry_after=86400) == 30
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_throttled_download_retried_after_retry_after(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    reports_server.failures = [(429, '1'), (503, None)]
+    limiter = throttling.AdaptiveConcurrencyLimiter(initial_limit=4)
+    uow = unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        reports_server.make_url(reports.REPORT_FILE_NAME),
+        create_client(async_client, limiter, max_delay=1),
+    )
+
+    started_at = time.monotonic()
+
+    async with uow:
+        assert len(await uow.data.list()) == 2
+
+    assert len(reports_server.requests) == 3
+    assert time.monotonic() - started_at >= 1
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_missing_report_not_retried(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    limiter = throttling.AdaptiveConcurrencyLimiter(initial_limit=4)
+    uow = unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        reports_server.make_url('oil_xls_20230923162000.xls'),
+        create_client(async_client, limiter),
+    )
+
+    with pytest.raises(aiohttp.ClientResponseError) as exc_info:
+        await uow.download()
+
+    assert throttling.is_permanent_miss(exc_info.value)
+    assert len(reports_server.requests) == 1
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_server_errors_raised_after_last_attempt(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    reports_server.failures = [(503, None)] * 3
+    client = create_client(async_client, throttling.AdaptiveConcurrencyLimiter())
+
+    with pytest.raises(aiohttp.ClientResponseError) as exc_info:
+        async with client.get(reports_server.make_url(reports.REPORT_FILE_NAME)):
+            pass
+
+    assert exc_info.value.status == 503
+    assert len(reports_server.requests) == 3
@@ -0,0 +1,91 @@
+import io
+import os
+
+import aiohttp
+import pytest
+
+from spimex_parser.modules.parser import downloads
+from spimex_parser.modules.parser import unit_of_work
+from spimex_parser.modules.parser.asyncio import unit_of_work as async_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def test_buffer_reads_stream_into_preallocated_buffer() -> None:
+    report_bytes = reports.create_report_bytes()
+
+    with downloads.ReportBuffer(len(report_bytes), len(report_bytes)) as report_buffer:
+        report_buffer.read_from(io.BufferedReader(io.BytesIO(report_bytes)))
+        source = report_buffer.get_source()
+
+        assert isinstance(source, bytearray)
+        assert source == report_bytes
+
+
+def test_buffer_spools_large_file_to_disk() -> None:
+    with downloads.ReportBuffer(expected_size=8, max_memory_size=4) as report_buffer:
+        report_buffer.write(b'abcd')
+        report_buffer.write(b'efgh')
+        source = report_buffer.get_source()
+
+        assert isinstance(source, str)
+        assert report_buffer.read_contents() == b'abcdefgh'
+
+    assert not os.path.exists(source)
+
+
+def test_buffer_rejects_incomplete_download() -> None:
+    with downloads.ReportBuffer(expected_size=8, max_memory_size=8) as report_buffer:
+        report_buffer.write(b'abcd')
+
+        with pytest.raises(downloads.IncompleteDownloadError):
+            report_buffer.get_source()
+
+        with pytest.raises(downloads.IncompleteDownloadError):
+            report_buffer.write(b'efghijkl')
+
+
+def test_expected_size_ignores_compressed_content() -> None:
+    assert downloads.get_expected_size({'Content-Length': '10'}) == 10
+    assert downloads.get_expected_size({}) is None
+    assert downloads.get_expected_size({
+        'Content-Length': '10',
+        'Content-Encoding': 'gzip',
+    }) is None
+
+
+@pytest.mark.parametrize('uow_class', [
+    unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+])
+@pytest.mark.parametrize('max_memory_size', [0, downloads.MAX_MEMORY_SIZE])
+@pytest.mark.usefixtures('reports_server')
+def test_downloaded_report_parsed_from_buffer_or_file(
+    reports_server: server.FakeReportsServer,
+    uow_class: type,
+    max_memory_size: int,
+) -> None:
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with uow_class(url, max_memory_size=max_memory_size) as uow:
+        assert len(uow.data.list()) == 2
+
+
+@pytest.mark.parametrize('max_memory_size', [0, downloads.MAX_MEMORY_SIZE])
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_downloaded_report_parsed_from_buffer_or_file(
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+    max_memory_size: int,
+) -> None:
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+    uow = async_unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        max_memory_size=max_memory_size,
+    )
+
+    async with uow:
+        assert len(await uow.data.list()) == 2
@@ -0,0 +1,61 @@
+import datetime
+
+from spimex_parser.apps.console import main
+from spimex_parser.modules import datetime_util
+from spimex_parser.modules import report_dates
+
+
+DEFAULT_START_DATE = datetime.date(year=2023, month=1, day=1)
+
+
+def test_incremental_start_after_last_date() -> None:
+    start_date = datetime_util.get_incremental_start_date(
+        datetime.date(year=2023, month=9, day=21),
+        DEFAULT_START_DATE,
+    )
+    assert start_date == datetime.date(year=2023, month=9, day=22)
+
+
+def test_incremental_start_without_stored_dates() -> None:
+    start_date = datetime_util.get_incremental_start_date(None, DEFAULT_START_DATE)
+    assert start_date == DEFAULT_START_DATE
+
+
+def test_datetime_bounds_include_end_date() -> None:
+    start, end = datetime_util.get_datetime_bounds(
+        datetime.date(year=2023, month=9, day=21),
+        datetime.date(year=2023, month=9, day=22),
+        report_dates.REPORT_TIME,
+    )
+    dates = list(datetime_util.datetime_range(start, end))
+
+    assert dates == [
+        datetime.datetime(year=2023, month=9, day=21, hour=16, minute=20),
+        datetime.datetime(year=2023, month=9, day=22, hour=16, minute=20),
+    ]
+
+
+def test_date_range_overridden_from_command_line() -> None:
+    args = main.parse_args(['--start', '2023-09-21', '--end', '2023-09-22'])
+    start, end = main.get_date_range(args.start, args.end)
+
+    assert start == datetime.datetime(year=2023, month=9, day=21, hour=16, minute=20)
+    assert end == datetime.datetime(year=2023, month=9, day=23, hour=16, minute=20)
+
+
+def test_date_range_defaults_to_incremental() -> None:
+    args = main.parse_args([])
+    assert args.start is None
+    assert args.end is None
+
+
+def test_date_range_starts_after_last_stored_date() -> None:
+    start, end = report_dates.get_date_range(
+        None,
+        datetime.date(year=2023, month=9, day=22),
+        datetime.date(year=2023, month=9, day=20),
+        DEFAULT_START_DATE,
+    )
+
+    assert start == datetime.datetime(year=2023, month=9, day=21, hour=16, minute=20)
+    assert end == datetime.datetime(year=2023, month=9, day=23, hour=16, minute=20)
@@ -0,0 +1,153 @@
+import datetime
+
+from spimex_parser.domain import models
+from spimex_parser.modules import job_ledger
+
+
+CURRENT_DATETIME = datetime.datetime(year=2023, month=9, day=25, hour=12)
+
+
+def create_policy() -> job_ledger.JobRetryPolicy:
+    return job_ledger.JobRetryPolicy(
+        max_attempts=3,
+        base_delay=datetime.timedelta(minutes=10),
+        max_delay=datetime.timedelta(minutes=30),
+    )
+
+
+def create_job(day: int, status: str, attempts: int = 1) -> models.IngestionJob:
+    return models.IngestionJob(
+        date=datetime.date(year=2023, month=9, day=day),
+        status=status,
+        attempts=attempts,
+    )
+
+
+def test_retry_delay_grows_exponentially() -> None:
+    policy = create_policy()
+    delays = [policy.get_retry_delay(attempts) for attempts in range(1, 5)]
+
+    assert delays == [
+        datetime.timedelta(minutes=10),
+        datetime.timedelta(minutes=20),
+        datetime.timedelta(minutes=30),
+        datetime.timedelta(minutes=30),
+    ]
+
+
+def test_failed_job_retried_after_delay() -> None:
+    policy = create_policy()
+    job = create_job(21, models.JOB_STATUS_RUNNING)
+    job.fail(CURRENT_DATETIME, 'error', policy.get_retry_delay(job.attempts))
+
+    assert not policy.is_due(job, CURRENT_DATETIME)
+    assert policy.is_due(job, CURRENT_DATETIME + datetime.timedelta(minutes=10))
+
+
+def test_selected_dates_skip_completed_and_exhausted_jobs() -> None:
+    policy = create_policy()
+    jobs = [
+        create_job(18, models.JOB_STATUS_FAILED),
+        create_job(19, models.JOB_STATUS_RUNNING),
+        create_job(20, models.JOB_STATUS_COMPLETED),
+        create_job(21, models.JOB_STATUS_FAILED, attempts=3),
+    ]
+    requested_dates = [
+        datetime.date(year=2023, month=9, day=day)
+        for day in (20, 21, 22)
+    ]
+
+    selected_dates = policy.select_dates(requested_dates, jobs, CURRENT_DATETIME)
+
+    assert selected_dates == [
+        datetime.date(year=2023, month=9, day=18),
+        datetime.date(year=2023, month=9, day=19),
+        datetime.date(year=2023, month=9, day=22),
+    ]
+    assert policy.list_exhausted(jobs) == [jobs[3]]
+
+
+def test_completed_job_keeps_file_details() -> None:
+    job = create_job(21, models.JOB_STATUS_RUNNING)
+    job.fail(CURRENT_DATETIME, 'error', datetime.timedelta(minutes=10))
+    job.start(CURRENT_DATETIME)
+    job.complete(CURRENT_DATETIME, 'hash', 10)
+
+    assert job.status == models.JOB_STATUS_COMPLETED
+    assert job.attempts == 2
+    assert job.last_error is None
+    assert job.next_attempt_at is None
+    assert (job.file_hash, job.row_count) == ('hash', 10)
+
+
+def test_stored_file_hash_requires_stored_rows() -> None:
+    job = create_job(21, models.JOB_STATUS_RUNNING)
+    assert job.get_stored_file_hash() is None
+
+    job.complete(CURRENT_DATETIME, 'empty', 0)
+    assert job.get_stored_file_hash() is None
+
+    job.complete(CURRENT_DATETIME, 'hash', 10)
+    job.start(CURRENT_DATETIME)
+    assert job.get_stored_file_hash() == 'hash'
+
+
+def test_leased_job_not_due_until_lease_expires() -> None:
+    policy = create_policy()
+    job = create_job(21, models.JOB_STATUS_RUNNING)
+    job.lease_owner = 'worker'
+    job.lease_expires_at = CURRENT_DATETIME + datetime.timedelta(minutes=5)
+
+    assert not policy.is_due(job, CURRENT_DATETIME)
+    assert policy.is_due(job, CURRENT_DATETIME + datetime.timedelta(minutes=5))
+
+    job.complete(CURRENT_DATETIME, 'hash', 2)
+    assert job.lease_owner is None
+    assert job.lease_expires_at is None
+
+
+def test_missing_report_recorded_as_final() -> None:
+    policy = create_policy()
+    missing_job = create_job(20, models.JOB_STATUS_RUNNING)
+    policy.record_failure(
+        missing_job,
+        CURRENT_DATETIME,
+        job_ledger.MissingReportError('No report on the server: 404'),
+    )
+    failed_job = create_job(21, models.JOB_STATUS_RUNNING)
+    policy.record_failure(failed_job, CURRENT_DATETIME, TimeoutError())
+
+    assert missing_job.status == models.JOB_STATUS_MISSING
+    assert missing_job.next_attempt_at is None
+    assert failed_job.status == models.JOB_STATUS_FAILED
+
+    retry_datetime = CURRENT_DATETIME + datetime.timedelta(days=1)
+    selected_dates = policy.select_dates(
+        [missing_job.date, failed_job.date],
+        [missing_job, failed_job],
+        retry_datetime,
+    )
+
+    assert selected_dates == [failed_job.date]
+    assert policy.list_exhausted([missing_job, failed_job]) == []
+
+
+def test_forced_selection_includes_completed_dates() -> None:
+    policy = create_policy()
+    completed_job = create_job(20, models.JOB_STATUS_COMPLETED)
+    leased_job = create_job(21, models.JOB_STATUS_RUNNING)
+    leased_job.lease_owner = 'worker'
+    leased_job.lease_expires_at = CURRENT_DATETIME + datetime.timedelta(minutes=5)
+    requested_dates = [completed_job.date, leased_job.date]
+
+    assert policy.select_dates(
+        requested_dates,
+        [completed_job, leased_job],
+        CURRENT_DATETIME,
+    ) == []
+    assert policy.select_dates(
+        requested_dates,
+        [completed_job, leased_job],
+        CURRENT_DATETIME,
+        force=True,
+    ) == [completed_job.date]
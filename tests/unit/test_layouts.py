@@ -0,0 +1,131 @@
+import pytest
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import layouts
+from spimex_parser.modules.parser import readers
+
+from tests.fakes.parser import reports
+
+
+def open_report_sheet(rows) -> layouts.ReportSheet:
+    report_bytes = reports.create_report_bytes(rows)
+    sheet = readers.open_xlrd_sheet(file_contents=report_bytes)
+    return layouts.XlrdReportSheet(sheet)
+
+
+def test_layout_is_resolved_by_full_scan_first() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+
+    layout = layout_cache.resolve(open_report_sheet(reports.create_report_rows()))
+
+    assert layout is not None
+    assert layout.sections == (
+        data_table.TableSection(models.METRIC_TON_UNIT, 5, 8),
+        data_table.TableSection('Килограмм', 12, 13),
+    )
+    assert layout.contracts_col_index == reports.COLUMNS_COUNT - 1
+    assert (layout_cache.hits, layout_cache.misses) == (0, 1)
+
+
+def test_cached_layout_is_reused_with_same_boundaries() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    first_layout = layout_cache.resolve(open_report_sheet(rows))
+
+    layout = layout_cache.resolve(open_report_sheet(rows))
+
+    assert layout == first_layout
+    assert (layout_cache.hits, layout_cache.misses) == (1, 1)
+
+
+def test_new_table_end_falls_back_to_full_scan() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    layout_cache.resolve(open_report_sheet(rows))
+
+    new_row = reports.create_data_row('A001KRS060F', 1, 2, 3)
+    longer_rows = rows[:6] + [new_row] + rows[6:]
+    layout = layout_cache.resolve(open_report_sheet(longer_rows))
+
+    assert layout is not None
+    assert layout.sections == (
+        data_table.TableSection(models.METRIC_TON_UNIT, 5, 9),
+        data_table.TableSection('Килограмм', 13, 14),
+    )
+    assert (layout_cache.hits, layout_cache.misses) == (0, 2)
+
+
+def test_appended_table_falls_back_to_full_scan() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    layout_cache.resolve(open_report_sheet(rows[:9]))
+
+    layout = layout_cache.resolve(open_report_sheet(rows))
+
+    assert layout is not None
+    assert [section.unit for section in layout.sections] == [
+        models.METRIC_TON_UNIT,
+        'Килограмм',
+    ]
+    assert (layout_cache.hits, layout_cache.misses) == (0, 2)
+
+
+def test_cleared_cache_scans_report_again() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    sheet = open_report_sheet(reports.create_report_rows())
+    layout_cache.resolve(sheet)
+
+    layout_cache.clear()
+    layout_cache.resolve(sheet)
+
+    assert len(layout_cache.layouts) == 1
+    assert (layout_cache.hits, layout_cache.misses) == (0, 1)
+
+
+def test_shifted_layout_falls_back_to_full_scan() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    layout_cache.resolve(open_report_sheet(rows))
+
+    shifted_rows = [reports.create_row('Примечание')] + rows
+    layout = layout_cache.resolve(open_report_sheet(shifted_rows))
+
+    assert layout is not None
+    assert layout.sections[0] == data_table.TableSection(
+        models.METRIC_TON_UNIT,
+        6,
+        9,
+    )
+    assert (layout_cache.hits, layout_cache.misses) == (0, 2)
+    assert len(layout_cache.layouts) == 2
+
+
+def test_unexpected_headers_of_other_unit_raise_layout_error() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    layout_cache.resolve(open_report_sheet(rows))
+
+    rows[10] = reports.create_row('Базис поставки', 'Код Инструмента')
+
+    with pytest.raises(layouts.ReportLayoutError):
+        layout_cache.resolve(open_report_sheet(rows))
+
+
+def test_unexpected_headers_raise_layout_error() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+    rows = reports.create_report_rows()
+    rows[3] = reports.create_row('Базис поставки', 'Код Инструмента')
+
+    with pytest.raises(layouts.ReportLayoutError):
+        layout_cache.resolve(open_report_sheet(rows))
+
+
+def test_report_without_table_has_no_layout() -> None:
+    layout_cache = layouts.ReportLayoutCache()
+
+    layout = layout_cache.resolve(open_report_sheet([
+        reports.create_row('Бюллетень по итогам торгов'),
+    ]))
+
+    assert layout is None
@@ -0,0 +1,147 @@
+import datetime
+import pathlib
+
+import aiohttp
+import pytest
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import unit_of_work
+from spimex_parser.modules.parser.asyncio import unit_of_work as async_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def create_trading_results_batch(
+    date: datetime.date,
+    unit: str = models.METRIC_TON_UNIT,
+) -> models.TradingResultBatch:
+    return models.TradingResultBatch(
+        exchange_product_id=['A100NVY060F'],
+        exchange_product_name=['Бензин (АИ-100-К5), ст. Новоярославская (ст. отправления)'],
+        oil_id=['A100'],
+        delivery_basis_id=['NVY'],
+        delivery_basis_name=['ст. Новоярославская'],
+        delivery_type_id=['F'],
+        volume=[60],
+        total=[4_200_000],
+        count=[1],
+        date=date,
+        created_on=datetime.datetime.now(),
+        updated_on=datetime.datetime.now(),
+        unit=unit,
+    )
+
+
+def test_get_missing_results(tmp_path: pathlib.Path) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    assert cache.get('hash', datetime.date(year=2023, month=9, day=21)) is None
+
+
+def test_put_and_get_results(tmp_path: pathlib.Path) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    batch = create_trading_results_batch(datetime.date(year=2023, month=9, day=21))
+    cache.put('hash', [batch])
+
+    date = datetime.date(year=2023, month=9, day=22)
+    cached_batches = cache.get('hash', date)
+
+    assert cached_batches is not None
+    assert cached_batches[0].exchange_product_id == batch.exchange_product_id
+    assert cached_batches[0].volume == batch.volume
+    assert cached_batches[0].date == date
+
+
+def test_put_and_get_results_of_several_units(tmp_path: pathlib.Path) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    date = datetime.date(year=2023, month=9, day=21)
+    cache.put('hash', [
+        create_trading_results_batch(date),
+        create_trading_results_batch(date, unit='Килограмм'),
+    ])
+
+    cached_batches = cache.get('hash', date)
+
+    assert cached_batches is not None
+    assert [batch.unit for batch in cached_batches] == [
+        models.METRIC_TON_UNIT,
+        'Килограмм',
+    ]
+    assert [len(batch) for batch in cached_batches] == [1, 1]
+
+
+def test_empty_batches_not_cached(tmp_path: pathlib.Path) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    date = datetime.date(year=2023, month=9, day=21)
+    cache.put('empty', [models.TradingResultBatch.create_empty(date)])
+    cache.put('hash', [
+        models.TradingResultBatch.create_empty(date),
+        create_trading_results_batch(date, unit='Килограмм'),
+    ])
+
+    cached_batches = cache.get('hash', date)
+
+    assert cache.get('empty', date) is None
+    assert cached_batches is not None
+    assert [batch.unit for batch in cached_batches] == ['Килограмм']
+
+
+def test_results_of_other_parser_version_ignored(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    date = datetime.date(year=2023, month=9, day=21)
+    cache.put('hash', [create_trading_results_batch(date)])
+
+    monkeypatch.setattr(caches, 'PARSER_VERSION', caches.PARSER_VERSION + 1)
+
+    assert cache.get('hash', date) is None
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_cached_results_used_instead_of_parsing(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    content_hash = caches.hash_contents(reports.create_report_bytes())
+    date = datetime.date(year=2023, month=9, day=21)
+    cache.put(content_hash, [create_trading_results_batch(date)])
+
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+    uow = unit_of_work.XlrdSpimexTradingResultsUnitOfWork(
+        url,
+        parsed_results_cache=cache,
+    )
+    with uow:
+        trading_results = uow.data.list()
+    
+    assert [res.exchange_product_id for res in trading_results] == ['A100NVY060F']
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_parsed_results_cached(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    cache = caches.ArrowParsedResultsCache(str(tmp_path))
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+    uow = async_unit_of_work.AsyncPandasSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        parsed_results_cache=cache,
+    )
+    async with uow:
+        trading_results = await uow.data.list()
+    
+    content_hash = caches.hash_contents(reports.create_report_bytes())
+    cached_batches = cache.get(content_hash, trading_results[0].date)
+
+    assert cached_batches is not None
+    assert cached_batches[0].exchange_product_id == [
+        res.exchange_product_id for res in trading_results
+    ]
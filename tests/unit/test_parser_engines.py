@@ -0,0 +1,135 @@
+import concurrent.futures
+import dataclasses
+import datetime
+import pathlib
+from collections.abc import Iterable
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pytest
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+@pytest.fixture
+def report_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / reports.REPORT_FILE_NAME
+    path.write_bytes(reports.create_report_bytes())
+    return path
+
+
+def get_trading_results(
+    uow: unit_of_work.SpimexTradingResultsUnitOfWork,
+) -> List[models.TradingResult]:
+    with uow:
+        return uow.data.list()
+
+
+@pytest.fixture(params=[None, 'thread', 'process'])
+def executor(
+    request: pytest.FixtureRequest,
+) -> Iterable[Optional[concurrent.futures.Executor]]:
+    if request.param is None:
+        yield None
+    elif request.param == 'thread':
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            yield executor
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            yield executor
+
+
+@pytest.mark.parametrize('uow_class', [
+    unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+])
+@pytest.mark.usefixtures('reports_server', 'executor')
+def test_loading_with_executor(
+    reports_server: server.FakeReportsServer,
+    executor: Optional[concurrent.futures.Executor],
+    uow_class: type,
+) -> None:
+    uow = uow_class(reports_server.make_url(reports.REPORT_FILE_NAME), executor)
+    trading_results = get_trading_results(uow)
+
+    assert [res.exchange_product_id for res in trading_results] == [
+        'A100NVY060F',
+        'A592ACH005A',
+    ]
+    assert uow.file_hash is not None
+
+
+@pytest.mark.parametrize('uow_class', [
+    unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+])
+def test_loading_from_local_file(
+    report_path: pathlib.Path,
+    uow_class: type,
+) -> None:
+    trading_results = get_trading_results(uow_class(str(report_path)))
+
+    assert [res.exchange_product_id for res in trading_results] == [
+        'A100NVY060F',
+        'A592ACH005A',
+    ]
+    assert trading_results[1].volume == 20
+    assert trading_results[1].count == 2
+    assert all(
+        res.date == datetime.date(year=2023, month=9, day=21)
+        for res in trading_results
+    )
+
+
+def test_xlrd_and_pandas_engines_are_equal(report_path: pathlib.Path) -> None:
+    pandas_results = get_trading_results(
+        unit_of_work.PandasSpimexTradingResultsUnitOfWork(str(report_path)),
+    )
+    xlrd_results = get_trading_results(
+        unit_of_work.XlrdSpimexTradingResultsUnitOfWork(str(report_path)),
+    )
+
+    assert get_comparable_fields(pandas_results) == get_comparable_fields(xlrd_results)
+
+
+def test_xlrd_and_pandas_engines_read_every_unit(report_path: pathlib.Path) -> None:
+    batches_by_engine = []
+
+    for uow_class in (
+        unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+        unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+    ):
+        with uow_class(str(report_path)) as uow:
+            batches_by_engine.append(uow.data.list_batches())
+
+    pandas_batches, xlrd_batches = batches_by_engine
+
+    assert [batch.unit for batch in pandas_batches] == [
+        'Метрическая тонна',
+        'Килограмм',
+    ]
+    assert [
+        get_comparable_fields(batch.list_results()) for batch in pandas_batches
+    ] == [
+        get_comparable_fields(batch.list_results()) for batch in xlrd_batches
+    ]
+
+
+def get_comparable_fields(
+    trading_results: List[models.TradingResult],
+) -> List[Dict[str, Any]]:
+    excluded_fields = ('created_on', 'updated_on')
+    return [
+        {
+            field: value
+            for field, value in dataclasses.asdict(trading_result).items()
+            if field not in excluded_fields
+        }
+        for trading_result in trading_results
+    ]
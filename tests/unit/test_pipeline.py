@@ -0,0 +1,149 @@
+import asyncio
+from typing import List
+from typing import Optional
+
+import pytest
+
+from spimex_parser.apps.console_async import pipeline
+
+
+@pytest.mark.asyncio
+async def test_pipeline_passes_items_through_stages() -> None:
+    stored: List[int] = []
+
+    async def double(item: int) -> int:
+        return item * 2
+
+    async def skip_odd(item: int) -> Optional[int]:
+        return item if item % 4 == 0 else None
+
+    async def store(item: int) -> None:
+        stored.append(item)
+
+    statistics = await pipeline.run_pipeline(
+        range(6),
+        [
+            pipeline.Stage('double', double, workers=2),
+            pipeline.Stage('skip', skip_odd, workers=3),
+            pipeline.Stage('store', store),
+        ],
+        queue_size=1,
+    )
+
+    assert sorted(stored) == [0, 4, 8]
+    assert [stage.processed for stage in statistics] == [6, 6, 3]
+    assert [stage.workers for stage in statistics] == [2, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bounds_items_in_flight() -> None:
+    in_flight = 0
+    max_in_flight = 0
+    release_store = asyncio.Event()
+
+    async def produce(item: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        return item
+
+    async def store(item: int) -> None:
+        nonlocal in_flight
+        await release_store.wait()
+        in_flight -= 1
+
+    async def release_later() -> None:
+        await asyncio.sleep(0.05)
+        release_store.set()
+
+    release_task = asyncio.create_task(release_later())
+    await pipeline.run_pipeline(
+        range(20),
+        [pipeline.Stage('produce', produce), pipeline.Stage('store', store)],
+        queue_size=2,
+    )
+    await release_task
+
+    assert max_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_failed_items() -> None:
+    errors = []
+
+    async def fail_on_two(item: int) -> int:
+        if item == 2:
+            raise ValueError(item)
+        return item
+
+    async def collect_error(item: int, error: Exception) -> None:
+        errors.append(item)
+
+    statistics = await pipeline.run_pipeline(
+        range(4),
+        [pipeline.Stage(
+            'check',
+            fail_on_two,
+            on_error=collect_error,
+        )],
+        queue_size=1,
+    )
+
+    assert errors == [2]
+    assert statistics[0].processed == 3
+    assert statistics[0].failed == 1
+    assert statistics[0].throughput > 0
+    assert 'check: workers=1, processed=3, failed=1' in statistics[0].format()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_continues_after_error_handler_fails() -> None:
+    async def fail(item: int) -> int:
+        raise ValueError(item)
+
+    async def fail_to_handle(item: int, error: Exception) -> None:
+        raise RuntimeError(item)
+
+    statistics = await asyncio.wait_for(
+        pipeline.run_pipeline(
+            range(3),
+            [pipeline.Stage('fail', fail, on_error=fail_to_handle)],
+            queue_size=1,
+        ),
+        timeout=1,
+    )
+
+    assert statistics[0].failed == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_pipeline_discards_unprocessed_items() -> None:
+    discarded: List[int] = []
+    store_started = asyncio.Event()
+
+    async def produce(item: int) -> int:
+        return item
+
+    async def store(item: int) -> None:
+        store_started.set()
+        await asyncio.Event().wait()
+
+    async def discard(item: int) -> None:
+        discarded.append(item)
+
+    pipeline_task = asyncio.create_task(pipeline.run_pipeline(
+        range(4),
+        [
+            pipeline.Stage('produce', produce),
+            pipeline.Stage('store', store, on_discard=discard),
+        ],
+        queue_size=2,
+    ))
+    await store_started.wait()
+    await asyncio.sleep(0.01)
+    pipeline_task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await pipeline_task
+
+    assert sorted(discarded) == [0, 1, 2, 3]
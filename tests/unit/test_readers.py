@@ -0,0 +1,32 @@
+import io
+
+from spimex_parser.domain import models
+from spimex_parser.modules.parser import data_table
+from spimex_parser.modules.parser import readers
+
+from tests.fakes.parser import reports
+
+
+def test_read_pandas_frame_reads_only_tables_window() -> None:
+    frame, sections = readers.read_pandas_frame(
+        io.BytesIO(reports.create_report_bytes()),
+    )
+
+    assert list(frame.columns) == [1, 2, 3, 4, 5, reports.COLUMNS_COUNT - 1]
+    assert frame[1].tolist()[:3] == ['A100NVY060F', 'A592ACH005A', 'DSC5ANK060F']
+    assert sections == [
+        data_table.TableSection(models.METRIC_TON_UNIT, 0, 3),
+        data_table.TableSection('Килограмм', 7, 8),
+    ]
+
+
+def test_read_pandas_frame_returns_empty_frame_without_table() -> None:
+    report_bytes = reports.create_report_bytes([
+        reports.create_row('Бюллетень по итогам торгов'),
+    ])
+
+    frame, sections = readers.read_pandas_frame(io.BytesIO(report_bytes))
+
+    assert frame.empty
+    assert sections == []
+    assert len(frame.columns) == 6
@@ -0,0 +1,258 @@
+import os
+import pathlib
+from typing import Optional
+
+import aiohttp
+import pytest
+
+from spimex_parser.modules.parser import caches
+from spimex_parser.modules.parser import metadata
+from spimex_parser.modules.parser import unit_of_work
+from spimex_parser.modules.parser.asyncio import unit_of_work as async_unit_of_work
+
+from tests.fakes.parser import reports
+from tests.fakes.parser import server
+
+
+def create_cache(
+    tmp_path: pathlib.Path,
+    max_size: int = 1024,
+) -> caches.FileSystemReportCache:
+    return caches.FileSystemReportCache(str(tmp_path / 'cache'), max_size)
+
+
+def set_last_used(cache: caches.FileSystemReportCache, url: str, time: int) -> None:
+    entry_path = cache.directory / 'entries' / cache._hash(url.encode())
+    os.utime(entry_path, (time, time))
+
+
+def read_cached(cache: caches.FileSystemReportCache, url: str) -> Optional[bytes]:
+    cached_path = cache.get(url)
+
+    if cached_path is None:
+        return None
+
+    try:
+        return pathlib.Path(cached_path).read_bytes()
+    finally:
+        os.unlink(cached_path)
+
+
+def test_get_missing_report(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    assert cache.get('https://example.com/report.xls') is None
+
+
+def test_put_and_get_report(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.put('https://example.com/report.xls', b'contents')
+
+    assert read_cached(cache, 'https://example.com/report.xls') == b'contents'
+
+
+def test_report_file_copied_to_cache(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    report_path = tmp_path / 'report.xls'
+    report_path.write_bytes(b'contents')
+    cache.put('https://example.com/report.xls', str(report_path))
+    report_path.unlink()
+
+    cached_path = cache.get('https://example.com/report.xls')
+
+    assert cached_path is not None
+    assert pathlib.Path(cached_path).read_bytes() == b'contents'
+
+    cache.put('https://example.com/other.xls', b'1' * 2048)
+
+    assert pathlib.Path(cached_path).read_bytes() == b'contents'
+    assert read_cached(cache, 'https://example.com/report.xls') is None
+    os.unlink(cached_path)
+
+
+def test_replaced_report_contents_removed(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.put('https://example.com/report.xls', b'old')
+    cache.put('https://example.com/report.xls', b'new')
+
+    assert len(list((cache.directory / 'objects').iterdir())) == 1
+    assert read_cached(cache, 'https://example.com/report.xls') == b'new'
+
+
+def test_same_contents_stored_once(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.put('https://example.com/first.xls', b'contents')
+    cache.put('https://example.com/second.xls', b'contents')
+
+    assert len(list((cache.directory / 'objects').iterdir())) == 1
+    assert read_cached(cache, 'https://example.com/first.xls') == b'contents'
+    assert read_cached(cache, 'https://example.com/second.xls') == b'contents'
+
+
+def test_least_recently_used_report_evicted(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path, max_size=20)
+    cache.put('https://example.com/first.xls', b'1' * 10)
+    cache.put('https://example.com/second.xls', b'2' * 10)
+    assert read_cached(cache, 'https://example.com/first.xls') == b'1' * 10
+
+    cache.put('https://example.com/third.xls', b'3' * 10)
+
+    assert read_cached(cache, 'https://example.com/first.xls') == b'1' * 10
+    assert read_cached(cache, 'https://example.com/second.xls') is None
+    assert read_cached(cache, 'https://example.com/third.xls') == b'3' * 10
+
+
+def test_index_restored_from_directory(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path, max_size=20)
+    cache.put('https://example.com/first.xls', b'1' * 10)
+    cache.put('https://example.com/second.xls', b'2' * 10)
+    set_last_used(cache, 'https://example.com/first.xls', 2_000_000_000)
+    set_last_used(cache, 'https://example.com/second.xls', 1_000_000_000)
+
+    cache = create_cache(tmp_path, max_size=20)
+    cache.put('https://example.com/third.xls', b'3' * 10)
+
+    assert read_cached(cache, 'https://example.com/first.xls') == b'1' * 10
+    assert read_cached(cache, 'https://example.com/second.xls') is None
+    assert read_cached(cache, 'https://example.com/third.xls') == b'3' * 10
+
+
+def test_corrupted_report_ignored(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.put('https://example.com/report.xls', b'contents')
+
+    for object_path in (cache.directory / 'objects').iterdir():
+        object_path.write_bytes(b'corrupted')
+    
+    assert cache.get('https://example.com/report.xls') is None
+
+
+def test_put_and_get_metadata(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    report_metadata = metadata.ReportMetadata(etag='"abc"', last_modified='today')
+    cache.put('https://example.com/report.xls', b'contents', report_metadata)
+
+    assert cache.get_metadata('https://example.com/report.xls') == report_metadata
+    assert read_cached(cache, 'https://example.com/report.xls') == b'contents'
+
+
+def test_report_without_metadata(tmp_path: pathlib.Path) -> None:
+    cache = create_cache(tmp_path)
+    cache.put('https://example.com/report.xls', b'contents')
+
+    assert cache.get_metadata('https://example.com/report.xls') is None
+    assert cache.get_metadata('https://example.com/other.xls') is None
+    assert read_cached(cache, 'https://example.com/report.xls') == b'contents'
+
+
+@pytest.mark.parametrize('uow_class', [
+    unit_of_work.PandasSpimexTradingResultsUnitOfWork,
+    unit_of_work.XlrdSpimexTradingResultsUnitOfWork,
+])
+@pytest.mark.usefixtures('reports_server')
+def test_cached_report_revalidated(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    uow_class: type,
+) -> None:
+    cache = create_cache(tmp_path, max_size=1024 ** 2)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    for _ in range(2):
+        with uow_class(url, report_cache=cache) as uow:
+            assert not uow.not_modified
+            assert len(uow.data.list()) == 2
+    
+    assert len(reports_server.requests) == 2
+    assert reports_server.request_headers[1]['If-None-Match'] == reports_server.get_etag(
+        reports.REPORT_FILE_NAME,
+    )
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_republished_report_not_taken_from_cache(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    cache = create_cache(tmp_path, max_size=1024 ** 2)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, report_cache=cache) as uow:
+        first_file_hash = uow.file_hash
+
+    reports_server.reports[reports.REPORT_FILE_NAME] = reports.create_report_bytes(
+        reports.create_report_rows()[:9],
+    )
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, report_cache=cache) as uow:
+        assert uow.file_hash != first_file_hash
+    
+    assert read_cached(cache, url) == reports_server.reports[reports.REPORT_FILE_NAME]
+
+
+@pytest.mark.usefixtures('reports_server')
+def test_evicted_report_downloaded_again(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+) -> None:
+    cache = create_cache(tmp_path, max_size=1024 ** 2)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, report_cache=cache) as uow:
+        assert len(uow.data.list()) == 2
+
+    for object_path in (cache.directory / 'objects').iterdir():
+        object_path.unlink()
+
+    with unit_of_work.XlrdSpimexTradingResultsUnitOfWork(url, report_cache=cache) as uow:
+        assert len(uow.data.list()) == 2
+    
+    assert 'If-None-Match' in reports_server.request_headers[1]
+    assert 'If-None-Match' not in reports_server.request_headers[2]
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_cached_report_revalidated(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    cache = create_cache(tmp_path, max_size=1024 ** 2)
+    url = reports_server.make_url(reports.REPORT_FILE_NAME)
+
+    for _ in range(2):
+        uow = async_unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+            url,
+            async_client,
+            report_cache=cache,
+        )
+        async with uow:
+            assert not uow.not_modified
+            assert len(await uow.data.list()) == 2
+    
+    assert len(reports_server.requests) == 2
+    assert reports_server.request_headers[1]['If-None-Match'] == reports_server.get_etag(
+        reports.REPORT_FILE_NAME,
+    )
+
+
+@pytest.mark.usefixtures('reports_server', 'async_client')
+@pytest.mark.asyncio
+async def test_async_missing_report_not_cached(
+    tmp_path: pathlib.Path,
+    reports_server: server.FakeReportsServer,
+    async_client: aiohttp.ClientSession,
+) -> None:
+    cache = create_cache(tmp_path, max_size=1024 ** 2)
+    url = reports_server.make_url('oil_xls_20230923162000.xls')
+    uow = async_unit_of_work.AsyncXlrdSpimexTradingResultsUnitOfWork(
+        url,
+        async_client,
+        report_cache=cache,
+    )
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        async with uow:
+            pass
+    
+    assert cache.get(url) is None
@@ -0,0 +1,58 @@
+import datetime
+import pathlib
+
+from spimex_parser.modules import trading_calendar
+
+
+def test_weekends_and_holidays_skipped() -> None:
+    calendar = trading_calendar.TradingCalendar(
+        holidays=[datetime.date(year=2023, month=5, day=1)],
+    )
+    start_date = datetime.datetime(year=2023, month=4, day=28, hour=16, minute=20)
+    datetimes = [start_date + datetime.timedelta(days=days) for days in range(5)]
+
+    trading_days = list(calendar.filter_trading_days(datetimes))
+
+    assert [value.date() for value in trading_days] == [
+        datetime.date(year=2023, month=4, day=28),
+        datetime.date(year=2023, month=5, day=2),
+    ]
+
+
+def test_known_trading_dates_not_skipped() -> None:
+    working_saturday = datetime.date(year=2023, month=4, day=29)
+    calendar = trading_calendar.TradingCalendar(trading_dates=[working_saturday])
+
+    assert calendar.is_trading_day(working_saturday)
+
+
+def test_configured_workdays_not_skipped() -> None:
+    working_saturday = datetime.date(year=2024, month=4, day=27)
+    calendar = trading_calendar.TradingCalendar(workdays=[working_saturday])
+
+    assert calendar.is_trading_day(working_saturday)
+    assert not calendar.is_trading_day(datetime.date(year=2024, month=4, day=28))
+
+
+def test_confirmed_missing_dates_stored(tmp_path: pathlib.Path) -> None:
+    store = trading_calendar.FileSystemMissingDatesStore(str(tmp_path / 'missing.json'))
+    missing_date = datetime.date(year=2023, month=9, day=20)
+    today = datetime.date(year=2023, month=9, day=22)
+    calendar = trading_calendar.TradingCalendar(missing_dates_store=store)
+
+    assert calendar.confirm_missing_date(missing_date, today=today)
+    assert not calendar.confirm_missing_date(today, today=today)
+    assert not calendar.is_trading_day(missing_date)
+    assert calendar.is_trading_day(today)
+    assert store.list() == [missing_date]
+
+    restored_calendar = trading_calendar.TradingCalendar(missing_dates_store=store)
+    assert not restored_calendar.is_trading_day(missing_date)
+
+
+def test_parse_dates() -> None:
+    assert trading_calendar.parse_dates('2023-01-02, 2023-01-03,') == [
+        datetime.date(year=2023, month=1, day=2),
+        datetime.date(year=2023, month=1, day=3),
+    ]
+    assert trading_calendar.parse_dates('') == []